@@ -1,8 +1,8 @@
-from .. import rate_limiting
+import rate_limiting
 from .extensions import db, migrate, login_manager, csrf, cache, socketio
 from logging_config import setup_logging, init_sentry
 from cors_config import init_cors
-from ..security import init_security
+from security import init_security
 import os
 from flask import Flask
 from dotenv import load_dotenv
@@ -56,7 +56,7 @@ def create_app():
     # SocketIO: sockets.py defines and configures the global socketio instance; initialize with app
     try:
         # The socketio instance is created in sockets.py and may already have message_queue set from REDIS_URL
-        from ..sockets import socketio as shared_socketio
+        from sockets import socketio as shared_socketio
         shared_socketio.init_app(app, async_mode='eventlet')
     except Exception:
         # If anything fails, continue without raising at factory time; runtime issues will surface later.
@@ -97,14 +97,13 @@ def create_app():
                 'admin_all': 'Administrative full access'
             }
 
-            created = {}
+            # One query for the existing permissions, then add the missing ones
+            created = {p.code: p for p in Permission.query.filter(
+                Permission.code.in_(list(perms))).all()}
             for code, desc in perms.items():
-                p = Permission.query.filter_by(code=code).first()
-                if not p:
-                    p = Permission(code=code, description=desc)
-                    db.session.add(p)
-                    db.session.commit()
-                created[code] = p
+                if code not in created:
+                    created[code] = Permission(code=code, description=desc)
+                    db.session.add(created[code])
 
             # Roles mapping
             roles_map = {
@@ -116,19 +115,20 @@ def create_app():
                 'accountant': ['view_finance']
             }
 
+            roles = {r.name: r for r in Role.query.filter(
+                Role.name.in_(list(roles_map))).all()}
             for role_name, perm_codes in roles_map.items():
-                r = Role.query.filter_by(name=role_name).first()
+                r = roles.get(role_name)
                 if not r:
-                    r = Role(name=role_name)
+                    r = roles[role_name] = Role(name=role_name)
                     db.session.add(r)
-                    db.session.commit()
                 # assign permissions
                 for code in perm_codes:
                     p = created.get(code)
                     if p and p not in r.permissions:
                         r.permissions.append(p)
-                db.session.add(r)
-                db.session.commit()
+            # Permissions, roles and their links go in as one transaction
+            db.session.commit()
 
             # If there is no user with admin role, optionally assign to first user
             first_user = Users.query.first()
@@ -0,0 +1,535 @@
+"""
+In-process stand-in for the Supabase client used by db.py.
+Implements the subset of the PostgREST query builder and the RPC functions
+from create_tables.sql that the app calls, over in-memory tables with hash
+indexes, so routes can be benchmarked without a network or a database.
+Every execute() counts as one round trip and sleeps for the configured
+latency (plus optional jitter) to model the PostgREST hop.
+"""
+import copy
+import random
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from flask import has_request_context, request
+
+from validation import parse_timestamp
+
+# Columns with a hash index, per table (primary keys are always indexed)
+INDEXED_COLUMNS = {
+    'users': ('email', 'auth_user_id'),
+    'dish': (),
+    'order': ('user_id',),
+    'order_item': ('order_id',),
+    'cart_item': ('user_id',),
+    'review': ('dish_id',),
+    'dish_rating_stats': (),
+    'revenue_daily_rollup': (),
+    'revenue_dish_rollup': (),
+}
+PRIMARY_KEYS = {
+    'dish_rating_stats': 'dish_id',
+    'revenue_daily_rollup': 'day',
+}
+# Embedded resources: select('*, dish(*)') on cart_item joins dish on dish_id
+EMBEDS = {'dish': ('dish', 'dish_id'), 'users': ('users', 'user_id')}
+
+SECTIONS = ['Breakfast', 'Lunch', 'Dinner',
+            'Drinks', 'Daily Specials', 'Other']
+
+
+class RoundTripCounter:
+    """Counts round trips made while serving one request.
+
+    Pass it in the WSGI environ as 'bench.round_trips'; copies of the request
+    context (see parallel.py) share the environ, so fan-out calls are counted.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def add(self):
+        with self._lock:
+            self.count += 1
+
+
+class _Response:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class _Table:
+    def __init__(self, name):
+        self.name = name
+        self.pk = PRIMARY_KEYS.get(name, 'id')
+        self.rows = {}
+        self.indexes = {column: defaultdict(set)
+                        for column in INDEXED_COLUMNS.get(name, ())}
+
+    def insert(self, row):
+        key = row[self.pk]
+        if key in self.rows:
+            self.delete(key)
+        self.rows[key] = row
+        for column, index in self.indexes.items():
+            index[row.get(column)].add(key)
+
+    def delete(self, key):
+        row = self.rows.pop(key)
+        for column, index in self.indexes.items():
+            index[row.get(column)].discard(key)
+        return row
+
+    def candidates(self, filters):
+        """Rows that may match filters, narrowed by an index when possible"""
+        for op, column, value in filters:
+            if op == 'eq' and column == self.pk:
+                row = self.rows.get(value)
+                return [row] if row is not None else []
+            if op == 'eq' and column in self.indexes:
+                return [self.rows[key] for key in self.indexes[column].get(value, ())]
+            if op == 'in' and column == self.pk:
+                return [self.rows[key] for key in value if key in self.rows]
+        return list(self.rows.values())
+
+
+def _value(value):
+    """Timestamps compare as instants, as in Postgres, not as text"""
+    if isinstance(value, str):
+        return parse_timestamp(value) or value
+    return value
+
+
+def _compare(op, left, right):
+    if left is None:
+        return False
+    if op in ('eq', 'lt', 'gt'):
+        left, right = _value(left), _value(right)
+    if op == 'eq':
+        return left == right
+    if op == 'lt':
+        return left < right
+    if op == 'gt':
+        return left > right
+    if op == 'in':
+        return left in right
+    raise NotImplementedError(f'filter operator {op}')
+
+
+def _split_top_level(text):
+    parts, depth, current = [], 0, ''
+    for char in text:
+        if char == ',' and depth == 0:
+            parts.append(current)
+            current = ''
+            continue
+        depth += char == '('
+        depth -= char == ')'
+        current += char
+    parts.append(current)
+    return parts
+
+
+def _parse_or(expression):
+    """Parse a PostgREST or=() expression into nested ('or'|'and', [...]) terms"""
+    def term(text):
+        if text.startswith('and(') and text.endswith(')'):
+            return ('and', [term(part) for part in _split_top_level(text[4:-1])])
+        column, op, value = text.split('.', 2)
+        return (op, column, value.strip('"'))
+    return ('or', [term(part) for part in _split_top_level(expression)])
+
+
+def _matches(row, condition):
+    kind = condition[0]
+    if kind == 'or':
+        return any(_matches(row, term) for term in condition[1])
+    if kind == 'and':
+        return all(_matches(row, term) for term in condition[1])
+    op, column, value = condition
+    return _compare(op, row.get(column), value)
+
+
+class _Query:
+    """Chainable stand-in for postgrest's request builders"""
+
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.action = 'select'
+        self.columns = '*'
+        self.payload = None
+        self.filters = []
+        self.conditions = []
+        self.ordering = []
+        self.row_limit = None
+        self.count = None
+        self.returning = 'representation'
+
+    def select(self, columns='*', count=None):
+        self.columns, self.count = columns, count
+        return self
+
+    def insert(self, rows):
+        self.action, self.payload = 'insert', rows
+        return self
+
+    def upsert(self, rows, on_conflict=None):
+        self.action, self.payload = 'upsert', rows
+        return self
+
+    def update(self, values, count=None, returning='representation'):
+        self.action, self.payload = 'update', values
+        self.count, self.returning = count, returning
+        return self
+
+    def delete(self):
+        self.action = 'delete'
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(('eq', column, value))
+        return self
+
+    def in_(self, column, values):
+        self.filters.append(('in', column, set(values)))
+        return self
+
+    def or_(self, expression):
+        self.conditions.append(_parse_or(expression))
+        return self
+
+    def order(self, column, desc=False):
+        self.ordering.append((column, desc))
+        return self
+
+    def limit(self, size):
+        self.row_limit = size
+        return self
+
+    def execute(self):
+        return self.client._round_trip(self._run)
+
+    def _matching(self, table):
+        rows = table.candidates(self.filters)
+        return [row for row in rows
+                if all(_compare(op, row.get(column), value) for op, column, value in self.filters)
+                and all(_matches(row, condition) for condition in self.conditions)]
+
+    def _run(self):
+        table = self.client.tables[self.table]
+        if self.action in ('insert', 'upsert'):
+            rows = self.payload if isinstance(self.payload, list) else [self.payload]
+            stored = []
+            for row in rows:
+                existing = table.rows.get(row.get(table.pk)) if self.action == 'upsert' else None
+                new_row = {**self.client.defaults(self.table), **(existing or {}), **row}
+                table.insert(new_row)
+                stored.append(copy.copy(new_row))
+            return _Response(stored)
+        rows = self._matching(table)
+        if self.action == 'update':
+            for row in rows:
+                row.update(self.payload)
+            data = [] if self.returning == 'minimal' else [copy.copy(row) for row in rows]
+            return _Response(data, len(rows) if self.count else None)
+        if self.action == 'delete':
+            return _Response([table.delete(row[table.pk]) for row in rows])
+        for column, desc in reversed(self.ordering):
+            rows.sort(key=lambda row: (row.get(column) is None, _value(row.get(column))), reverse=desc)
+        if self.row_limit is not None:
+            rows = rows[:self.row_limit]
+        return _Response([self._project(row) for row in rows],
+                         len(rows) if self.count else None)
+
+    def _project(self, row):
+        parts = [part.strip() for part in self.columns.split(',')]
+        result = {}
+        for part in parts:
+            if part == '*':
+                result.update(row)
+            elif part.endswith('(*)'):
+                table_name, key = EMBEDS[part[:-3]]
+                related = self.client.tables[table_name].rows.get(row.get(key))
+                result[part[:-3]] = copy.copy(related) if related else None
+            else:
+                result[part] = row.get(part)
+        return result
+
+
+class _Rpc:
+    def __init__(self, client, name, params):
+        self.client = client
+        self.name = name
+        self.params = params
+
+    def execute(self):
+        handler = getattr(self.client, f'_rpc_{self.name}')
+        return self.client._round_trip(lambda: _Response(handler(**self.params)))
+
+
+def _day(timestamp):
+    return timestamp[:10]
+
+
+def _day_param(value):
+    return value[:10] if value else None
+
+
+class FakeSupabase:
+    """Supabase client stand-in; one instance can serve both db.supabase and db.supabase_admin"""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, seed=0):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.random = random.Random(seed)
+        self.tables = {name: _Table(name) for name in INDEXED_COLUMNS}
+        self.round_trips = 0
+        self._lock = threading.RLock()
+
+    # Client interface used by db.py
+
+    def table(self, name):
+        return _Query(self, name)
+
+    def rpc(self, name, params=None):
+        return _Rpc(self, name, params or {})
+
+    def _round_trip(self, run):
+        delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)  # outside the lock so concurrent calls overlap
+        with self._lock:
+            self.round_trips += 1
+            if has_request_context():
+                counter = request.environ.get('bench.round_trips')
+                if counter is not None:
+                    counter.add()
+            return run()
+
+    def defaults(self, table):
+        now = datetime.now(timezone.utc).isoformat()
+        if table in ('dish_rating_stats', 'revenue_daily_rollup', 'revenue_dish_rollup'):
+            return {}
+        base = {'id': str(uuid.uuid4()), 'created_at': now}
+        if table == 'users':
+            base.update({'is_admin': False, 'points': 0, 'password': None})
+        elif table == 'dish':
+            base.update({'is_archived': False, 'image_variants': None})
+        elif table == 'order':
+            base.update({'status': 'pending', 'points_earned': 0, 'total': 0})
+        return base
+
+    # RPC functions (see create_tables.sql)
+
+    def _rpc_username_taken(self, p_username, p_exclude_id=None):
+        return any(row['username'].lower() == p_username.lower() and row['id'] != p_exclude_id
+                   for row in self.tables['users'].rows.values())
+
+    def _rpc_email_taken(self, p_email, p_exclude_id=None):
+        return any(row['email'].lower() == p_email.lower() and row['id'] != p_exclude_id
+                   for row in self.tables['users'].rows.values())
+
+    def _rpc_dish_name_taken(self, p_name, p_exclude_id=None):
+        return any(row['name'].lower() == p_name.lower() and row['id'] != p_exclude_id
+                   and not row['is_archived'] for row in self.tables['dish'].rows.values())
+
+    def _rpc_archive_dish(self, p_dish_id):
+        dish = self.tables['dish'].rows.get(p_dish_id)
+        if dish is None:
+            return False
+        dish['is_archived'] = True
+        carts = self.tables['cart_item']
+        for row in [row for row in carts.rows.values() if row['dish_id'] == p_dish_id]:
+            carts.delete(row['id'])
+        return True
+
+    def _cart_rows(self, user_id):
+        table = self.tables['cart_item']
+        return [table.rows[key] for key in table.indexes['user_id'].get(user_id, ())]
+
+    def _rpc_add_to_cart(self, p_user_id, p_dish_id, p_quantity):
+        for row in self._cart_rows(p_user_id):
+            if row['dish_id'] == p_dish_id:
+                row['quantity'] += p_quantity
+                return [copy.copy(row)]
+        row = {**self.defaults('cart_item'), 'user_id': p_user_id,
+               'dish_id': p_dish_id, 'quantity': p_quantity}
+        self.tables['cart_item'].insert(row)
+        return [copy.copy(row)]
+
+    def _rpc_replace_cart(self, p_user_id, p_items):
+        carts, dishes = self.tables['cart_item'], self.tables['dish'].rows
+        for row in self._cart_rows(p_user_id):
+            carts.delete(row['id'])
+        for item in p_items:
+            dish = dishes.get(item['dish_id'])
+            if dish and not dish['is_archived'] and item['quantity'] > 0:
+                carts.insert({**self.defaults('cart_item'), **item, 'user_id': p_user_id})
+        return None
+
+    def _rpc_checkout_cart(self, p_user_id, p_discount=0, p_phone_number=None):
+        cart = self._cart_rows(p_user_id)
+        if not cart:
+            return []
+        dishes = self.tables['dish'].rows
+        total = sum(Decimal(str(dishes[row['dish_id']]['price'])) * row['quantity']
+                    for row in cart)
+        discount = min(max(Decimal(str(p_discount or 0)), Decimal(0)), total)
+        order = {**self.defaults('order'), 'user_id': p_user_id, 'phone_number': p_phone_number,
+                 'total': float(total - discount), 'points_earned': int(total - discount)}
+        self.tables['order'].insert(order)
+        for row in cart:
+            self.tables['order_item'].insert({
+                **self.defaults('order_item'), 'order_id': order['id'], 'dish_id': row['dish_id'],
+                'quantity': row['quantity'], 'price': dishes[row['dish_id']]['price'],
+                'section': dishes[row['dish_id']].get('section') or ''})
+            self.tables['cart_item'].delete(row['id'])
+        user = self.tables['users'].rows.get(p_user_id)
+        if user:
+            user['points'] += order['points_earned']
+        return [copy.copy(order)]
+
+    def _apply_order(self, order, sign):
+        day = _day(order['created_at'])
+        daily = self.tables['revenue_daily_rollup'].rows.setdefault(
+            day, {'day': day, 'order_count': 0, 'revenue': 0.0})
+        daily['order_count'] += sign
+        daily['revenue'] += sign * order['total']
+        by_dish = self.tables['revenue_dish_rollup'].rows
+        items = self.tables['order_item']
+        for key in items.indexes['order_id'].get(order['id'], ()):
+            item = items.rows[key]
+            section = item.get('section') or ''
+            entry = by_dish.setdefault((day, item['dish_id'], section), {
+                'id': (day, item['dish_id'], section), 'day': day, 'dish_id': item['dish_id'],
+                'section': section, 'quantity': 0, 'revenue': 0.0})
+            entry['quantity'] += sign * item['quantity']
+            entry['revenue'] += sign * item['quantity'] * item['price']
+
+    def _rpc_set_order_status(self, p_order_id, p_status):
+        order = self.tables['order'].rows.get(p_order_id)
+        if order is None:
+            return False
+        old_status, order['status'] = order['status'], p_status
+        if p_status == 'delivered' and old_status != 'delivered':
+            self._apply_order(order, 1)
+        elif old_status == 'delivered' and p_status != 'delivered':
+            self._apply_order(order, -1)
+        return True
+
+    def _rpc_create_review(self, p_user_id, p_dish_id, p_rating, p_review_text=None):
+        row = {**self.defaults('review'), 'user_id': p_user_id, 'dish_id': p_dish_id,
+               'rating': p_rating, 'review_text': p_review_text}
+        self.tables['review'].insert(row)
+        stats = self.tables['dish_rating_stats'].rows.setdefault(
+            p_dish_id, {'dish_id': p_dish_id, 'review_count': 0, 'rating_sum': 0})
+        stats['review_count'] += 1
+        stats['rating_sum'] += p_rating
+        return [copy.copy(row)]
+
+    def _daily_rows(self, start=None, end=None):
+        return [row for day, row in sorted(self.tables['revenue_daily_rollup'].rows.items())
+                if (start is None or day >= start) and (end is None or day <= end)]
+
+    def _rpc_revenue_total(self, p_start=None, p_end=None):
+        return sum(row['revenue'] for row in self._daily_rows(_day_param(p_start), _day_param(p_end)))
+
+    def _rpc_revenue_by_dish(self, p_start=None, p_end=None):
+        start, end = _day_param(p_start), _day_param(p_end)
+        dishes, totals = self.tables['dish'].rows, defaultdict(float)
+        for row in self.tables['revenue_dish_rollup'].rows.values():
+            if (start is None or row['day'] >= start) and (end is None or row['day'] <= end):
+                totals[dishes[row['dish_id']]['name']] += row['revenue']
+        return [{'dish_name': name, 'revenue': revenue}
+                for name, revenue in sorted(totals.items(), key=lambda item: -item[1])]
+
+    def _rpc_revenue_daily(self, p_start):
+        return [{'day': row['day'], 'revenue': row['revenue']}
+                for row in self._daily_rows(_day_param(p_start))]
+
+    def _rpc_revenue_monthly(self, p_start):
+        totals = defaultdict(float)
+        for row in self._daily_rows(_day_param(p_start)):
+            totals[row['day'][:7]] += row['revenue']
+        return [{'month': month, 'revenue': revenue} for month, revenue in sorted(totals.items())]
+
+    def _rpc_rebuild_revenue_rollups(self, p_start, p_end):
+        for name in ('revenue_daily_rollup', 'revenue_dish_rollup'):
+            rows = self.tables[name].rows
+            for key in [key for key, row in rows.items() if p_start <= row['day'] <= p_end]:
+                del rows[key]
+        counted = 0
+        for order in self.tables['order'].rows.values():
+            if order['status'] == 'delivered' and p_start <= _day(order['created_at']) <= p_end:
+                self._apply_order(order, 1)
+                counted += 1
+        return counted
+
+    # Seeding
+
+    def seed(self, orders, users=None, dishes=60, days=365, reviews=None):
+        """Fill the tables with deterministic data and build the aggregates.
+
+        Orders have one item each and are spread over the last `days` days;
+        about 80% are delivered and counted in the revenue rollups.
+        """
+        rng = self.random
+        users = users or max(100, min(orders // 20, 50000))
+        reviews = orders // 20 if reviews is None else reviews
+        now = datetime.now(timezone.utc)
+
+        def ident(kind, number):
+            return str(uuid.UUID(int=(kind << 96) | number))
+
+        user_ids = []
+        for number in range(users):
+            user_id = ident(1, number)
+            user_ids.append(user_id)
+            self.tables['users'].insert({
+                'id': user_id, 'auth_user_id': None, 'username': f'user{number}',
+                'email': f'user{number}@example.com', 'password': None,
+                'is_admin': number == 0, 'points': 0, 'created_at': now.isoformat()})
+        dish_rows = []
+        for number in range(dishes):
+            dish = {'id': ident(2, number), 'name': f'Dish {number}',
+                    'price': round(rng.uniform(2, 30), 2), 'description': f'Dish number {number}',
+                    'image_filename': None, 'section': SECTIONS[number % len(SECTIONS)],
+                    'is_archived': False, 'created_at': now.isoformat()}
+            dish_rows.append(dish)
+            self.tables['dish'].insert(dish)
+        statuses = ['delivered'] * 8 + ['pending', 'cancelled']
+        for number in range(orders):
+            dish = dish_rows[rng.randrange(dishes)]
+            quantity = rng.randint(1, 3)
+            created_at = (now - timedelta(seconds=rng.randrange(days * 86400))).isoformat()
+            order = {'id': ident(3, number), 'user_id': user_ids[rng.randrange(users)],
+                     'phone_number': None, 'total': round(dish['price'] * quantity, 2),
+                     'status': statuses[rng.randrange(len(statuses))],
+                     'points_earned': int(dish['price'] * quantity), 'created_at': created_at}
+            self.tables['order'].insert(order)
+            self.tables['order_item'].insert({
+                'id': ident(4, number), 'order_id': order['id'], 'dish_id': dish['id'],
+                'quantity': quantity, 'price': dish['price'], 'section': dish['section'],
+                'created_at': created_at})
+            if order['status'] == 'delivered':
+                self._apply_order(order, 1)
+        for number in range(reviews):
+            dish_id = dish_rows[rng.randrange(dishes)]['id']
+            rating = rng.randint(1, 5)
+            self.tables['review'].insert({
+                'id': ident(5, number), 'user_id': user_ids[rng.randrange(users)],
+                'dish_id': dish_id, 'rating': rating, 'review_text': 'Seeded review',
+                'created_at': (now - timedelta(seconds=rng.randrange(days * 86400))).isoformat()})
+            stats = self.tables['dish_rating_stats'].rows.setdefault(
+                dish_id, {'dish_id': dish_id, 'review_count': 0, 'rating_sum': 0})
+            stats['review_count'] += 1
+            stats['rating_sum'] += rating
+        return {'users': users, 'dishes': dishes, 'orders': orders, 'reviews': reviews}
@@ -0,0 +1,131 @@
+"""
+Replay recorded traffic (see db_recorder.py) through main.app offline.
+Each recorded request is re-issued through the test client as the recorded
+user, and every db.py call it makes is answered from the recording instead
+of a database, sleeping the recorded latency (scaled by --latency-scale).
+
+    DB_RECORD_PATH=recordings/db-{pid}.jsonl gunicorn ...    # capture
+    python benchmarks/replay_db.py recordings/*.jsonl --profile replay.prof
+
+--speed 1 keeps the recorded arrival times; the default replays back to back.
+"""
+import argparse
+import cProfile
+import json
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import db_recorder  # noqa: E402
+from db_recorder import ReplayQueue  # noqa: E402
+
+BASE_URL = 'https://localhost'  # session cookies are Secure-only
+
+
+def load_app():
+    """Import main with no backend configured; db.py is answered by the replay"""
+    os.environ.update({
+        'DATA_BACKEND': 'sqlalchemy',
+        'DATABASE_URL': 'sqlite://',
+        'SECRET_KEY': 'replay',
+        'METRICS_ENABLED': 'false',
+        'DB_RECORD_PATH': '',
+    })
+    import main
+    main.app.config.update(WTF_CSRF_ENABLED=False)
+    return main
+
+
+def replay(app, records, speed=0.0):
+    client = app.test_client()
+    timings = defaultdict(list)
+    mismatches = defaultdict(int)
+    current_user = None
+    started, first_ts = time.perf_counter(), records[0]['ts'] if records else 0
+    for record in records:
+        if speed:
+            delay = (record['ts'] - first_ts) / speed - (time.perf_counter() - started)
+            if delay > 0:
+                time.sleep(delay)
+        if record.get('user_id') != current_user:
+            current_user = record.get('user_id')
+            with client.session_transaction(base_url=BASE_URL) as session:
+                session.clear()
+                if current_user:
+                    session['_user_id'] = current_user
+                    session['_fresh'] = True
+        path = record['path'] + (f"?{record['query']}" if record.get('query') else '')
+        start = time.perf_counter()
+        response = client.open(path, method=record['method'], data=record.get('form'),
+                               base_url=BASE_URL,
+                               environ_base={'db_replay.calls': ReplayQueue(record['calls'])})
+        elapsed = time.perf_counter() - start
+        response.close()
+        endpoint = record.get('endpoint') or record['path']
+        timings[endpoint].append(elapsed)
+        if response.status_code != record.get('status'):
+            mismatches[endpoint] += 1
+    return timings, mismatches
+
+
+def summarize(timings, mismatches, replay_state):
+    endpoints = {}
+    for endpoint, samples in sorted(timings.items()):
+        ordered = sorted(samples)
+        endpoints[endpoint] = {
+            'requests': len(samples),
+            'p50_ms': round(statistics.median(ordered) * 1000, 3),
+            'p99_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000, 3),
+            'status_mismatches': mismatches.get(endpoint, 0),
+        }
+    return {
+        'requests': sum(len(samples) for samples in timings.values()),
+        'calls': {
+            'matched': replay_state.matched,
+            'fallbacks': replay_state.fallbacks,
+            'passthrough': replay_state.passthrough,
+        },
+        'endpoints': endpoints,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('recordings', nargs='+', help='.jsonl or .msgpack recordings')
+    parser.add_argument('--speed', type=float, default=0.0,
+                        help='replay speed relative to the recording (0: back to back)')
+    parser.add_argument('--latency-scale', type=float, default=1.0,
+                        help='multiplier for recorded call latency (0: no sleeping)')
+    parser.add_argument('--limit', type=int, help='replay only the first N requests')
+    parser.add_argument('--profile', help='write cProfile stats for the replay here')
+    parser.add_argument('--output', help='write the JSON summary here (default: stdout)')
+    args = parser.parse_args(argv)
+
+    replay_state = db_recorder.start_replay(args.latency_scale)
+    app_module = load_app()
+    records = replay_state.load(args.recordings)[:args.limit]
+    print(f'replaying {len(records)} requests...', file=sys.stderr)
+
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+    timings, mismatches = replay(app_module.app, records, args.speed)
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+
+    output = json.dumps(summarize(timings, mismatches, replay_state), indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
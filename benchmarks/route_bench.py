@@ -0,0 +1,228 @@
+"""
+Route-level benchmark: boots main.app against benchmarks/fake_supabase.py
+(no network) and measures latency percentiles, throughput and PostgREST
+round trips per request for the main pages at several seeded order counts.
+
+    python benchmarks/route_bench.py --sizes 1000,100000 --latency-ms 2 \
+        --output bench.json [--compare previous.json]
+
+The JSON report is stable across runs with the same settings, so reports
+from two commits can be diffed or passed to --compare.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_supabase import FakeSupabase, RoundTripCounter  # noqa: E402
+
+BASE_URL = 'https://localhost'  # session cookies are Secure-only
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                    cwd=ROOT, capture_output=True, text=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def use_fake_supabase(fake):
+    """Make db.py create the stand-in for both Supabase clients; call before
+    anything imports db"""
+    os.environ.update({
+        'DATA_BACKEND': 'supabase',
+        'SUPABASE_URL': 'http://fake-supabase.invalid',
+        'SUPABASE_ANON_KEY': 'fake-anon-key',
+        'SUPABASE_SERVICE_ROLE_KEY': 'fake-service-key',
+        'DATABASE_URL': 'sqlite://',
+        'SECRET_KEY': 'benchmark',
+        'METRICS_ENABLED': 'false',
+        'QUERY_WATCH': 'false',
+        'DB_DEBUG_HEADERS': 'false',
+    })
+    import supabase
+    supabase.create_client = lambda url, key, *args, **kwargs: fake
+
+
+def load_app(fake):
+    """Import main with both Supabase clients replaced by the stand-in"""
+    use_fake_supabase(fake)
+    import main
+    main.app.config.update(WTF_CSRF_ENABLED=False, TESTING=False)
+    return main
+
+
+class Scenario:
+    """One benchmarked route: a request plus optional untimed per-iteration setup"""
+
+    def __init__(self, name, method, path, setup=None, data=None):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.setup = setup
+        self.data = data
+
+
+def build_scenarios(main, user_id, dish_id):
+    def refill_cart():
+        with main.app.app_context():
+            main.cart_store.add_item(user_id, dish_id, 1)
+            main.cart_store.flush(user_id)
+
+    return [
+        Scenario('/', 'GET', '/'),
+        Scenario('/menu', 'GET', '/menu'),
+        Scenario('/cart', 'GET', '/cart', setup=refill_cart),
+        Scenario('/checkout', 'POST', '/checkout', setup=refill_cart, data={'discount': '0'}),
+        Scenario('/dish/<id>', 'GET', f'/dish/{dish_id}'),
+        Scenario('/admin/revenue', 'GET', '/admin/revenue'),
+    ]
+
+
+def run_scenario(client, scenario, iterations, warmup):
+    timings, round_trips, statuses = [], [], {}
+    for iteration in range(warmup + iterations):
+        if scenario.setup:
+            scenario.setup()
+        counter = RoundTripCounter()
+        start = time.perf_counter()
+        response = client.open(scenario.path, method=scenario.method, data=scenario.data,
+                               base_url=BASE_URL, environ_base={'bench.round_trips': counter})
+        elapsed = time.perf_counter() - start
+        response.close()
+        if iteration < warmup:
+            continue
+        timings.append(elapsed)
+        round_trips.append(counter.count)
+        statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+    total = sum(timings)
+    return {
+        'p50_ms': round(_percentile(timings, 50) * 1000, 3),
+        'p99_ms': round(_percentile(timings, 99) * 1000, 3),
+        'mean_ms': round(total / len(timings) * 1000, 3),
+        'throughput_rps': round(len(timings) / total, 1) if total else None,
+        'round_trips': {
+            'median': statistics.median(round_trips),
+            'max': max(round_trips),
+        },
+        'status': statuses,
+    }
+
+
+def run_size(main, fake, orders, args):
+    for table in fake.tables.values():
+        table.rows.clear()
+        for index in table.indexes.values():
+            index.clear()
+    main.menu_snapshot.invalidate()
+    main.user_cache.invalidate()
+    started = time.perf_counter()
+    seeded = fake.seed(orders, dishes=args.dishes)
+    seed_seconds = time.perf_counter() - started
+    gc.collect()
+
+    admin_id = next(iter(fake.tables['users'].rows))
+    dish_id = next(iter(fake.tables['dish'].rows))
+    client = main.app.test_client()
+    with client.session_transaction(base_url=BASE_URL) as session:
+        session['_user_id'] = admin_id
+        session['_fresh'] = True
+
+    results = {}
+    for scenario in build_scenarios(main, admin_id, dish_id):
+        results[scenario.name] = run_scenario(client, scenario, args.iterations, args.warmup)
+        if set(results[scenario.name]['status']) != {'200'}:
+            print(f'warning: {scenario.name} returned {results[scenario.name]["status"]}',
+                  file=sys.stderr)
+    return {'seeded': seeded, 'seed_seconds': round(seed_seconds, 1), 'routes': results}
+
+
+def compare(previous, current):
+    """Print p50/p99/round-trip changes between two reports"""
+    print(f'{"size":>8} {"route":<16} {"p50 ms":>18} {"p99 ms":>18} {"round trips":>12}')
+    for size, result in current['results'].items():
+        before = previous['results'].get(size, {}).get('routes', {})
+        for route, now in result['routes'].items():
+            then = before.get(route)
+            if then is None:
+                continue
+
+            def delta(key):
+                old, new = then[key], now[key]
+                change = f'{(new - old) / old * 100:+.0f}%' if old else 'n/a'
+                return f'{old:.1f}->{new:.1f} {change}'
+            trips = f'{then["round_trips"]["median"]}->{now["round_trips"]["median"]}'
+            print(f'{size:>8} {route:<16} {delta("p50_ms"):>18} {delta("p99_ms"):>18} {trips:>12}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1000,100000,1000000',
+                        help='comma-separated order counts to seed')
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--latency-ms', type=float, default=2.0,
+                        help='simulated PostgREST latency per round trip')
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--dishes', type=int, default=60)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the JSON report here (default: stdout)')
+    parser.add_argument('--compare', help='earlier JSON report to compare against')
+    args = parser.parse_args(argv)
+
+    fake = FakeSupabase(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, seed=args.seed)
+    app_module = load_app(fake)
+    commit, dirty = _git_commit()
+    report = {
+        'meta': {
+            'commit': commit,
+            'dirty': dirty,
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'latency_ms': args.latency_ms,
+            'jitter_ms': args.jitter_ms,
+            'iterations': args.iterations,
+            'warmup': args.warmup,
+            'dishes': args.dishes,
+            'seed': args.seed,
+            'note': 'single sequential client; throughput_rps = iterations / total time',
+        },
+        'results': {},
+    }
+    for size in (int(size) for size in args.sizes.split(',')):
+        print(f'benchmarking {size} orders...', file=sys.stderr)
+        report['results'][str(size)] = run_size(app_module, fake, size, args)
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+"""
+Cart store: the active cart of each user lives in Redis (REDIS_URL) or, when
+Redis is not configured, in process memory, and is written behind to the
+cart_item table.
+Viewing and editing a cart is served from the store without touching the
+database. Changed carts are copied to cart_item by a background flusher via
+db.replace_cart, and checkout flushes synchronously first so checkout_cart
+sees the latest contents. The flusher thread starts with the first cart
+change, so CLI commands and scripts that import the app never run it.
+The in-process fallback is only consistent with a single worker; use Redis
+when running several.
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+import db as db_api
+
+logger = logging.getLogger(__name__)
+
+CART_TTL = int(os.environ.get('CART_TTL', 24 * 60 * 60))
+CART_FLUSH_INTERVAL = float(os.environ.get('CART_FLUSH_INTERVAL', 1))
+
+
+class LocalCartBackend:
+    """Per-process cart storage used when REDIS_URL is not set"""
+
+    def __init__(self, ttl=CART_TTL):
+        self.ttl = ttl
+        self._carts = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._user_locks = defaultdict(threading.Lock)
+
+    def load(self, user_id):
+        entry = self._carts.get(user_id)
+        if entry is None:
+            return None
+        items, expires_at = entry
+        if time.monotonic() >= expires_at and user_id not in self._dirty:
+            self._carts.pop(user_id, None)
+            return None
+        return copy.deepcopy(items)
+
+    def save(self, user_id, items):
+        self._carts[user_id] = (copy.deepcopy(items), time.monotonic() + self.ttl)
+
+    def mark_dirty(self, user_id):
+        with self._lock:
+            self._dirty.add(user_id)
+
+    def discard_dirty(self, user_id):
+        with self._lock:
+            self._dirty.discard(user_id)
+
+    def pop_dirty(self):
+        with self._lock:
+            return self._dirty.pop() if self._dirty else None
+
+    def lock(self, user_id):
+        with self._lock:
+            return self._user_locks[user_id]
+
+
+class RedisCartBackend:
+    """Cart storage shared by all workers through Redis"""
+
+    DIRTY_KEY = 'cart:dirty'
+
+    def __init__(self, redis_url, ttl=CART_TTL):
+        import redis
+
+        self.ttl = ttl
+        self._redis = redis.Redis.from_url(redis_url)
+
+    def load(self, user_id):
+        raw = self._redis.get(f'cart:{user_id}')
+        return json.loads(raw) if raw is not None else None
+
+    def save(self, user_id, items):
+        self._redis.set(f'cart:{user_id}', json.dumps(items), ex=self.ttl)
+
+    def mark_dirty(self, user_id):
+        self._redis.sadd(self.DIRTY_KEY, user_id)
+
+    def discard_dirty(self, user_id):
+        self._redis.srem(self.DIRTY_KEY, user_id)
+
+    def pop_dirty(self):
+        user_id = self._redis.spop(self.DIRTY_KEY)
+        return user_id.decode() if user_id is not None else None
+
+    def lock(self, user_id):
+        return self._redis.lock(f'cart:lock:{user_id}', timeout=10, blocking_timeout=5)
+
+
+class CartStore:
+    """Write-behind cart cache.
+
+    Carts are stored as {dish_id: {'id', 'dish_id', 'quantity'}} and loaded
+    from cart_item the first time a user's cart is needed.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self._app = None
+        self._flusher = None
+        self._flusher_lock = threading.Lock()
+
+    def init_app(self, app):
+        if self.backend is None:
+            redis_url = app.config.get('REDIS_URL') or os.environ.get('REDIS_URL')
+            self.backend = RedisCartBackend(redis_url) if redis_url else LocalCartBackend()
+        self._app = app
+
+    def _start_flusher(self):
+        if self._flusher is not None:
+            return
+        with self._flusher_lock:
+            if self._flusher is None:
+                flusher = threading.Thread(
+                    target=self._flush_loop, name='cart-flusher', daemon=True)
+                flusher.start()
+                self._flusher = flusher
+                atexit.register(self.flush_all)
+
+    # Reads and edits (no database round trips once the cart is loaded)
+
+    def _items(self, user_id):
+        items = self.backend.load(user_id)
+        if items is None:
+            items = {row['dish_id']: {'id': row['id'], 'dish_id': row['dish_id'], 'quantity': row['quantity']}
+                     for row in db_api.get_cart_items(user_id)}
+            self.backend.save(user_id, items)
+        return items
+
+    def _mark_dirty(self, user_id):
+        self.backend.mark_dirty(user_id)
+        self._start_flusher()
+
+    def _changed(self, user_id, items):
+        self.backend.save(user_id, items)
+        self._mark_dirty(user_id)
+
+    def get_cart(self, user_id: str) -> List[Dict[str, Any]]:
+        """Cart rows shaped like db.get_cart_items, with dishes from the menu snapshot"""
+        user_id = str(user_id)
+        items = self._items(user_id)
+        rows, stale = [], []
+        for dish_id, item in items.items():
+            dish = db_api.get_menu_dish(dish_id)
+            if dish:
+                rows.append({**item, 'user_id': user_id, 'dish': dish})
+            else:
+                stale.append(item['id'])  # archived since it was added
+        # If nothing resolved the menu itself may be unavailable; only hide
+        # the items then (replace_cart skips archived dishes anyway)
+        if rows:
+            for cart_item_id in stale:
+                self.remove_item(user_id, cart_item_id)
+        return rows
+
+    def add_item(self, user_id: str, dish_id: str, quantity: int = 1) -> Optional[Dict[str, Any]]:
+        """Add a dish to the cart or increase its quantity"""
+        user_id, dish_id = str(user_id), str(dish_id)
+        with self.backend.lock(user_id):
+            items = self._items(user_id)
+            item = items.setdefault(dish_id, {'id': str(uuid.uuid4()), 'dish_id': dish_id, 'quantity': 0})
+            item['quantity'] += quantity
+            self._changed(user_id, items)
+            return dict(item)
+
+    def update_item(self, user_id: str, cart_item_id: str, quantity: int) -> bool:
+        """Set the quantity of a cart item; zero or less removes it"""
+        user_id = str(user_id)
+        with self.backend.lock(user_id):
+            items = self._items(user_id)
+            for dish_id, item in items.items():
+                if item['id'] == cart_item_id:
+                    if quantity <= 0:
+                        del items[dish_id]
+                    else:
+                        item['quantity'] = quantity
+                    self._changed(user_id, items)
+                    return True
+            return False
+
+    def remove_item(self, user_id: str, cart_item_id: str) -> bool:
+        """Remove an item from the cart"""
+        return self.update_item(user_id, cart_item_id, 0)
+
+    # Write-behind
+
+    def _flush_locked(self, user_id):
+        self.backend.discard_dirty(user_id)
+        items = self.backend.load(user_id)
+        if items is None:
+            return True  # nothing cached; cart_item is already authoritative
+        if db_api.replace_cart(user_id, list(items.values())):
+            return True
+        self._mark_dirty(user_id)
+        return False
+
+    def flush(self, user_id: str) -> bool:
+        """Write a user's cart to cart_item now"""
+        user_id = str(user_id)
+        with self.backend.lock(user_id):
+            return self._flush_locked(user_id)
+
+    def checkout(self, user_id: str, checkout_fn: Callable[[], Optional[Dict[str, Any]]]):
+        """Flush the cart, run checkout_fn and empty the cart if it succeeded.
+
+        Returns what checkout_fn returned (see db.checkout_cart: the order,
+        {} for an empty cart, None on failure), or None if the flush failed.
+        Holding the user's lock throughout keeps the background flusher from
+        writing the pre-checkout cart back after checkout cleared it.
+        """
+        user_id = str(user_id)
+        with self.backend.lock(user_id):
+            if not self._flush_locked(user_id):
+                return None
+            result = checkout_fn()
+            if result:
+                self.backend.save(user_id, {})
+            return result
+
+    def flush_all(self):
+        """Flush every dirty cart (used at shutdown)"""
+        if self._app is None:
+            return
+        with self._app.app_context():
+            while True:
+                user_id = self.backend.pop_dirty()
+                if user_id is None:
+                    return
+                if not self.flush(user_id):
+                    return
+
+    def _flush_loop(self):
+        while True:
+            try:
+                user_id = self.backend.pop_dirty()
+                if user_id is None:
+                    time.sleep(CART_FLUSH_INTERVAL)
+                    continue
+                with self._app.app_context():
+                    if not self.flush(user_id):
+                        time.sleep(CART_FLUSH_INTERVAL)
+            except Exception as e:
+                logger.error('Cart flush failed: %s', e)
+                time.sleep(CART_FLUSH_INTERVAL)
+
+
+cart_store = CartStore()
@@ -20,10 +20,19 @@ CREATE TABLE IF NOT EXISTS dish (
     price DECIMAL(10,2) NOT NULL,
     description TEXT,
     image_filename TEXT,
+    -- Resized copies of the upload by format and width (image_pipeline.py)
+    image_variants JSONB,
     section TEXT,
+    -- Archived dishes leave the menu but keep their order history
+    is_archived BOOLEAN NOT NULL DEFAULT FALSE,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Databases created before dishes could be archived
+ALTER TABLE dish ADD COLUMN IF NOT EXISTS is_archived BOOLEAN NOT NULL DEFAULT FALSE;
+-- Databases created before image variants
+ALTER TABLE dish ADD COLUMN IF NOT EXISTS image_variants JSONB;
+
 -- Orders table
 CREATE TABLE IF NOT EXISTS "order" (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -42,9 +51,17 @@ CREATE TABLE IF NOT EXISTS order_item (
     dish_id UUID NOT NULL REFERENCES dish(id) ON DELETE RESTRICT,
     quantity INTEGER DEFAULT 1,
     price DECIMAL(10,2) NOT NULL,
+    -- The dish's section when ordered; revenue rollups are keyed on it
+    section TEXT,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Databases created before order items kept their section
+ALTER TABLE order_item ADD COLUMN IF NOT EXISTS section TEXT;
+UPDATE order_item oi SET section = COALESCE(d.section, '')
+FROM dish d
+WHERE d.id = oi.dish_id AND oi.section IS NULL;
+
 -- Cart Items table
 CREATE TABLE IF NOT EXISTS cart_item (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -64,6 +81,29 @@ CREATE TABLE IF NOT EXISTS review (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Revenue rollups, maintained when orders are delivered (see set_order_status)
+CREATE TABLE IF NOT EXISTS revenue_daily_rollup (
+    day DATE PRIMARY KEY,
+    order_count INTEGER NOT NULL DEFAULT 0,
+    revenue DECIMAL(12,2) NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS revenue_dish_rollup (
+    day DATE NOT NULL,
+    dish_id UUID NOT NULL REFERENCES dish(id) ON DELETE CASCADE,
+    section TEXT NOT NULL DEFAULT '',
+    quantity INTEGER NOT NULL DEFAULT 0,
+    revenue DECIMAL(12,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, dish_id, section)
+);
+
+-- Per-dish rating aggregate, maintained by the create_review function
+CREATE TABLE IF NOT EXISTS dish_rating_stats (
+    dish_id UUID PRIMARY KEY REFERENCES dish(id) ON DELETE CASCADE,
+    review_count INTEGER NOT NULL DEFAULT 0,
+    rating_sum INTEGER NOT NULL DEFAULT 0
+);
+
 -- Disable Row Level Security for all tables (for development)
 ALTER TABLE users DISABLE ROW LEVEL SECURITY;
 ALTER TABLE dish DISABLE ROW LEVEL SECURITY;
@@ -71,6 +111,9 @@ ALTER TABLE "order" DISABLE ROW LEVEL SECURITY;
 ALTER TABLE order_item DISABLE ROW LEVEL SECURITY;
 ALTER TABLE cart_item DISABLE ROW LEVEL SECURITY;
 ALTER TABLE review DISABLE ROW LEVEL SECURITY;
+ALTER TABLE revenue_daily_rollup DISABLE ROW LEVEL SECURITY;
+ALTER TABLE revenue_dish_rollup DISABLE ROW LEVEL SECURITY;
+ALTER TABLE dish_rating_stats DISABLE ROW LEVEL SECURITY;
 
 -- Create policies to allow all operations (for development)
 CREATE POLICY "Allow all operations on users" ON users FOR ALL USING (true);
@@ -79,3 +122,348 @@ CREATE POLICY "Allow all operations on order" ON "order" FOR ALL USING (true);
 CREATE POLICY "Allow all operations on order_item" ON order_item FOR ALL USING (true);
 CREATE POLICY "Allow all operations on cart_item" ON cart_item FOR ALL USING (true);
 CREATE POLICY "Allow all operations on review" ON review FOR ALL USING (true);
+CREATE POLICY "Allow all operations on revenue_daily_rollup" ON revenue_daily_rollup FOR ALL USING (true);
+CREATE POLICY "Allow all operations on revenue_dish_rollup" ON revenue_dish_rollup FOR ALL USING (true);
+CREATE POLICY "Allow all operations on dish_rating_stats" ON dish_rating_stats FOR ALL USING (true);
+
+-- Indexes
+-- Merge duplicate cart rows, then allow one row per (user, dish) so
+-- add_to_cart can upsert; the index also serves lookups by user_id.
+UPDATE cart_item c SET quantity = d.total
+FROM (
+    SELECT (array_agg(id ORDER BY created_at, id))[1] AS keep_id, SUM(quantity) AS total
+    FROM cart_item GROUP BY user_id, dish_id HAVING COUNT(*) > 1
+) d
+WHERE c.id = d.keep_id;
+DELETE FROM cart_item c
+USING (
+    SELECT user_id, dish_id, (array_agg(id ORDER BY created_at, id))[1] AS keep_id
+    FROM cart_item GROUP BY user_id, dish_id HAVING COUNT(*) > 1
+) d
+WHERE c.user_id = d.user_id AND c.dish_id = d.dish_id AND c.id <> d.keep_id;
+CREATE UNIQUE INDEX IF NOT EXISTS cart_item_user_dish_key ON cart_item (user_id, dish_id);
+DROP INDEX IF EXISTS cart_item_user_id_idx;
+-- (created_at, id) keyset pagination for the admin order board, optionally by status
+CREATE INDEX IF NOT EXISTS order_created_at_id_idx ON "order" (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS order_status_created_at_id_idx ON "order" (status, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS order_item_order_id_idx ON order_item (order_id);
+-- Case-insensitive uniqueness; also serve the *_taken existence checks below.
+-- Creating these fails if existing rows already collide case-insensitively.
+CREATE UNIQUE INDEX IF NOT EXISTS users_username_lower_key ON users (lower(username));
+CREATE UNIQUE INDEX IF NOT EXISTS users_email_lower_key ON users (lower(email));
+-- Only active dishes need unique names, so an archived name can be reused
+DROP INDEX IF EXISTS dish_name_lower_key;
+CREATE UNIQUE INDEX IF NOT EXISTS dish_active_name_lower_key ON dish (lower(name)) WHERE NOT is_archived;
+
+-- Backfill the rating aggregate from existing reviews (safe to re-run)
+INSERT INTO dish_rating_stats (dish_id, review_count, rating_sum)
+SELECT dish_id, COUNT(*), SUM(rating)
+FROM review
+GROUP BY dish_id
+ON CONFLICT (dish_id) DO UPDATE SET
+    review_count = EXCLUDED.review_count,
+    rating_sum = EXCLUDED.rating_sum;
+
+-- Functions (called from db.py through supabase.rpc)
+
+-- Checkout: turn a user's cart into an order, clear the cart and credit points
+-- in one transaction. Returns the new order, or no rows when the cart is empty.
+CREATE OR REPLACE FUNCTION checkout_cart(
+    p_user_id UUID,
+    p_discount NUMERIC DEFAULT 0,
+    p_phone_number TEXT DEFAULT NULL
+)
+RETURNS SETOF "order"
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_total NUMERIC(10,2);
+    v_discount NUMERIC(10,2);
+    v_order "order";
+BEGIN
+    -- Lock the cart so a double-submitted checkout cannot order it twice
+    PERFORM 1 FROM cart_item WHERE user_id = p_user_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN;
+    END IF;
+
+    SELECT COALESCE(SUM(d.price * c.quantity), 0) INTO v_total
+    FROM cart_item c
+    JOIN dish d ON d.id = c.dish_id
+    WHERE c.user_id = p_user_id;
+
+    v_discount := LEAST(GREATEST(COALESCE(p_discount, 0), 0), v_total);
+
+    INSERT INTO "order" (user_id, phone_number, total, status, points_earned)
+    VALUES (p_user_id, p_phone_number, v_total - v_discount, 'pending',
+            FLOOR(v_total - v_discount)::INTEGER)  -- 1 point per dollar
+    RETURNING * INTO v_order;
+
+    INSERT INTO order_item (order_id, dish_id, quantity, price, section)
+    SELECT v_order.id, c.dish_id, c.quantity, d.price, COALESCE(d.section, '')
+    FROM cart_item c
+    JOIN dish d ON d.id = c.dish_id
+    WHERE c.user_id = p_user_id;
+
+    DELETE FROM cart_item WHERE user_id = p_user_id;
+
+    UPDATE users SET points = points + v_order.points_earned WHERE id = p_user_id;
+
+    RETURN NEXT v_order;
+END;
+$$;
+
+-- Revenue reporting: read the rollup tables so only summary rows are returned.
+-- Revenue counts delivered orders only; days and months are bucketed in UTC.
+CREATE OR REPLACE FUNCTION revenue_total(
+    p_start TIMESTAMPTZ DEFAULT NULL,
+    p_end TIMESTAMPTZ DEFAULT NULL
+)
+RETURNS NUMERIC
+LANGUAGE sql STABLE
+AS $$
+    SELECT COALESCE(SUM(revenue), 0)
+    FROM revenue_daily_rollup
+    WHERE (p_start IS NULL OR day >= (p_start AT TIME ZONE 'UTC')::DATE)
+      AND (p_end IS NULL OR day <= (p_end AT TIME ZONE 'UTC')::DATE);
+$$;
+
+DROP FUNCTION IF EXISTS revenue_by_dish();
+CREATE OR REPLACE FUNCTION revenue_by_dish(
+    p_start TIMESTAMPTZ DEFAULT NULL,
+    p_end TIMESTAMPTZ DEFAULT NULL
+)
+RETURNS TABLE (dish_name TEXT, revenue NUMERIC)
+LANGUAGE sql STABLE
+AS $$
+    SELECT d.name, SUM(r.revenue) AS revenue
+    FROM revenue_dish_rollup r
+    JOIN dish d ON d.id = r.dish_id
+    WHERE (p_start IS NULL OR r.day >= (p_start AT TIME ZONE 'UTC')::DATE)
+      AND (p_end IS NULL OR r.day <= (p_end AT TIME ZONE 'UTC')::DATE)
+    GROUP BY d.name
+    ORDER BY revenue DESC;
+$$;
+
+CREATE OR REPLACE FUNCTION revenue_daily(p_start TIMESTAMPTZ)
+RETURNS TABLE (day DATE, revenue NUMERIC)
+LANGUAGE sql STABLE
+AS $$
+    SELECT day, revenue
+    FROM revenue_daily_rollup
+    WHERE day >= (p_start AT TIME ZONE 'UTC')::DATE
+    ORDER BY day;
+$$;
+
+CREATE OR REPLACE FUNCTION revenue_monthly(p_start TIMESTAMPTZ)
+RETURNS TABLE (month TEXT, revenue NUMERIC)
+LANGUAGE sql STABLE
+AS $$
+    SELECT to_char(date_trunc('month', day), 'YYYY-MM') AS month, SUM(revenue)
+    FROM revenue_daily_rollup
+    WHERE day >= (p_start AT TIME ZONE 'UTC')::DATE
+    GROUP BY 1
+    ORDER BY 1;
+$$;
+
+-- Add (p_sign = 1) or remove (p_sign = -1) one order's contribution to the rollups
+CREATE OR REPLACE FUNCTION apply_order_to_revenue_rollups(p_order_id UUID, p_sign INTEGER)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    INSERT INTO revenue_daily_rollup (day, order_count, revenue)
+    SELECT (created_at AT TIME ZONE 'UTC')::DATE, p_sign, p_sign * total
+    FROM "order"
+    WHERE id = p_order_id
+    ON CONFLICT (day) DO UPDATE SET
+        order_count = revenue_daily_rollup.order_count + EXCLUDED.order_count,
+        revenue = revenue_daily_rollup.revenue + EXCLUDED.revenue;
+
+    -- Keyed on the section stored with each item, so removing an order
+    -- cancels exactly what adding it did even if the dish has moved since
+    INSERT INTO revenue_dish_rollup (day, dish_id, section, quantity, revenue)
+    SELECT (o.created_at AT TIME ZONE 'UTC')::DATE, oi.dish_id, COALESCE(oi.section, ''),
+           p_sign * SUM(oi.quantity), p_sign * SUM(oi.quantity * oi.price)
+    FROM order_item oi
+    JOIN "order" o ON o.id = oi.order_id
+    WHERE oi.order_id = p_order_id
+    GROUP BY 1, 2, 3
+    ON CONFLICT (day, dish_id, section) DO UPDATE SET
+        quantity = revenue_dish_rollup.quantity + EXCLUDED.quantity,
+        revenue = revenue_dish_rollup.revenue + EXCLUDED.revenue;
+$$;
+
+-- Change an order's status, keeping the revenue rollups in step when it
+-- enters or leaves 'delivered'. Returns false when the order does not exist.
+CREATE OR REPLACE FUNCTION set_order_status(p_order_id UUID, p_status TEXT)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_old_status TEXT;
+BEGIN
+    SELECT status INTO v_old_status FROM "order" WHERE id = p_order_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN FALSE;
+    END IF;
+
+    UPDATE "order" SET status = p_status WHERE id = p_order_id;
+
+    IF p_status = 'delivered' AND v_old_status IS DISTINCT FROM 'delivered' THEN
+        PERFORM apply_order_to_revenue_rollups(p_order_id, 1);
+    ELSIF v_old_status = 'delivered' AND p_status <> 'delivered' THEN
+        PERFORM apply_order_to_revenue_rollups(p_order_id, -1);
+    END IF;
+    RETURN TRUE;
+END;
+$$;
+
+-- Recompute the rollups for an inclusive range of days from the order history.
+-- Used by the backfill_revenue_rollups CLI command; returns the orders counted.
+CREATE OR REPLACE FUNCTION rebuild_revenue_rollups(p_start DATE, p_end DATE)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_from TIMESTAMPTZ := p_start::TIMESTAMP AT TIME ZONE 'UTC';
+    v_to TIMESTAMPTZ := (p_end + 1)::TIMESTAMP AT TIME ZONE 'UTC';
+    v_orders INTEGER;
+BEGIN
+    DELETE FROM revenue_daily_rollup WHERE day BETWEEN p_start AND p_end;
+    DELETE FROM revenue_dish_rollup WHERE day BETWEEN p_start AND p_end;
+
+    INSERT INTO revenue_daily_rollup (day, order_count, revenue)
+    SELECT (created_at AT TIME ZONE 'UTC')::DATE, COUNT(*), SUM(total)
+    FROM "order"
+    WHERE status = 'delivered' AND created_at >= v_from AND created_at < v_to
+    GROUP BY 1;
+
+    INSERT INTO revenue_dish_rollup (day, dish_id, section, quantity, revenue)
+    SELECT (o.created_at AT TIME ZONE 'UTC')::DATE, oi.dish_id, COALESCE(oi.section, ''),
+           SUM(oi.quantity), SUM(oi.quantity * oi.price)
+    FROM order_item oi
+    JOIN "order" o ON o.id = oi.order_id
+    WHERE o.status = 'delivered' AND o.created_at >= v_from AND o.created_at < v_to
+    GROUP BY 1, 2, 3;
+
+    SELECT COALESCE(SUM(order_count), 0) INTO v_orders
+    FROM revenue_daily_rollup
+    WHERE day BETWEEN p_start AND p_end;
+    RETURN v_orders;
+END;
+$$;
+
+-- Insert a review and fold its rating into dish_rating_stats in one transaction
+CREATE OR REPLACE FUNCTION create_review(
+    p_user_id UUID,
+    p_dish_id UUID,
+    p_rating INTEGER,
+    p_review_text TEXT DEFAULT NULL
+)
+RETURNS SETOF review
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_review review;
+BEGIN
+    INSERT INTO review (user_id, dish_id, rating, review_text)
+    VALUES (p_user_id, p_dish_id, p_rating, p_review_text)
+    RETURNING * INTO v_review;
+
+    INSERT INTO dish_rating_stats (dish_id, review_count, rating_sum)
+    VALUES (p_dish_id, 1, p_rating)
+    ON CONFLICT (dish_id) DO UPDATE SET
+        review_count = dish_rating_stats.review_count + 1,
+        rating_sum = dish_rating_stats.rating_sum + EXCLUDED.rating_sum;
+
+    RETURN NEXT v_review;
+END;
+$$;
+
+-- Case-insensitive existence checks for registration, profile and dish forms.
+-- p_exclude_id skips the row being edited.
+CREATE OR REPLACE FUNCTION username_taken(p_username TEXT, p_exclude_id UUID DEFAULT NULL)
+RETURNS BOOLEAN
+LANGUAGE sql STABLE
+AS $$
+    SELECT EXISTS (
+        SELECT 1 FROM users
+        WHERE lower(username) = lower(p_username)
+          AND (p_exclude_id IS NULL OR id <> p_exclude_id)
+    );
+$$;
+
+CREATE OR REPLACE FUNCTION email_taken(p_email TEXT, p_exclude_id UUID DEFAULT NULL)
+RETURNS BOOLEAN
+LANGUAGE sql STABLE
+AS $$
+    SELECT EXISTS (
+        SELECT 1 FROM users
+        WHERE lower(email) = lower(p_email)
+          AND (p_exclude_id IS NULL OR id <> p_exclude_id)
+    );
+$$;
+
+CREATE OR REPLACE FUNCTION dish_name_taken(p_name TEXT, p_exclude_id UUID DEFAULT NULL)
+RETURNS BOOLEAN
+LANGUAGE sql STABLE
+AS $$
+    SELECT EXISTS (
+        SELECT 1 FROM dish
+        WHERE lower(name) = lower(p_name)
+          AND NOT is_archived
+          AND (p_exclude_id IS NULL OR id <> p_exclude_id)
+    );
+$$;
+
+-- Add a dish to a cart, or bump its quantity, in one race-free statement
+CREATE OR REPLACE FUNCTION add_to_cart(p_user_id UUID, p_dish_id UUID, p_quantity INTEGER DEFAULT 1)
+RETURNS SETOF cart_item
+LANGUAGE sql
+AS $$
+    INSERT INTO cart_item (user_id, dish_id, quantity)
+    VALUES (p_user_id, p_dish_id, p_quantity)
+    ON CONFLICT (user_id, dish_id)
+    DO UPDATE SET quantity = cart_item.quantity + EXCLUDED.quantity
+    RETURNING *;
+$$;
+
+-- Overwrite a user's cart with the cart store's copy (write-behind from
+-- cart_store.py). Items for dishes archived in the meantime are skipped.
+CREATE OR REPLACE FUNCTION replace_cart(p_user_id UUID, p_items JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    DELETE FROM cart_item WHERE user_id = p_user_id;
+
+    INSERT INTO cart_item (id, user_id, dish_id, quantity)
+    SELECT i.id, p_user_id, i.dish_id, i.quantity
+    FROM jsonb_to_recordset(p_items) AS i(id UUID, dish_id UUID, quantity INTEGER)
+    JOIN dish d ON d.id = i.dish_id AND NOT d.is_archived
+    WHERE i.quantity > 0;
+
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+    RETURN v_count;
+END;
+$$;
+
+-- Soft-delete a dish: hide it from the menu and drop it from carts in one
+-- transaction. Order items, reviews and revenue rollups are kept.
+CREATE OR REPLACE FUNCTION archive_dish(p_dish_id UUID)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE dish SET is_archived = TRUE
+    WHERE id = p_dish_id AND NOT is_archived;
+    IF NOT FOUND THEN
+        RETURN FALSE;
+    END IF;
+
+    DELETE FROM cart_item WHERE dish_id = p_dish_id;
+    RETURN TRUE;
+END;
+$$;
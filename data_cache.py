@@ -0,0 +1,155 @@
+"""
+In-process caches for the data-access layer.
+These caches are per worker process; writes made through db.py invalidate the
+local copy immediately and other workers catch up when their TTL expires.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from parallel import bind_context
+
+logger = logging.getLogger(__name__)
+
+MENU_CACHE_TTL = int(os.environ.get('MENU_CACHE_TTL', 60))
+# Wait this long before retrying a failed background menu refresh
+MENU_REFRESH_RETRY = float(os.environ.get('MENU_REFRESH_RETRY', 5))
+USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 30))
+
+
+class MenuSnapshot:
+    """Versioned snapshot of the dish list.
+
+    The version counter is bumped on every invalidation so callers can use it
+    as a cheap cache key for anything derived from the menu. Once loaded, an
+    expired snapshot keeps being served while one background thread reloads
+    it, and a failed reload keeps the last good menu.
+    """
+
+    def __init__(self, ttl=MENU_CACHE_TTL):
+        self.ttl = ttl
+        self.version = 0
+        # (dishes, dishes_by_id, digest) swapped as one tuple so readers
+        # never see a half-updated set
+        self._data = None
+        self._loaded_at = 0.0
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    def is_fresh(self):
+        return self._data is not None and (time.monotonic() - self._loaded_at) < self.ttl
+
+    def _load(self, loader):
+        version = self.version
+        dishes = loader()
+        digest = hashlib.sha1(json.dumps(
+            dishes, sort_keys=True, default=str).encode()).hexdigest()
+        data = (dishes, {dish['id']: dish for dish in dishes}, digest)
+        # Drop the result if a write invalidated us mid-load
+        if version == self.version:
+            self._data = data
+            self._loaded_at = time.monotonic()
+        return data
+
+    def _refresh(self, loader):
+        try:
+            self._load(loader)
+        except Exception as e:
+            logger.error('Refreshing menu snapshot failed, serving the previous menu: %s', e)
+            self._retry_at = time.monotonic() + MENU_REFRESH_RETRY
+        finally:
+            self._lock.release()
+
+    def _current(self, loader):
+        data = self._data
+        if data is not None:
+            if not self.is_fresh() and time.monotonic() >= self._retry_at \
+                    and self._lock.acquire(blocking=False):
+                # Stale-while-revalidate; the thread releases the lock
+                try:
+                    threading.Thread(target=bind_context(self._refresh), args=(loader,),
+                                     name='menu-refresh', daemon=True).start()
+                except Exception as e:
+                    # No thread will release it; keep serving and retry later
+                    self._lock.release()
+                    self._retry_at = time.monotonic() + MENU_REFRESH_RETRY
+                    logger.error('Starting menu snapshot refresh failed: %s', e)
+            return data
+        with self._lock:
+            data = self._data
+            if data is None:
+                data = self._load(loader)
+        return data
+
+    def get(self, loader):
+        """Return a copy of the cached dishes, calling loader() when empty.
+
+        Exceptions raised by a loader() call made here propagate and nothing
+        is cached, so a failed first fetch is retried on the next call.
+        """
+        dishes, _, _ = self._current(loader)
+        # Hand out copies: views decorate dish dicts (ratings, image urls)
+        return [dict(dish) for dish in dishes]
+
+    def get_dish(self, loader, dish_id):
+        """Return a copy of one cached dish, or None if it is not on the menu"""
+        _, by_id, _ = self._current(loader)
+        dish = by_id.get(str(dish_id))
+        return dict(dish) if dish else None
+
+    def digest(self, loader):
+        """Content digest of the cached dishes; the same in every worker
+        holding the same menu, unlike the per-process version counter"""
+        return self._current(loader)[2]
+
+    def invalidate(self):
+        # Not taken under the lock so writers never wait on an in-flight load;
+        # the version check in _current() discards that load instead.
+        self.version += 1
+        self._data = None
+        self._loaded_at = 0.0
+
+
+class TTLCache:
+    """Keyed cache of row dicts whose entries expire after `ttl` seconds.
+
+    Holds at most `maxsize` entries; the oldest entry is dropped first.
+    """
+
+    def __init__(self, ttl, maxsize=1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return a copy of the cached row, or None when missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        row, expires_at = entry
+        if time.monotonic() >= expires_at:
+            self._entries.pop(key, None)
+            return None
+        return dict(row)
+
+    def set(self, key, row):
+        with self._lock:
+            self._entries.pop(key, None)
+            if len(self._entries) >= self.maxsize:
+                self._entries.pop(next(iter(self._entries)), None)
+            self._entries[key] = (dict(row), time.monotonic() + self.ttl)
+
+    def invalidate(self, key=None):
+        """Drop one entry, or everything when no key is given"""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+
+menu_snapshot = MenuSnapshot()
+user_cache = TTLCache(USER_CACHE_TTL)
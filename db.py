@@ -1,22 +1,39 @@
 import os
+import sys
 from supabase import create_client, Client
 from dotenv import load_dotenv
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import uuid
 from datetime import datetime
+from data_cache import menu_snapshot, user_cache
+from db_metrics import instrumented, log_db_error
+import db_recorder
+from request_memo import memoized, invalidating
+from db_resilience import resilient
 
 load_dotenv()
 
+# 'supabase' (default) talks to PostgREST; 'sqlalchemy' queries DATABASE_URL
+# directly through the models (see db_sqlalchemy.py)
+DATA_BACKEND = os.environ.get('DATA_BACKEND', 'supabase').lower()
+
 supabase_url = os.environ.get('SUPABASE_URL')
 supabase_anon_key = os.environ.get('SUPABASE_ANON_KEY')
 supabase_service_role_key = os.environ.get('SUPABASE_SERVICE_ROLE_KEY')
 
-if not supabase_url or not supabase_anon_key:
-    raise ValueError("Supabase credentials not found in environment variables")
+supabase: Optional[Client] = None
+supabase_admin: Optional[Client] = None
+
+if DATA_BACKEND == 'supabase':
+    if not supabase_url or not supabase_anon_key:
+        raise ValueError(
+            "Supabase credentials not found in environment variables")
 
-supabase: Client = create_client(supabase_url, supabase_anon_key)
-supabase_admin: Client = create_client(
-    supabase_url, supabase_service_role_key) if supabase_service_role_key else None
+    supabase = create_client(supabase_url, supabase_anon_key)
+    supabase_admin = create_client(
+        supabase_url, supabase_service_role_key) if supabase_service_role_key else None
+elif DATA_BACKEND != 'sqlalchemy':
+    raise ValueError(f"Unknown DATA_BACKEND: {DATA_BACKEND}")
 
 # Table names
 TABLE_USERS = 'users'
@@ -25,6 +42,7 @@ TABLE_ORDERS = 'order'
 TABLE_ORDER_ITEMS = 'order_item'
 TABLE_CART_ITEMS = 'cart_item'
 TABLE_REVIEWS = 'review'
+TABLE_DISH_RATING_STATS = 'dish_rating_stats'
 
 # User operations
 
@@ -36,7 +54,7 @@ def get_user_by_auth_id(auth_user_id: str) -> Optional[Dict[str, Any]]:
             '*').eq('auth_user_id', auth_user_id).execute()
         return response.data[0] if response.data else None
     except Exception as e:
-        print(f"Error getting user by auth ID: {e}")
+        log_db_error('getting user by auth ID', e)
         return None
 
 
@@ -47,18 +65,24 @@ def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
             '*').eq('email', email).execute()
         return response.data[0] if response.data else None
     except Exception as e:
-        print(f"Error getting user by email: {e}")
+        log_db_error('getting user by email', e)
         return None
 
 
 def get_user_by_id(user_id: str) -> Optional[Dict[str, Any]]:
     """Get user by ID"""
+    cached = user_cache.get(str(user_id))
+    if cached is not None:
+        return cached
     try:
         response = supabase.table(TABLE_USERS).select(
             '*').eq('id', user_id).execute()
-        return response.data[0] if response.data else None
+        if not response.data:
+            return None
+        user_cache.set(str(user_id), response.data[0])
+        return response.data[0]
     except Exception as e:
-        print(f"Error getting user by ID: {e}")
+        log_db_error('getting user by ID', e)
         return None
 
 
@@ -76,7 +100,7 @@ def create_user(auth_user_id: str, username: str, email: str, is_admin: bool = F
         response = supabase.table(TABLE_USERS).insert(user_data).execute()
         return response.data[0] if response.data else None
     except Exception as e:
-        print(f"Error creating user: {e}")
+        log_db_error('creating user', e)
         return None
 
 
@@ -85,9 +109,32 @@ def update_user(user_id: str, updates: Dict[str, Any]) -> bool:
     try:
         response = supabase.table(TABLE_USERS).update(
             updates).eq('id', user_id).execute()
+        user_cache.invalidate(str(user_id))
         return len(response.data) > 0
     except Exception as e:
-        print(f"Error updating user: {e}")
+        log_db_error('updating user', e)
+        return False
+
+
+def username_exists(username: str, exclude_user_id: str = None) -> bool:
+    """Check whether a username is taken (case-insensitive)"""
+    try:
+        response = supabase.rpc('username_taken', {
+            'p_username': username, 'p_exclude_id': exclude_user_id}).execute()
+        return bool(response.data)
+    except Exception as e:
+        log_db_error('checking username', e)
+        return False
+
+
+def email_exists(email: str, exclude_user_id: str = None) -> bool:
+    """Check whether an email is registered (case-insensitive)"""
+    try:
+        response = supabase.rpc('email_taken', {
+            'p_email': email, 'p_exclude_id': exclude_user_id}).execute()
+        return bool(response.data)
+    except Exception as e:
+        log_db_error('checking email', e)
         return False
 
 
@@ -97,23 +144,82 @@ def get_all_users() -> List[Dict[str, Any]]:
         response = supabase.table(TABLE_USERS).select('*').execute()
         return response.data
     except Exception as e:
-        print(f"Error getting all users: {e}")
+        log_db_error('getting all users', e)
         return []
 
+
+def get_first_user() -> Optional[Dict[str, Any]]:
+    """Get the earliest registered user"""
+    try:
+        response = supabase.table(TABLE_USERS).select(
+            '*').order('created_at').limit(1).execute()
+        return response.data[0] if response.data else None
+    except Exception as e:
+        log_db_error('getting first user', e)
+        return None
+
+
+def bulk_update_users(updates: Dict[str, Any], filters: Dict[str, Any]) -> int:
+    """Apply updates to every user matching filters in one statement; returns rows updated.
+
+    Filter values that are lists, tuples or sets match any of their items.
+    """
+    if not filters:
+        log_db_error('bulk updating users', 'refusing to update without filters')
+        return 0
+    try:
+        client = supabase_admin if supabase_admin else supabase
+        query = client.table(TABLE_USERS).update(
+            updates, count='exact', returning='minimal')
+        for column, value in filters.items():
+            if isinstance(value, (list, tuple, set)):
+                query = query.in_(column, list(value))
+            else:
+                query = query.eq(column, value)
+        response = query.execute()
+        user_cache.invalidate()
+        return response.count or 0
+    except Exception as e:
+        log_db_error('bulk updating users', e)
+        return 0
+
 # Dish operations
 
 
+def _fetch_all_dishes() -> List[Dict[str, Any]]:
+    client = supabase_admin if supabase_admin else supabase
+    response = client.table(TABLE_DISHES).select(
+        '*').eq('is_archived', False).execute()
+    return response.data
+
+
 def get_all_dishes() -> List[Dict[str, Any]]:
-    """Get all dishes"""
+    """Get all dishes on the menu (served from the in-process menu snapshot)"""
     try:
-        client = supabase_admin if supabase_admin else supabase
-        response = client.table(TABLE_DISHES).select('*').execute()
-        return response.data
+        return menu_snapshot.get(_fetch_all_dishes)
     except Exception as e:
-        print(f"Error getting all dishes: {e}")
+        log_db_error('getting all dishes', e)
         return []
 
 
+def get_menu_version() -> str:
+    """Digest of the menu snapshot; equal in every worker serving the same menu"""
+    try:
+        return menu_snapshot.digest(_fetch_all_dishes)
+    except Exception as e:
+        log_db_error('getting menu version', e)
+        return ''
+
+
+def get_menu_dish(dish_id: str) -> Optional[Dict[str, Any]]:
+    """Get a dish on the menu from the snapshot (None if unknown or archived)"""
+    try:
+        return menu_snapshot.get_dish(_fetch_all_dishes, dish_id)
+    except Exception as e:
+        log_db_error('getting menu dish', e)
+        return None
+
+
 def get_dish_by_id(dish_id: str) -> Optional[Dict[str, Any]]:
     """Get dish by ID"""
     try:
@@ -122,10 +228,22 @@ def get_dish_by_id(dish_id: str) -> Optional[Dict[str, Any]]:
             '*').eq('id', dish_id).execute()
         return response.data[0] if response.data else None
     except Exception as e:
-        print(f"Error getting dish by ID: {e}")
+        log_db_error('getting dish by ID', e)
         return None
 
 
+def dish_name_exists(name: str, exclude_dish_id: str = None) -> bool:
+    """Check whether a dish name is taken (case-insensitive)"""
+    try:
+        client = supabase_admin if supabase_admin else supabase
+        response = client.rpc('dish_name_taken', {
+            'p_name': name, 'p_exclude_id': exclude_dish_id}).execute()
+        return bool(response.data)
+    except Exception as e:
+        log_db_error('checking dish name', e)
+        return False
+
+
 def create_dish(name: str, price: float, description: str = None, image_filename: str = None, section: str = None) -> Optional[Dict[str, Any]]:
     """Create a new dish"""
     try:
@@ -140,9 +258,10 @@ def create_dish(name: str, price: float, description: str = None, image_filename
         # Use admin client if available for bypassing RLS
         client = supabase_admin if supabase_admin else supabase
         response = client.table(TABLE_DISHES).insert(dish_data).execute()
+        menu_snapshot.invalidate()
         return response.data[0] if response.data else None
     except Exception as e:
-        print(f"Error creating dish: {e}")
+        log_db_error('creating dish', e)
         return None
 
 
@@ -152,28 +271,51 @@ def update_dish(dish_id: str, updates: Dict[str, Any]) -> bool:
         client = supabase_admin if supabase_admin else supabase
         response = client.table(TABLE_DISHES).update(
             updates).eq('id', dish_id).execute()
+        menu_snapshot.invalidate()
         return len(response.data) > 0
     except Exception as e:
-        print(f"Error updating dish: {e}")
+        log_db_error('updating dish', e)
         return False
 
 
-def delete_dish(dish_id: str) -> bool:
-    """Delete a dish"""
+def set_dish_image_variants(dish_id: str, image_filename: str, variants: Dict[str, Any]) -> bool:
+    """Record processed image variants, unless the dish's image changed meanwhile"""
     try:
         client = supabase_admin if supabase_admin else supabase
-        # Delete related records first to avoid foreign key constraints
-        client.table(TABLE_ORDER_ITEMS).delete().eq(
-            'dish_id', dish_id).execute()
-        client.table(TABLE_CART_ITEMS).delete().eq(
-            'dish_id', dish_id).execute()
-        client.table(TABLE_REVIEWS).delete().eq('dish_id', dish_id).execute()
-        # Now delete the dish
-        response = client.table(TABLE_DISHES).delete().eq(
-            'id', dish_id).execute()
+        response = client.table(TABLE_DISHES).update({'image_variants': variants}).eq(
+            'id', dish_id).eq('image_filename', image_filename).execute()
+        menu_snapshot.invalidate()
         return len(response.data) > 0
     except Exception as e:
-        print(f"Error deleting dish: {e}")
+        log_db_error('setting dish image variants', e)
+        return False
+
+
+def get_dish_image_counts() -> Optional[Dict[str, int]]:
+    """Number of dishes (archived included) using each image_filename; None on error"""
+    try:
+        client = supabase_admin if supabase_admin else supabase
+        response = client.table(TABLE_DISHES).select('image_filename').execute()
+        counts = {}
+        for row in response.data:
+            if row['image_filename']:
+                counts[row['image_filename']] = counts.get(row['image_filename'], 0) + 1
+        return counts
+    except Exception as e:
+        log_db_error('counting dish images', e)
+        return None
+
+
+def delete_dish(dish_id: str) -> bool:
+    """Archive a dish: remove it from the menu and carts, keep its order history"""
+    try:
+        client = supabase_admin if supabase_admin else supabase
+        response = client.rpc(
+            'archive_dish', {'p_dish_id': dish_id}).execute()
+        menu_snapshot.invalidate()
+        return bool(response.data)
+    except Exception as e:
+        log_db_error('deleting dish', e)
         return False
 
 # Cart operations
@@ -186,36 +328,22 @@ def get_cart_items(user_id: str) -> List[Dict[str, Any]]:
             '*, dish(*)').eq('user_id', user_id).execute()
         return response.data
     except Exception as e:
-        print(f"Error getting cart items: {e}")
+        log_db_error('getting cart items', e)
         return []
 
 
 def add_to_cart(user_id: str, dish_id: str, quantity: int = 1) -> Optional[Dict[str, Any]]:
     """Add item to cart or update quantity if exists"""
     try:
-        # Check if item already exists
-        existing = supabase.table(TABLE_CART_ITEMS).select(
-            '*').eq('user_id', user_id).eq('dish_id', dish_id).execute()
-
-        if existing.data:
-            # Update quantity
-            new_quantity = existing.data[0]['quantity'] + quantity
-            response = supabase.table(TABLE_CART_ITEMS).update(
-                {'quantity': new_quantity}).eq('id', existing.data[0]['id']).execute()
-            return response.data[0] if response.data else None
-        else:
-            # Create new cart item
-            cart_data = {
-                'id': str(uuid.uuid4()),
-                'user_id': user_id,
-                'dish_id': dish_id,
-                'quantity': quantity
-            }
-            response = supabase.table(
-                TABLE_CART_ITEMS).insert(cart_data).execute()
-            return response.data[0] if response.data else None
+        # Single INSERT ... ON CONFLICT on (user_id, dish_id)
+        response = supabase.rpc('add_to_cart', {
+            'p_user_id': user_id,
+            'p_dish_id': dish_id,
+            'p_quantity': quantity
+        }).execute()
+        return response.data[0] if response.data else None
     except Exception as e:
-        print(f"Error adding to cart: {e}")
+        log_db_error('adding to cart', e)
         return None
 
 
@@ -230,7 +358,7 @@ def update_cart_item(cart_item_id: str, quantity: int) -> bool:
                 {'quantity': quantity}).eq('id', cart_item_id).execute()
         return len(response.data) > 0
     except Exception as e:
-        print(f"Error updating cart item: {e}")
+        log_db_error('updating cart item', e)
         return False
 
 
@@ -241,7 +369,7 @@ def remove_cart_item(cart_item_id: str) -> bool:
             'id', cart_item_id).execute()
         return len(response.data) > 0
     except Exception as e:
-        print(f"Error removing cart item: {e}")
+        log_db_error('removing cart item', e)
         return False
 
 
@@ -252,7 +380,21 @@ def clear_cart(user_id: str) -> bool:
             'user_id', user_id).execute()
         return True
     except Exception as e:
-        print(f"Error clearing cart: {e}")
+        log_db_error('clearing cart', e)
+        return False
+
+
+def replace_cart(user_id: str, items: List[Dict[str, Any]]) -> bool:
+    """Replace a user's cart rows with items ({id, dish_id, quantity}) in one transaction"""
+    try:
+        supabase.rpc('replace_cart', {
+            'p_user_id': user_id,
+            'p_items': [{'id': item['id'], 'dish_id': item['dish_id'], 'quantity': item['quantity']}
+                        for item in items]
+        }).execute()
+        return True
+    except Exception as e:
+        log_db_error('replacing cart', e)
         return False
 
 # Order operations
@@ -272,7 +414,7 @@ def create_order(user_id: str, total: float, phone_number: str = None) -> Option
         response = supabase.table(TABLE_ORDERS).insert(order_data).execute()
         return response.data[0] if response.data else None
     except Exception as e:
-        print(f"Error creating order: {e}")
+        log_db_error('creating order', e)
         return None
 
 
@@ -283,7 +425,7 @@ def get_orders_by_user(user_id: str) -> List[Dict[str, Any]]:
             '*').eq('user_id', user_id).order('created_at', desc=True).execute()
         return response.data
     except Exception as e:
-        print(f"Error getting orders by user: {e}")
+        log_db_error('getting orders by user', e)
         return []
 
 
@@ -294,7 +436,30 @@ def get_all_orders() -> List[Dict[str, Any]]:
             '*').order('created_at', desc=True).execute()
         return response.data
     except Exception as e:
-        print(f"Error getting all orders: {e}")
+        log_db_error('getting all orders', e)
+        return []
+
+
+def get_orders_page(limit: int = 50, status: str = None, before: Tuple[str, str] = None) -> List[Dict[str, Any]]:
+    """Get a page of orders, newest first, using (created_at, id) keyset pagination.
+
+    `before` is the (created_at, id) of the last order on the previous page.
+    """
+    try:
+        query = supabase.table(TABLE_ORDERS).select('*')
+        if status:
+            query = query.eq('status', status)
+        if before:
+            # Checked and normalised here too: they go into a filter string
+            created_at = datetime.fromisoformat(before[0]).isoformat()
+            order_id = str(uuid.UUID(before[1]))
+            query = query.or_(
+                f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{order_id})')
+        response = query.order('created_at', desc=True).order(
+            'id', desc=True).limit(limit).execute()
+        return response.data
+    except Exception as e:
+        log_db_error('getting orders page', e)
         return []
 
 
@@ -305,36 +470,60 @@ def get_order_by_id(order_id: str) -> Optional[Dict[str, Any]]:
             '*').eq('id', order_id).execute()
         return response.data[0] if response.data else None
     except Exception as e:
-        print(f"Error getting order by ID: {e}")
+        log_db_error('getting order by ID', e)
         return None
 
 
 def update_order_status(order_id: str, status: str) -> bool:
-    """Update order status"""
+    """Update order status, maintaining the revenue rollups on delivery"""
     try:
-        response = supabase.table(TABLE_ORDERS).update(
-            {'status': status}).eq('id', order_id).execute()
-        return len(response.data) > 0
+        response = supabase.rpc('set_order_status', {
+            'p_order_id': order_id, 'p_status': status}).execute()
+        return bool(response.data)
     except Exception as e:
-        print(f"Error updating order status: {e}")
+        log_db_error('updating order status', e)
         return False
 
 
-def create_order_item(order_id: str, dish_id: str, quantity: int, price: float) -> Optional[Dict[str, Any]]:
-    """Create an order item"""
+def create_order_item(order_id: str, dish_id: str, quantity: int, price: float, section: str = None) -> Optional[Dict[str, Any]]:
+    """Create an order item; section defaults to the dish's current section"""
     try:
+        if section is None:
+            dish = get_dish_by_id(dish_id)
+            section = (dish.get('section') if dish else None) or ''
         item_data = {
             'id': str(uuid.uuid4()),
             'order_id': order_id,
             'dish_id': dish_id,
             'quantity': quantity,
-            'price': price
+            'price': price,
+            'section': section
         }
         response = supabase.table(
             TABLE_ORDER_ITEMS).insert(item_data).execute()
         return response.data[0] if response.data else None
     except Exception as e:
-        print(f"Error creating order item: {e}")
+        log_db_error('creating order item', e)
+        return None
+
+
+def checkout_cart(user_id: str, discount: float = 0, phone_number: str = None) -> Optional[Dict[str, Any]]:
+    """Create an order from the user's cart, clear the cart and credit points in one transaction.
+
+    Returns the order, {} when the cart is empty, or None when checkout failed.
+    """
+    try:
+        response = supabase.rpc('checkout_cart', {
+            'p_user_id': user_id,
+            'p_discount': discount,
+            'p_phone_number': phone_number
+        }).execute()
+        if not response.data:
+            return {}
+        user_cache.invalidate(str(user_id))  # points were credited
+        return response.data[0]
+    except Exception as e:
+        log_db_error('checking out cart', e)
         return None
 
 
@@ -345,7 +534,7 @@ def get_order_items(order_id: str) -> List[Dict[str, Any]]:
             '*, dish(*)').eq('order_id', order_id).execute()
         return response.data
     except Exception as e:
-        print(f"Error getting order items: {e}")
+        log_db_error('getting order items', e)
         return []
 
 # Review operations
@@ -358,35 +547,39 @@ def get_reviews_by_dish(dish_id: str) -> List[Dict[str, Any]]:
             '*, users(*)').eq('dish_id', dish_id).order('created_at', desc=True).execute()
         return response.data
     except Exception as e:
-        print(f"Error getting reviews by dish: {e}")
+        log_db_error('getting reviews by dish', e)
         return []
 
 
 def create_review(user_id: str, dish_id: str, rating: int, review_text: str = None) -> Optional[Dict[str, Any]]:
-    """Create a new review"""
+    """Create a new review and update the dish's rating aggregate"""
     try:
-        review_data = {
-            'id': str(uuid.uuid4()),
-            'user_id': user_id,
-            'dish_id': dish_id,
-            'rating': rating,
-            'review_text': review_text
-        }
-        response = supabase.table(TABLE_REVIEWS).insert(review_data).execute()
+        response = supabase.rpc('create_review', {
+            'p_user_id': user_id,
+            'p_dish_id': dish_id,
+            'p_rating': rating,
+            'p_review_text': review_text
+        }).execute()
         return response.data[0] if response.data else None
     except Exception as e:
-        print(f"Error creating review: {e}")
+        log_db_error('creating review', e)
         return None
 
 
 def get_review_stats() -> Dict[str, Dict[str, Any]]:
-    """Get review statistics for all dishes"""
+    """Get review statistics for all dishes, keyed by dish ID"""
     try:
-        # This would need to be implemented with Supabase's RPC or multiple queries
-        # For now, return empty dict - we'll calculate this in the application layer
-        return {}
+        response = supabase.table(TABLE_DISH_RATING_STATS).select(
+            'dish_id, review_count, rating_sum').execute()
+        return {
+            row['dish_id']: {
+                'avg_rating': row['rating_sum'] / row['review_count'] if row['review_count'] else 0,
+                'review_count': row['review_count']
+            }
+            for row in response.data
+        }
     except Exception as e:
-        print(f"Error getting review stats: {e}")
+        log_db_error('getting review stats', e)
         return {}
 
 # Utility functions
@@ -411,48 +604,32 @@ def calculate_review_stats(reviews: List[Dict[str, Any]]) -> Dict[str, Any]:
 def get_total_revenue() -> float:
     """Get total revenue from all completed orders (delivered status)"""
     try:
-        response = supabase.table(TABLE_ORDERS).select(
-            'total').eq('status', 'delivered').execute()
-        totals = [order['total'] for order in response.data]
-        return sum(totals)
+        response = supabase.rpc('revenue_total', {}).execute()
+        return float(response.data or 0)
     except Exception as e:
-        print(f"Error getting total revenue: {e}")
+        log_db_error('getting total revenue', e)
         return 0.0
 
 
 def get_revenue_by_date_range(start_date: str, end_date: str) -> float:
     """Get revenue within a specific date range for completed orders"""
     try:
-        response = supabase.table(TABLE_ORDERS).select('total').eq('status', 'delivered').gte(
-            'created_at', start_date).lte('created_at', end_date).execute()
-        totals = [order['total'] for order in response.data]
-        return sum(totals)
+        response = supabase.rpc('revenue_total', {
+            'p_start': start_date, 'p_end': end_date}).execute()
+        return float(response.data or 0)
     except Exception as e:
-        print(f"Error getting revenue by date range: {e}")
+        log_db_error('getting revenue by date range', e)
         return 0.0
 
 
-def get_revenue_by_dish() -> List[Dict[str, Any]]:
-    """Get revenue breakdown by dish from completed orders"""
+def get_revenue_by_dish(start_date: str = None, end_date: str = None) -> List[Dict[str, Any]]:
+    """Get revenue breakdown by dish from completed orders, highest first"""
     try:
-        # Get all order items from delivered orders with dish info
-        response = supabase.table(TABLE_ORDER_ITEMS).select(
-            'quantity, price, dish(name)').execute()
-
-        # Group by dish and calculate total revenue per dish
-        dish_revenue = {}
-        for item in response.data:
-            dish_name = item['dish']['name']
-            revenue = item['quantity'] * item['price']
-            if dish_name in dish_revenue:
-                dish_revenue[dish_name] += revenue
-            else:
-                dish_revenue[dish_name] = revenue
-
-        # Convert to list of dicts sorted by revenue descending
-        return [{'dish_name': name, 'revenue': revenue} for name, revenue in sorted(dish_revenue.items(), key=lambda x: x[1], reverse=True)]
+        response = supabase.rpc('revenue_by_dish', {
+            'p_start': start_date, 'p_end': end_date}).execute()
+        return [{'dish_name': row['dish_name'], 'revenue': float(row['revenue'])} for row in response.data]
     except Exception as e:
-        print(f"Error getting revenue by dish: {e}")
+        log_db_error('getting revenue by dish', e)
         return []
 
 
@@ -464,17 +641,10 @@ def get_daily_revenue(days: int = 30) -> List[Dict[str, Any]]:
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
 
-        response = supabase.table(TABLE_ORDERS).select('total, created_at').eq(
-            'status', 'delivered').gte('created_at', start_date.isoformat()).execute()
-
-        # Group by date
-        daily_totals = {}
-        for order in response.data:
-            date = order['created_at'][:10]  # Extract YYYY-MM-DD
-            if date in daily_totals:
-                daily_totals[date] += order['total']
-            else:
-                daily_totals[date] = order['total']
+        response = supabase.rpc('revenue_daily', {
+            'p_start': start_date.isoformat()}).execute()
+        daily_totals = {row['day']: float(row['revenue'])
+                        for row in response.data}
 
         # Fill in missing dates with 0
         result = []
@@ -489,7 +659,7 @@ def get_daily_revenue(days: int = 30) -> List[Dict[str, Any]]:
 
         return result
     except Exception as e:
-        print(f"Error getting daily revenue: {e}")
+        log_db_error('getting daily revenue', e)
         return []
 
 
@@ -501,19 +671,10 @@ def get_monthly_revenue(months: int = 12) -> List[Dict[str, Any]]:
         end_date = datetime.now()
         start_date = end_date - timedelta(days=months*30)  # Approximate
 
-        response = supabase.table(TABLE_ORDERS).select('total, created_at').eq(
-            'status', 'delivered').gte('created_at', start_date.isoformat()).execute()
-
-        # Group by month
-        monthly_totals = {}
-        for order in response.data:
-            date = datetime.fromisoformat(
-                order['created_at'][:19])  # Parse datetime
-            month_key = f"{date.year}-{date.month:02d}"
-            if month_key in monthly_totals:
-                monthly_totals[month_key] += order['total']
-            else:
-                monthly_totals[month_key] = order['total']
+        response = supabase.rpc('revenue_monthly', {
+            'p_start': start_date.isoformat()}).execute()
+        monthly_totals = {row['month']: float(row['revenue'])
+                          for row in response.data}
 
         # Fill in missing months with 0
         result = []
@@ -534,5 +695,105 @@ def get_monthly_revenue(months: int = 12) -> List[Dict[str, Any]]:
 
         return result
     except Exception as e:
-        print(f"Error getting monthly revenue: {e}")
+        log_db_error('getting monthly revenue', e)
         return []
+
+
+def get_first_order_date() -> Optional[str]:
+    """Get the creation date (YYYY-MM-DD) of the oldest order"""
+    try:
+        response = supabase.table(TABLE_ORDERS).select(
+            'created_at').order('created_at').limit(1).execute()
+        return response.data[0]['created_at'][:10] if response.data else None
+    except Exception as e:
+        log_db_error('getting first order date', e)
+        return None
+
+
+def rebuild_revenue_rollups(start_date: str, end_date: str) -> Optional[int]:
+    """Recompute revenue rollups for an inclusive range of days; returns orders counted"""
+    try:
+        response = supabase.rpc('rebuild_revenue_rollups', {
+            'p_start': start_date, 'p_end': end_date}).execute()
+        return int(response.data or 0)
+    except Exception as e:
+        log_db_error('rebuilding revenue rollups', e)
+        return None
+
+
+# Swap in the SQLAlchemy implementations of the functions above
+if DATA_BACKEND == 'sqlalchemy':
+    from db_sqlalchemy import *  # noqa: E402,F401,F403
+
+# Count/time every backend call (see db_metrics.py), with recording/replay
+# (see db_recorder.py) inside when enabled. Applied before the request memo
+# below, so memo hits are not counted as round trips.
+_record = db_recorder.enabled()
+
+
+def _instrument(fn):
+    return instrumented(db_recorder.recorded(fn) if _record else fn)
+
+
+# Answered from the menu snapshot or computed in Python; the snapshot's
+# loader is instrumented instead, so only its reloads count as round trips
+NOT_INSTRUMENTED = frozenset({'get_all_dishes', 'get_menu_version', 'get_menu_dish',
+                              'calculate_review_stats'})
+for _name, _fn in list(globals().items()):
+    if callable(_fn) and not _name.startswith('_') and _name not in NOT_INSTRUMENTED \
+            and getattr(_fn, '__module__', None) in ('db', 'db_sqlalchemy'):
+        globals()[_name] = _instrument(_fn)
+# Looked up as a global of the active backend's module by get_all_dishes & co.
+_backend = sys.modules[get_all_dishes.__module__]
+_backend._fetch_all_dishes = _instrument(_backend._fetch_all_dishes)
+
+# Retries, circuit breaking, hedging and last-known-good results for reads
+# (see db_resilience.py). Stale results are only served for shared data;
+# the menu snapshot behind get_all_dishes/get_menu_dish does its own.
+get_dish_by_id = resilient(get_dish_by_id)
+get_reviews_by_dish = resilient(get_reviews_by_dish)
+get_review_stats = resilient(get_review_stats)
+get_total_revenue = resilient(get_total_revenue)
+get_revenue_by_date_range = resilient(get_revenue_by_date_range)
+get_revenue_by_dish = resilient(get_revenue_by_dish)
+get_daily_revenue = resilient(get_daily_revenue)
+get_monthly_revenue = resilient(get_monthly_revenue)
+get_user_by_id = resilient(get_user_by_id, serve_stale=False)
+get_cart_items = resilient(get_cart_items, serve_stale=False)
+get_orders_by_user = resilient(get_orders_by_user, serve_stale=False)
+get_order_by_id = resilient(get_order_by_id, serve_stale=False)
+get_order_items = resilient(get_order_items, serve_stale=False)
+
+# Request-scoped memo around reads (see request_memo.py); writes clear it.
+# Applied last so it wraps whichever backend is active.
+get_user_by_auth_id = memoized(get_user_by_auth_id)
+get_user_by_email = memoized(get_user_by_email)
+get_user_by_id = memoized(get_user_by_id)
+get_all_users = memoized(get_all_users)
+get_first_user = memoized(get_first_user)
+get_dish_by_id = memoized(get_dish_by_id)
+get_cart_items = memoized(get_cart_items)
+get_orders_by_user = memoized(get_orders_by_user)
+get_order_by_id = memoized(get_order_by_id)
+get_order_items = memoized(get_order_items)
+get_reviews_by_dish = memoized(get_reviews_by_dish)
+get_review_stats = memoized(get_review_stats)
+
+create_user = invalidating(create_user)
+update_user = invalidating(update_user)
+bulk_update_users = invalidating(bulk_update_users)
+create_dish = invalidating(create_dish)
+update_dish = invalidating(update_dish)
+set_dish_image_variants = invalidating(set_dish_image_variants)
+delete_dish = invalidating(delete_dish)
+add_to_cart = invalidating(add_to_cart)
+update_cart_item = invalidating(update_cart_item)
+remove_cart_item = invalidating(remove_cart_item)
+clear_cart = invalidating(clear_cart)
+replace_cart = invalidating(replace_cart)
+create_order = invalidating(create_order)
+update_order_status = invalidating(update_order_status)
+create_order_item = invalidating(create_order_item)
+checkout_cart = invalidating(checkout_cart)
+create_review = invalidating(create_review)
+rebuild_revenue_rollups = invalidating(rebuild_revenue_rollups)
@@ -0,0 +1,245 @@
+"""
+Instrumentation for the data-access layer.
+Every public db.py function that reaches the backend is wrapped to record
+call count, latency and result payload size per function and per Flask
+endpoint (see db.NOT_INSTRUMENTED for the ones that do not). Results are exposed
+as Prometheus metrics on /metrics (off unless METRICS_ENABLED) and, when
+DB_DEBUG_HEADERS is on, as X-DB-Calls / X-DB-Time response headers.
+/metrics answers requests carrying "Authorization: Bearer <METRICS_TOKEN>"
+and logged-in admins; everyone else gets a 404.
+db.py functions swallow their exceptions, so they report failures through
+log_db_error, which also marks the current call as failed: TRANSIENT when the
+backend could not be reached or answered with a server error, ERROR when it
+rejected the call (a malformed id, a constraint violation, ...).
+"""
+import contextvars
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import Response, abort, has_request_context, request
+from flask_login import current_user
+
+try:
+    from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter,
+                                   Histogram, generate_latest, multiprocess)
+except ImportError:  # metrics are optional
+    Counter = None
+
+try:
+    import httpx  # supabase's transport
+except ImportError:
+    httpx = None
+
+try:
+    from sqlalchemy import exc as sqlalchemy_exc
+except ImportError:
+    sqlalchemy_exc = None
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.environ.get(
+    'METRICS_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+if Counter is not None:
+    DB_CALLS = Counter('db_calls_total', 'Data-access calls',
+                       ['function', 'endpoint', 'outcome'])
+    DB_LATENCY = Histogram('db_call_duration_seconds', 'Data-access call latency',
+                           ['function', 'endpoint'])
+    DB_PAYLOAD = Histogram('db_call_payload_bytes', 'Approximate JSON size of data-access results',
+                           ['function'], buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576))
+    DB_CALLS_PER_REQUEST = Histogram('db_calls_per_request', 'Data-access calls made by one request',
+                                     ['endpoint'], buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34))
+
+# Failure kinds, most serious last
+ERROR = 'error'
+TRANSIENT = 'transient'
+
+# SQLSTATE classes of connection/resource/timeout errors, and PostgREST's
+# codes for "cannot reach the database"
+_TRANSIENT_SQLSTATES = ('08', '40', '53', '57')
+_TRANSIENT_PGRST = ('PGRST000', 'PGRST001', 'PGRST002', 'PGRST003')
+
+# Set by log_db_error while an instrumented call is running: False, or the
+# failure kind
+_call_failed = contextvars.ContextVar('db_call_failed', default=None)
+# Only the outermost instrumented call is counted (functions may call each other)
+_depth = contextvars.ContextVar('db_call_depth', default=0)
+# Callables notified with (function name, seconds) after each counted call
+_call_listeners = []
+
+
+class _RequestStats:
+    """Per-request totals; kept in the WSGI environ so copies of the request
+    context (see parallel.py) add to the same counters."""
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self.calls += 1
+            self.seconds += seconds
+
+
+def _request_stats():
+    if not has_request_context():
+        return None
+    return request.environ.setdefault('app.db_stats', _RequestStats())
+
+
+def _endpoint():
+    if has_request_context():
+        return request.endpoint or 'unknown'
+    return 'none'
+
+
+def _payload_size(result):
+    try:
+        return len(json.dumps(result, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+def is_transient(error):
+    """Whether an error means the backend is unreachable, overloaded or
+    failing, rather than that it rejected this particular call"""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    if httpx is not None and isinstance(error, httpx.TransportError):
+        return True
+    if sqlalchemy_exc is not None:
+        if isinstance(error, (sqlalchemy_exc.OperationalError, sqlalchemy_exc.DisconnectionError,
+                              sqlalchemy_exc.TimeoutError)):
+            return True
+        if getattr(error, 'connection_invalidated', False):
+            return True
+    # PostgREST APIError: a SQLSTATE, a PGRST code, or the HTTP status when
+    # the body was not PostgREST's (e.g. a 502 from the gateway)
+    code = str(getattr(error, 'code', None) or '')
+    if code.isdigit() and len(code) == 3:
+        return code.startswith('5')
+    return code.startswith(_TRANSIENT_SQLSTATES) or code in _TRANSIENT_PGRST
+
+
+def _mark_failed(kind):
+    if _call_failed.get() is not None and _call_failed.get() != TRANSIENT:
+        _call_failed.set(kind)
+
+
+def log_db_error(action, error):
+    """Log a swallowed data-access error and mark the current call as failed"""
+    logger.error('Error %s: %s', action, error)
+    _mark_failed(TRANSIENT if is_transient(error) else ERROR)
+
+
+def checked_call(fn, *args, **kwargs):
+    """Call fn and return (result, failure).
+
+    failure is None on success, else TRANSIENT or ERROR (see is_transient)
+    for what fn raised or reported through log_db_error.
+    """
+    token = _call_failed.set(False)
+    try:
+        result = fn(*args, **kwargs)
+        return result, _call_failed.get() or None
+    except Exception as e:
+        logger.error('Error in %s: %s', getattr(fn, '__name__', fn), e)
+        return None, TRANSIENT if is_transient(e) else ERROR
+    finally:
+        _call_failed.reset(token)
+
+
+def add_call_listener(listener):
+    """Call listener(function_name, seconds) after every counted data-access call"""
+    _call_listeners.append(listener)
+
+
+def instrumented(fn):
+    """Record count, latency and payload size of a data-access function"""
+    name = fn.__name__
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        depth = _depth.get()
+        if depth:
+            return fn(*args, **kwargs)
+        depth_token = _depth.set(1)
+        failed_token = _call_failed.set(False)
+        start = time.perf_counter()
+        outcome, failure = 'ok', None
+        try:
+            result = fn(*args, **kwargs)
+            failure = _call_failed.get() or None
+            if failure:
+                outcome = 'error'
+            return result
+        except Exception as e:
+            outcome = 'exception'
+            failure = TRANSIENT if is_transient(e) else ERROR
+            result = None
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            _call_failed.reset(failed_token)
+            _depth.reset(depth_token)
+            if failure:
+                _mark_failed(failure)  # let an enclosing checked_call see it
+            stats = _request_stats()
+            if stats is not None:
+                stats.add(elapsed)
+            for listener in _call_listeners:
+                listener(name, elapsed)
+            if Counter is not None and METRICS_ENABLED:
+                endpoint = _endpoint()
+                DB_CALLS.labels(name, endpoint, outcome).inc()
+                DB_LATENCY.labels(name, endpoint).observe(elapsed)
+                if result is not None:
+                    DB_PAYLOAD.labels(name).observe(_payload_size(result))
+    return wrapper
+
+
+def _metrics_authorized():
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if METRICS_TOKEN and scheme.lower() == 'bearer' \
+            and hmac.compare_digest(token.strip().encode(), METRICS_TOKEN.encode()):
+        return True
+    return current_user.is_authenticated and current_user.is_admin
+
+
+def init_db_metrics(app):
+    """Register the /metrics endpoint and the per-request debug headers"""
+    debug_headers = os.environ.get('DB_DEBUG_HEADERS', str(app.debug)).lower() in (
+        '1', 'true', 'yes')
+
+    @app.after_request
+    def _db_call_headers(response):
+        stats = _request_stats()
+        calls = stats.calls if stats else 0
+        if Counter is not None and METRICS_ENABLED and request.endpoint != 'metrics':
+            DB_CALLS_PER_REQUEST.labels(request.endpoint or 'unknown').observe(calls)
+        if debug_headers:
+            response.headers['X-DB-Calls'] = str(calls)
+            response.headers['X-DB-Time'] = f"{(stats.seconds if stats else 0) * 1000:.1f}ms"
+        return response
+
+    if Counter is None or not METRICS_ENABLED:
+        return
+
+    @app.route('/metrics')
+    def metrics():
+        if not _metrics_authorized():
+            abort(404)  # do not advertise it
+        if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+            # Several worker processes: aggregate their metric files
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+            return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+        return Response(generate_latest(), content_type=CONTENT_TYPE_LATEST)
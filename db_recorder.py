@@ -0,0 +1,311 @@
+"""
+Record and replay of data-access calls.
+With DB_RECORD_PATH set, every db.py call made while serving a request is
+logged with its arguments, result shape, latency and a redacted copy of its
+result, grouped under the request that made it (method, path, form fields,
+user and status). Recordings are JSON lines, or msgpack when the path ends
+in .msgpack (needs the msgpack package); '{pid}' in the path is replaced by
+the worker's process ID. DB_RECORD_SAMPLE records only a fraction of requests.
+benchmarks/replay_db.py feeds recordings back through the app, with db.py
+answered from the file instead of the backend (see start_replay).
+"""
+import contextvars
+import copy
+import inspect
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from functools import wraps
+
+from flask import has_request_context, request, session
+
+try:
+    import msgpack
+except ImportError:  # only needed for .msgpack recordings
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+# Replaced in recorded arguments (by parameter name), results and form data:
+# secrets, and the personal details of users
+SENSITIVE_KEYS = frozenset({'password', 'confirm_password', 'csrf_token', 'admin_code',
+                            'username', 'p_username', 'email', 'p_email',
+                            'phone_number', 'p_phone_number', 'auth_user_id'})
+REDACTED = '[redacted]'
+
+# Only the outermost call is recorded (db functions may call each other)
+_depth = contextvars.ContextVar('db_record_depth', default=0)
+
+_writer = None
+_replay = None
+
+
+def _record_path():
+    return os.environ.get('DB_RECORD_PATH')
+
+
+def enabled():
+    """Whether db.py should wrap its functions for recording or replay"""
+    return bool(_record_path()) or _replay is not None
+
+
+def _snapshot(value):
+    """JSON-compatible copy of value with sensitive fields redacted"""
+    if isinstance(value, dict):
+        return {str(key): REDACTED if key in SENSITIVE_KEYS and value[key] is not None else _snapshot(item)
+                for key, item in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [_snapshot(item) for item in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def _snapshot_arguments(signature, args, kwargs):
+    """Snapshots of a call's (args, kwargs), with the arguments of sensitive
+    parameters redacted; keyword arguments for positional parameters are
+    moved to args, so equal calls always snapshot the same"""
+    try:
+        bound = signature.bind_partial(*args, **kwargs)
+    except (TypeError, ValueError):
+        # Not a valid call of fn (it will raise); keep no argument values
+        return [REDACTED] * len(args), {str(key): REDACTED for key in kwargs}
+    for name, value in bound.arguments.items():
+        if name in SENSITIVE_KEYS and value is not None:
+            bound.arguments[name] = REDACTED
+    return _snapshot(bound.args), _snapshot(bound.kwargs)
+
+
+def _shape(value):
+    if isinstance(value, (list, tuple)):
+        return f'list[{len(value)}]'
+    if isinstance(value, dict):
+        return f'dict[{len(value)}]'
+    return type(value).__name__
+
+
+class _Writer:
+    def __init__(self, path):
+        path = path.format(pid=os.getpid())
+        self.packed = path.endswith('.msgpack')
+        if self.packed and msgpack is None:
+            raise RuntimeError('DB_RECORD_PATH ends in .msgpack but msgpack is not installed')
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._file = open(path, 'ab' if self.packed else 'a')
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        if self.packed:
+            data = msgpack.packb(record, default=str)
+        else:
+            data = json.dumps(record, default=str, separators=(',', ':')) + '\n'
+        with self._lock:
+            self._file.write(data)
+            self._file.flush()
+
+
+def _get_writer():
+    global _writer
+    if _writer is None:
+        _writer = _Writer(_record_path())
+    return _writer
+
+
+class _RequestRecording:
+    """Calls made by one request; kept in the WSGI environ so copies of the
+    request context (see parallel.py) add to the same recording."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def add(self, call):
+        with self._lock:
+            self.calls.append(call)
+
+
+def _current_recording():
+    if not has_request_context():
+        return None
+    return request.environ.get('app.db_recording')
+
+
+def recorded(fn):
+    """Record calls to fn, or answer them from the active replay"""
+    name = fn.__name__
+    signature = inspect.signature(fn)
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if _replay is not None:
+            return _replay.call(name, fn, args, kwargs,
+                                _snapshot_arguments(signature, args, kwargs))
+        if _depth.get():
+            return fn(*args, **kwargs)
+        recording = _current_recording()
+        if recording is None and has_request_context():
+            return fn(*args, **kwargs)  # request not sampled
+        token = _depth.set(1)
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            _depth.reset(token)
+        call_args, call_kwargs = _snapshot_arguments(signature, args, kwargs)
+        call = {
+            'fn': name,
+            'args': call_args,
+            'kwargs': call_kwargs,
+            'ms': round((time.perf_counter() - start) * 1000, 3),
+            'shape': _shape(result),
+            'result': _snapshot(result),
+        }
+        if recording is not None:
+            recording.add(call)
+        else:
+            # Outside a request (e.g. the cart flusher)
+            _get_writer().write({'ts': time.time(), 'calls': [call]})
+        return result
+    return wrapper
+
+
+def init_db_recorder(app):
+    """Record requests and their data-access calls when DB_RECORD_PATH is set"""
+    if not _record_path() or _replay is not None:
+        return False
+    sample_rate = float(os.environ.get('DB_RECORD_SAMPLE', 1))
+
+    @app.before_request
+    def _start_recording():
+        if random.random() < sample_rate:
+            request.environ['app.db_recording'] = _RequestRecording()
+
+    # after_request rather than teardown_request: the copied request contexts
+    # used by parallel.py run teardown handlers when their calls finish
+    @app.after_request
+    def _write_recording(response):
+        recording = request.environ.pop('app.db_recording', None)
+        if recording is None:
+            return response
+        try:
+            _get_writer().write({
+                'ts': recording.started,
+                'method': request.method,
+                'path': request.path,
+                'query': request.query_string.decode('latin-1'),
+                'form': _snapshot(request.form.to_dict()) if request.form else None,
+                'endpoint': request.endpoint,
+                'user_id': session.get('_user_id'),
+                'status': response.status_code,
+                'ms': round((time.time() - recording.started) * 1000, 3),
+                'calls': recording.calls,
+            })
+        except Exception as e:
+            logger.error('Error writing db recording: %s', e)
+        return response
+
+    # The file itself is opened lazily, so each forked worker gets its own
+    logger.info('Recording data-access calls to %s', _record_path())
+    return True
+
+
+def read_recording(path):
+    """Yield the records of a recording file"""
+    if path.endswith('.msgpack'):
+        if msgpack is None:
+            raise RuntimeError('msgpack is not installed')
+        with open(path, 'rb') as f:
+            yield from msgpack.Unpacker(f, raw=False)
+        return
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class ReplayQueue:
+    """Recorded calls of one request, matched to the calls made on replay"""
+
+    def __init__(self, calls):
+        self.pending = defaultdict(deque)
+        for call in calls:
+            self.pending[call['fn']].append(call)
+        self._lock = threading.Lock()
+
+    def take(self, name, args, kwargs):
+        """Next recorded call of `name`, preferring one made with the same
+        (snapshotted, see _snapshot_arguments) arguments"""
+        with self._lock:
+            calls = self.pending.get(name)
+            if not calls:
+                return None
+            for call in calls:
+                if call['args'] == args and call['kwargs'] == kwargs:
+                    calls.remove(call)
+                    return call
+            return calls.popleft()
+
+
+class Replay:
+    """Answers db.py calls from recordings.
+
+    A request's calls come from the ReplayQueue in its environ
+    ('db_replay.calls'); calls that were not recorded for the request fall
+    back to the last recorded result of the same function, and functions
+    never seen in the recording run for real. Recorded latency is slept,
+    scaled by latency_scale.
+    """
+
+    def __init__(self, latency_scale=1.0):
+        self.latency_scale = latency_scale
+        self.matched = 0
+        self.fallbacks = 0
+        self.passthrough = 0
+        self._last = {}
+        self._lock = threading.Lock()
+
+    def load(self, paths):
+        """Read recordings; returns the request records in time order"""
+        requests = []
+        for path in paths:
+            for record in read_recording(path):
+                for call in record['calls']:
+                    self._last[call['fn']] = call
+                if record.get('path'):
+                    requests.append(record)
+        requests.sort(key=lambda record: record['ts'])
+        return requests
+
+    def call(self, name, fn, args, kwargs, snapshot):
+        """Result for a call of fn; snapshot is its _snapshot_arguments()"""
+        queue = request.environ.get('db_replay.calls') if has_request_context() else None
+        recorded_call = queue.take(name, *snapshot) if queue else None
+        with self._lock:
+            if recorded_call is not None:
+                self.matched += 1
+            else:
+                recorded_call = self._last.get(name)
+                if recorded_call is None:
+                    self.passthrough += 1
+                else:
+                    self.fallbacks += 1
+        if recorded_call is None:
+            return fn(*args, **kwargs)
+        if self.latency_scale:
+            time.sleep(recorded_call['ms'] * self.latency_scale / 1000)
+        return copy.deepcopy(recorded_call['result'])
+
+
+def start_replay(latency_scale=1.0):
+    """Answer db.py calls from recordings; call before db.py is imported"""
+    global _replay
+    _replay = Replay(latency_scale)
+    return _replay
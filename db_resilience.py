@@ -0,0 +1,277 @@
+"""
+Resilience for read-only data-access calls.
+When Supabase is slow or failing, a plain db.py read blocks the request and
+then returns []/None, so pages render empty. Reads wrapped with `resilient`
+keep the last good result for each set of arguments and add:
+
+- stale-while-revalidate: once a result is cached, a call that has not
+  answered within RESILIENCE_STALE_AFTER_MS returns the cached result while
+  the call finishes in the background and refreshes it. Failed calls fall
+  back to it too. Results older than RESILIENCE_MAX_STALE are not served.
+  While the function answers quickly it runs on the calling thread; only
+  after a slow or failed call are calls moved to a pool to bound the wait.
+- a circuit breaker per function: after RESILIENCE_BREAKER_FAILURES failures
+  in a row the function is not called for RESILIENCE_BREAKER_RESET seconds,
+  then a single trial call decides whether to close it again.
+- retries: up to RESILIENCE_RETRIES more attempts, with full-jitter
+  exponential backoff from RESILIENCE_RETRY_BASE_MS.
+
+Only transient failures (db_metrics.is_transient: connection errors,
+timeouts, 5xx) count as failures here. A call the backend rejected, such as
+a lookup by a malformed id, shows the backend is up: it is not retried,
+closes the breaker like a success and is never answered from the cache.
+- hedging (RESILIENCE_HEDGE_MS > 0): a second identical call is started if the
+  first has not answered in that time, and the first success wins.
+
+db.py functions swallow their errors, so failures are detected through
+db_metrics.checked_call.
+"""
+import copy
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError, wait
+from functools import wraps
+
+from db_metrics import TRANSIENT, checked_call
+from parallel import bind_context
+
+logger = logging.getLogger(__name__)
+
+RESILIENCE_ENABLED = os.environ.get(
+    'RESILIENCE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+RESILIENCE_STALE_AFTER_MS = float(os.environ.get('RESILIENCE_STALE_AFTER_MS', 300))
+RESILIENCE_MAX_STALE = float(os.environ.get('RESILIENCE_MAX_STALE', 24 * 60 * 60))
+RESILIENCE_RETRIES = int(os.environ.get('RESILIENCE_RETRIES', 2))
+RESILIENCE_RETRY_BASE_MS = float(os.environ.get('RESILIENCE_RETRY_BASE_MS', 50))
+RESILIENCE_BREAKER_FAILURES = int(os.environ.get('RESILIENCE_BREAKER_FAILURES', 5))
+RESILIENCE_BREAKER_RESET = float(os.environ.get('RESILIENCE_BREAKER_RESET', 30))
+RESILIENCE_HEDGE_MS = float(os.environ.get('RESILIENCE_HEDGE_MS', 0))
+RESILIENCE_MAX_WORKERS = int(os.environ.get('RESILIENCE_MAX_WORKERS', 16))
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+# Circuit breakers by function name, for inspection
+breakers = {}
+
+
+def _get_executor(kind):
+    # Separate pools for background calls and hedges, so hedged attempts
+    # started from a background call never wait on their own pool
+    executor = _executors.get(kind)
+    if executor is None:
+        with _executors_lock:
+            executor = _executors.get(kind)
+            if executor is None:
+                executor = _executors[kind] = ThreadPoolExecutor(
+                    max_workers=RESILIENCE_MAX_WORKERS, thread_name_prefix=f'db-{kind}')
+    return executor
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half-open -> closed"""
+
+    def __init__(self, name, failures=None, reset_after=None):
+        self.name = name
+        self.failures = failures or RESILIENCE_BREAKER_FAILURES
+        self.reset_after = RESILIENCE_BREAKER_RESET if reset_after is None else reset_after
+        self.state = 'closed'
+        self._consecutive = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def is_open(self):
+        """True while calls are being skipped (open and not yet due for a trial)"""
+        return self.state == 'open' and time.monotonic() - self._opened_at < self.reset_after
+
+    def allow(self):
+        """Whether a call may go ahead now; in half-open, only one at a time"""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.is_open() or self._trial_running:
+                return False
+            self.state = 'half-open'
+            self._trial_running = True
+            return True
+
+    def record(self, ok):
+        with self._lock:
+            self._trial_running = False
+            if ok:
+                if self.state != 'closed':
+                    logger.info('Circuit for %s closed', self.name)
+                self.state = 'closed'
+                self._consecutive = 0
+                return
+            self._consecutive += 1
+            if self.state == 'half-open' or self._consecutive >= self.failures:
+                if self.state != 'open':
+                    logger.warning('Circuit for %s opened after %d failures',
+                                   self.name, self._consecutive)
+                self.state = 'open'
+                self._opened_at = time.monotonic()
+
+
+class _LastGood:
+    """Most recent successful results of one function, by arguments"""
+
+    def __init__(self, max_age=None, maxsize=256):
+        self.max_age = RESILIENCE_MAX_STALE if max_age is None else max_age
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[1] >= self.max_age:
+            return None
+        return entry
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            if len(self._entries) >= self.maxsize:
+                self._entries.popitem(last=False)
+            self._entries[key] = (value, time.monotonic())
+
+
+def _freeze(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    return value
+
+
+def _attempt(fn, args, kwargs):
+    if RESILIENCE_HEDGE_MS <= 0:
+        return checked_call(fn, *args, **kwargs)
+    executor = _get_executor('hedge')
+    call = bind_context(checked_call)
+    first = executor.submit(call, fn, *args, **kwargs)
+    done, _ = wait([first], timeout=RESILIENCE_HEDGE_MS / 1000)
+    if done:
+        return first.result()
+    pending = {first, executor.submit(call, fn, *args, **kwargs)}
+    result = (None, TRANSIENT)
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            result = future.result()
+            if result[1] != TRANSIENT:
+                return result  # the slower call finishes unobserved
+    return result
+
+
+def _call_with_retries(fn, breaker, args, kwargs):
+    """Returns (result, failure) as checked_call does; result is None if the
+    breaker allowed no attempt"""
+    result, failure = None, TRANSIENT
+    for attempt in range(RESILIENCE_RETRIES + 1):
+        if attempt:
+            backoff = RESILIENCE_RETRY_BASE_MS * 2 ** (attempt - 1)
+            time.sleep(random.uniform(0, backoff) / 1000)
+        if not breaker.allow():
+            break
+        result, failure = _attempt(fn, args, kwargs)
+        breaker.record(failure != TRANSIENT)
+        if failure != TRANSIENT:
+            break
+    return result, failure
+
+
+def resilient(fn, serve_stale=True):
+    """Wrap a read function with retries, a circuit breaker, optional hedging
+    and, when serve_stale is set, stale-while-revalidate.
+
+    Leave serve_stale off for per-user reads where stale data could mislead
+    (carts, orders).
+    """
+    if not RESILIENCE_ENABLED:
+        return fn
+    name = fn.__name__
+    breaker = breakers[name] = CircuitBreaker(name)
+    last_good = _LastGood()
+    inflight = {}
+    inflight_lock = threading.Lock()
+    # What fn returns when it fails ([], None, ...); used while the breaker is open
+    failed_value = {'value': None}
+    # Set after a slow or failed call: later calls go through the pool so
+    # they can be abandoned in favour of the cached result
+    health = {'slow': False}
+
+    def refresh(key, args, kwargs):
+        started = time.monotonic()
+        result, failure = _call_with_retries(fn, breaker, args, kwargs)
+        health['slow'] = (failure == TRANSIENT or
+                          (time.monotonic() - started) * 1000 > RESILIENCE_STALE_AFTER_MS)
+        if failure:
+            if result is not None:
+                failed_value['value'] = result
+            return result, failure
+        if key is not None:
+            last_good.set(key, result)
+        return result, None
+
+    def _forget(finished, key):
+        with inflight_lock:
+            if inflight.get(key) is finished:
+                del inflight[key]
+
+    def failed_result(result):
+        return result if result is not None else copy.deepcopy(failed_value['value'])
+
+    def stale_or_result(stale, result, failure):
+        if failure == TRANSIENT:
+            return copy.deepcopy(stale[0])
+        if failure:
+            return failed_result(result)
+        return copy.deepcopy(result)
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = None
+        if serve_stale:
+            try:
+                key = (_freeze(args), _freeze(kwargs))
+                hash(key)
+            except TypeError:
+                key = None
+        stale = last_good.get(key) if key is not None else None
+        if stale is None:
+            result, failure = refresh(key, args, kwargs)
+            if failure:
+                return failed_result(result)
+            # The stored result must not be the one the caller decorates
+            return copy.deepcopy(result) if key is not None else result
+
+        if breaker.is_open():
+            return copy.deepcopy(stale[0])
+        if not health['slow'] and key not in inflight:
+            result, failure = refresh(key, args, kwargs)
+            return stale_or_result(stale, result, failure)
+        with inflight_lock:
+            # Concurrent callers share one call per arguments, so a brownout
+            # cannot pile up background calls
+            future = inflight.get(key)
+            started = future is None
+            if started:
+                future = inflight[key] = _get_executor('refresh').submit(
+                    bind_context(refresh), key, args, kwargs)
+        if started:
+            # Outside the lock: the callback runs at once if already done
+            future.add_done_callback(lambda finished: _forget(finished, key))
+        try:
+            result, failure = future.result(timeout=RESILIENCE_STALE_AFTER_MS / 1000)
+        except TimeoutError:
+            logger.warning('%s is slow; serving a result cached %.0fs ago',
+                           name, time.monotonic() - stale[1])
+            return copy.deepcopy(stale[0])
+        return stale_or_result(stale, result, failure)
+    return wrapper
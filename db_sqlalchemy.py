@@ -0,0 +1,833 @@
+"""
+SQLAlchemy implementation of the db.py data-access API.
+Selected with DATA_BACKEND=sqlalchemy for self-hosted Postgres/SQLite
+deployments; queries go straight to the database through the pooled engine
+instead of the Supabase REST API. Functions return the same dict shapes as
+the Supabase backend (string ids, float prices, ISO timestamps) and must be
+called inside an application context.
+"""
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import List, Dict, Any, Optional, Tuple
+
+from sqlalchemy import and_, delete, exists, func, inspect, or_, select, update
+from sqlalchemy.orm import selectinload
+
+from data_cache import menu_snapshot, user_cache
+from db_metrics import log_db_error
+from models import (db, Users, Dish, Order, OrderItem, CartItem, Review,
+                    DishRatingStats, RevenueDailyRollup, RevenueDishRollup)
+
+__all__ = [
+    'get_user_by_auth_id', 'get_user_by_email', 'get_user_by_id', 'create_user',
+    'update_user', 'username_exists', 'email_exists', 'get_all_users',
+    'get_first_user', 'bulk_update_users',
+    'get_all_dishes', 'get_menu_version', 'get_menu_dish', 'get_dish_by_id',
+    'dish_name_exists',
+    'create_dish', 'update_dish', 'set_dish_image_variants', 'get_dish_image_counts',
+    'delete_dish',
+    'get_cart_items', 'add_to_cart', 'update_cart_item', 'remove_cart_item', 'clear_cart',
+    'replace_cart',
+    'create_order', 'get_orders_by_user', 'get_all_orders', 'get_orders_page',
+    'get_order_by_id', 'update_order_status', 'create_order_item', 'checkout_cart',
+    'get_order_items',
+    'get_reviews_by_dish', 'create_review', 'get_review_stats',
+    'get_total_revenue', 'get_revenue_by_date_range', 'get_revenue_by_dish',
+    'get_daily_revenue', 'get_monthly_revenue', 'get_first_order_date',
+    'rebuild_revenue_rollups',
+]
+
+# Serialization helpers
+
+
+def _to_json_value(value):
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _to_dict(obj) -> Dict[str, Any]:
+    """Convert a model instance to the row dict the Supabase API would return"""
+    return {attr.key: _to_json_value(getattr(obj, attr.key))
+            for attr in inspect(obj).mapper.column_attrs}
+
+
+def _uuid(value) -> uuid.UUID:
+    return value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+
+
+def _utc_day(value: datetime) -> date:
+    """Day bucket for a timestamp, in UTC like the SQL functions"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date()
+
+
+def _insert(model):
+    """Dialect-specific INSERT supporting ON CONFLICT (Postgres and SQLite)"""
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model)
+
+
+def _sql_utc_day(column):
+    """SQL expression for _utc_day; SQLite stores UTC timestamps without offset"""
+    if db.engine.dialect.name == 'postgresql':
+        return func.date(func.timezone('UTC', column))
+    return func.date(column)
+
+
+def _increment(model, key: Dict[str, Any], amounts: Dict[str, Any]) -> None:
+    """Upsert a counter row, adding `amounts` to the existing values"""
+    stmt = _insert(model).values(**key, **amounts)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(key),
+        set_={name: getattr(model, name) + getattr(stmt.excluded, name)
+              for name in amounts})
+    db.session.execute(stmt)
+
+
+def _increment_from_select(model, key: List[str], amounts: List[str], query) -> None:
+    """_increment for every row of `query`, whose columns are key then amounts"""
+    stmt = _insert(model).from_select(key + amounts, query)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=key,
+        set_={name: getattr(model, name) + getattr(stmt.excluded, name)
+              for name in amounts})
+    db.session.execute(stmt)
+
+# User operations
+
+
+def get_user_by_auth_id(auth_user_id: str) -> Optional[Dict[str, Any]]:
+    """Get user by Supabase Auth user ID"""
+    try:
+        user = db.session.execute(select(Users).where(
+            Users.auth_user_id == auth_user_id)).scalar_one_or_none()
+        return _to_dict(user) if user else None
+    except Exception as e:
+        log_db_error('getting user by auth ID', e)
+        return None
+
+
+def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
+    """Get user by email"""
+    try:
+        user = db.session.execute(select(Users).where(
+            Users.email == email)).scalar_one_or_none()
+        return _to_dict(user) if user else None
+    except Exception as e:
+        log_db_error('getting user by email', e)
+        return None
+
+
+def get_user_by_id(user_id: str) -> Optional[Dict[str, Any]]:
+    """Get user by ID"""
+    cached = user_cache.get(str(user_id))
+    if cached is not None:
+        return cached
+    try:
+        user = db.session.get(Users, _uuid(user_id))
+        if not user:
+            return None
+        user_data = _to_dict(user)
+        user_cache.set(str(user_id), user_data)
+        return user_data
+    except Exception as e:
+        log_db_error('getting user by ID', e)
+        return None
+
+
+def create_user(auth_user_id: str, username: str, email: str, is_admin: bool = False) -> Optional[Dict[str, Any]]:
+    """Create a new user"""
+    try:
+        user = Users(id=uuid.uuid4(), auth_user_id=auth_user_id, username=username,
+                     email=email, is_admin=is_admin, points=0)
+        db.session.add(user)
+        db.session.commit()
+        return _to_dict(user)
+    except Exception as e:
+        db.session.rollback()
+        log_db_error('creating user', e)
+        return None
+
+
+def update_user(user_id: str, updates: Dict[str, Any]) -> bool:
+    """Update user data"""
+    try:
+        result = db.session.execute(update(Users).where(
+            Users.id == _uuid(user_id)).values(**updates))
+        db.session.commit()
+        user_cache.invalidate(str(user_id))
+        return result.rowcount > 0
+    except Exception as e:
+        db.session.rollback()
+        log_db_error('updating user', e)
+        return False
+
+
+def username_exists(username: str, exclude_user_id: str = None) -> bool:
+    """Check whether a username is taken (case-insensitive)"""
+    try:
+        condition = func.lower(Users.username) == username.lower()
+        if exclude_user_id:
+            condition = and_(condition, Users.id != _uuid(exclude_user_id))
+        return bool(db.session.execute(select(exists().where(condition))).scalar())
+    except Exception as e:
+        log_db_error('checking username', e)
+        return False
+
+
+def email_exists(email: str, exclude_user_id: str = None) -> bool:
+    """Check whether an email is registered (case-insensitive)"""
+    try:
+        condition = func.lower(Users.email) == email.lower()
+        if exclude_user_id:
+            condition = and_(condition, Users.id != _uuid(exclude_user_id))
+        return bool(db.session.execute(select(exists().where(condition))).scalar())
+    except Exception as e:
+        log_db_error('checking email', e)
+        return False
+
+
+def get_all_users() -> List[Dict[str, Any]]:
+    """Get all users"""
+    try:
+        return [_to_dict(user) for user in db.session.execute(select(Users)).scalars()]
+    except Exception as e:
+        log_db_error('getting all users', e)
+        return []
+
+
+def get_first_user() -> Optional[Dict[str, Any]]:
+    """Get the earliest registered user"""
+    try:
+        user = db.session.execute(select(Users).order_by(
+            Users.created_at).limit(1)).scalar_one_or_none()
+        return _to_dict(user) if user else None
+    except Exception as e:
+        log_db_error('getting first user', e)
+        return None
+
+
+def bulk_update_users(updates: Dict[str, Any], filters: Dict[str, Any]) -> int:
+    """Apply updates to every user matching filters in one statement; returns rows updated.
+
+    Filter values that are lists, tuples or sets match any of their items.
+    """
+    if not filters:
+        log_db_error('bulk updating users', 'refusing to update without filters')
+        return 0
+    try:
+        conditions = []
+        for column, value in filters.items():
+            attr = getattr(Users, column)
+            if column == 'id':
+                value = [_uuid(v) for v in value] if isinstance(
+                    value, (list, tuple, set)) else _uuid(value)
+            if isinstance(value, (list, tuple, set)):
+                conditions.append(attr.in_(list(value)))
+            else:
+                conditions.append(attr == value)
+        result = db.session.execute(
+            update(Users).where(*conditions).values(**updates))
+        db.session.commit()
+        user_cache.invalidate()
+        return result.rowcount
+    except Exception as e:
+        db.session.rollback()
+        log_db_error('bulk updating users', e)
+        return 0
+
+# Dish operations
+
+
+def _fetch_all_dishes() -> List[Dict[str, Any]]:
+    dishes = db.session.execute(select(Dish).where(
+        Dish.is_archived.is_(False))).scalars()
+    return [_to_dict(dish) for dish in dishes]
+
+
+def get_all_dishes() -> List[Dict[str, Any]]:
+    """Get all dishes on the menu (served from the in-process menu snapshot)"""
+    try:
+        return menu_snapshot.get(_fetch_all_dishes)
+    except Exception as e:
+        log_db_error('getting all dishes', e)
+        return []
+
+
+def get_menu_version() -> str:
+    """Digest of the menu snapshot; equal in every worker serving the same menu"""
+    try:
+        return menu_snapshot.digest(_fetch_all_dishes)
+    except Exception as e:
+        log_db_error('getting menu version', e)
+        return ''
+
+
+def get_menu_dish(dish_id: str) -> Optional[Dict[str, Any]]:
+    """Get a dish on the menu from the snapshot (None if unknown or archived)"""
+    try:
+        return menu_snapshot.get_dish(_fetch_all_dishes, dish_id)
+    except Exception as e:
+        log_db_error('getting menu dish', e)
+        return None
+
+
+def get_dish_by_id(dish_id: str) -> Optional[Dict[str, Any]]:
+    """Get dish by ID"""
+    try:
+        dish = db.session.get(Dish, _uuid(dish_id))
+        return _to_dict(dish) if dish else None
+    except Exception as e:
+        log_db_error('getting dish by ID', e)
+        return None
+
+
+def dish_name_exists(name: str, exclude_dish_id: str = None) -> bool:
+    """Check whether a dish name is taken (case-insensitive)"""
+    try:
+        condition = and_(func.lower(Dish.name) == name.lower(),
+                         Dish.is_archived.is_(False))
+        if exclude_dish_id:
+            condition = and_(condition, Dish.id != _uuid(exclude_dish_id))
+        return bool(db.session.execute(select(exists().where(condition))).scalar())
+    except Exception as e:
+        log_db_error('checking dish name', e)
+        return False
+
+
+def create_dish(name: str, price: float, description: str = None, image_filename: str = None, section: str = None) -> Optional[Dict[str, Any]]:
+    """Create a new dish"""
+    try:
+        dish = Dish(id=uuid.uuid4(), name=name, price=price, description=description,
+                    image_filename=image_filename, section=section)
+        db.session.add(dish)
+        db.session.commit()
+        menu_snapshot.invalidate()
+        return _to_dict(dish)
+    except Exception as e:
+        db.session.rollback()
+        log_db_error('creating dish', e)
+        return None
+
+
+def update_dish(dish_id: str, updates: Dict[str, Any]) -> bool:
+    """Update dish data"""
+    try:
+        result = db.session.execute(update(Dish).where(
+            Dish.id == _uuid(dish_id)).values(**updates))
+        db.session.commit()
+        menu_snapshot.invalidate()
+        return result.rowcount > 0
+    except Exception as e:
+        db.session.rollback()
+        log_db_error('updating dish', e)
+        return False
+
+
+def set_dish_image_variants(dish_id: str, image_filename: str, variants: Dict[str, Any]) -> bool:
+    """Record processed image variants, unless the dish's image changed meanwhile"""
+    try:
+        result = db.session.execute(update(Dish).where(
+            Dish.id == _uuid(dish_id), Dish.image_filename == image_filename).values(
+            image_variants=variants))
+        db.session.commit()
+        menu_snapshot.invalidate()
+        return result.rowcount > 0
+    except Exception as e:
+        db.session.rollback()
+        log_db_error('setting dish image variants', e)
+        return False
+
+
+def get_dish_image_counts() -> Optional[Dict[str, int]]:
+    """Number of dishes (archived included) using each image_filename; None on error"""
+    try:
+        rows = db.session.execute(select(Dish.image_filename, func.count()).where(
+            Dish.image_filename.isnot(None)).group_by(Dish.image_filename))
+        return {image_filename: count for image_filename, count in rows}
+    except Exception as e:
+        log_db_error('counting dish images', e)
+        return None
+
+
+def delete_dish(dish_id: str) -> bool:
+    """Archive a dish: remove it from the menu and carts, keep its order history"""
+    try:
+        dish_uuid = _uuid(dish_id)
+        result = db.session.execute(update(Dish).where(
+            Dish.id == dish_uuid, Dish.is_archived.is_(False)).values(is_archived=True))
+        if result.rowcount:
+            db.session.execute(delete(CartItem).where(
+                CartItem.dish_id == dish_uuid))
+        db.session.commit()
+        menu_snapshot.invalidate()
+        return result.rowcount > 0
+    except Exception as e:
+        db.session.rollback()
+        log_db_error('deleting dish', e)
+        return False
+
+# Cart operations
+
+
+def get_cart_items(user_id: str) -> List[Dict[str, Any]]:
+    """Get cart items for a user"""
+    try:
+        items = db.session.execute(select(CartItem).where(CartItem.user_id == _uuid(
+            user_id)).options(selectinload(CartItem.dish))).scalars()
+        return [{**_to_dict(item), 'dish': _to_dict(item.dish) if item.dish else None} for item in items]
+    except Exception as e:
+        log_db_error('getting cart items', e)
+        return []
+
+
+def add_to_cart(user_id: str, dish_id: str, quantity: int = 1) -> Optional[Dict[str, Any]]:
+    """Add item to cart or update quantity if exists"""
+    try:
+        stmt = _insert(CartItem).values(id=uuid.uuid4(), user_id=_uuid(user_id),
+                                        dish_id=_uuid(dish_id), quantity=quantity)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_id', 'dish_id'],
+            set_={'quantity': CartItem.quantity + stmt.excluded.quantity}
+        ).returning(CartItem)
+        item = db.session.execute(stmt).scalar_one()
+        db.session.commit()
+        return _to_dict(item)
+    except Exception as e:
+        db.session.rollback()
+        log_db_error('adding to cart', e)
+        return None
+
+
+def update_cart_item(cart_item_id: str, quantity: int) -> bool:
+    """Update cart item quantity"""
+    try:
+        if quantity <= 0:
+            result = db.session.execute(delete(CartItem).where(
+                CartItem.id == _uuid(cart_item_id)))
+        else:
+            result = db.session.execute(update(CartItem).where(
+                CartItem.id == _uuid(cart_item_id)).values(quantity=quantity))
+        db.session.commit()
+        return result.rowcount > 0
+    except Exception as e:
+        db.session.rollback()
+        log_db_error('updating cart item', e)
+        return False
+
+
+def remove_cart_item(cart_item_id: str) -> bool:
+    """Remove item from cart"""
+    try:
+        result = db.session.execute(delete(CartItem).where(
+            CartItem.id == _uuid(cart_item_id)))
+        db.session.commit()
+        return result.rowcount > 0
+    except Exception as e:
+        db.session.rollback()
+        log_db_error('removing cart item', e)
+        return False
+
+
+def clear_cart(user_id: str) -> bool:
+    """Clear all cart items for a user"""
+    try:
+        db.session.execute(delete(CartItem).where(
+            CartItem.user_id == _uuid(user_id)))
+        db.session.commit()
+        return True
+    except Exception as e:
+        db.session.rollback()
+        log_db_error('clearing cart', e)
+        return False
+
+
+def replace_cart(user_id: str, items: List[Dict[str, Any]]) -> bool:
+    """Replace a user's cart rows with items ({id, dish_id, quantity}) in one transaction"""
+    try:
+        user_uuid = _uuid(user_id)
+        items = [item for item in items if item['quantity'] > 0]
+        # Skip dishes archived since they were added
+        active = set(db.session.execute(select(Dish.id).where(
+            Dish.id.in_([_uuid(item['dish_id']) for item in items]),
+            Dish.is_archived.is_(False))).scalars()) if items else set()
+        db.session.execute(delete(CartItem).where(
+            CartItem.user_id == user_uuid))
+        for item in items:
+            if _uuid(item['dish_id']) in active:
+                db.session.add(CartItem(id=_uuid(item['id']), user_id=user_uuid,
+                                        dish_id=_uuid(item['dish_id']), quantity=item['quantity']))
+        db.session.commit()
+        return True
+    except Exception as e:
+        db.session.rollback()
+        log_db_error('replacing cart', e)
+        return False
+
+# Order operations
+
+
+def create_order(user_id: str, total: float, phone_number: str = None) -> Optional[Dict[str, Any]]:
+    """Create a new order"""
+    try:
+        order = Order(id=uuid.uuid4(), user_id=_uuid(user_id), phone_number=phone_number,
+                      total=total, status='pending', points_earned=int(total))  # 1 point per dollar
+        db.session.add(order)
+        db.session.commit()
+        return _to_dict(order)
+    except Exception as e:
+        db.session.rollback()
+        log_db_error('creating order', e)
+        return None
+
+
+def get_orders_by_user(user_id: str) -> List[Dict[str, Any]]:
+    """Get orders for a user"""
+    try:
+        orders = db.session.execute(select(Order).where(Order.user_id == _uuid(
+            user_id)).order_by(Order.created_at.desc())).scalars()
+        return [_to_dict(order) for order in orders]
+    except Exception as e:
+        log_db_error('getting orders by user', e)
+        return []
+
+
+def get_all_orders() -> List[Dict[str, Any]]:
+    """Get all orders (admin)"""
+    try:
+        orders = db.session.execute(
+            select(Order).order_by(Order.created_at.desc())).scalars()
+        return [_to_dict(order) for order in orders]
+    except Exception as e:
+        log_db_error('getting all orders', e)
+        return []
+
+
+def get_orders_page(limit: int = 50, status: str = None, before: Tuple[str, str] = None) -> List[Dict[str, Any]]:
+    """Get a page of orders, newest first, using (created_at, id) keyset pagination.
+
+    `before` is the (created_at, id) of the last order on the previous page.
+    """
+    try:
+        query = select(Order)
+        if status:
+            query = query.where(Order.status == status)
+        if before:
+            created_at = datetime.fromisoformat(before[0])
+            order_id = _uuid(before[1])
+            query = query.where(or_(Order.created_at < created_at, and_(
+                Order.created_at == created_at, Order.id < order_id)))
+        orders = db.session.execute(query.order_by(
+            Order.created_at.desc(), Order.id.desc()).limit(limit)).scalars()
+        return [_to_dict(order) for order in orders]
+    except Exception as e:
+        log_db_error('getting orders page', e)
+        return []
+
+
+def get_order_by_id(order_id: str) -> Optional[Dict[str, Any]]:
+    """Get order by ID"""
+    try:
+        order = db.session.get(Order, _uuid(order_id))
+        return _to_dict(order) if order else None
+    except Exception as e:
+        log_db_error('getting order by ID', e)
+        return None
+
+
+def _apply_order_to_revenue_rollups(order: Order, sign: int) -> None:
+    """Add (sign=1) or remove (sign=-1) one order's contribution to the rollups"""
+    day = _utc_day(order.created_at)
+    _increment(RevenueDailyRollup, {'day': day}, {
+               'order_count': sign, 'revenue': sign * order.total})
+    for item in order.order_items:
+        # The section stored with the item, so removing the order cancels
+        # exactly what adding it did even if the dish has moved since
+        _increment(RevenueDishRollup,
+                   {'day': day, 'dish_id': item.dish_id,
+                       'section': item.section or ''},
+                   {'quantity': sign * item.quantity, 'revenue': sign * item.quantity * item.price})
+
+
+def update_order_status(order_id: str, status: str) -> bool:
+    """Update order status, maintaining the revenue rollups on delivery"""
+    try:
+        order = db.session.get(Order, _uuid(order_id), with_for_update=True)
+        if not order:
+            return False
+        old_status = order.status
+        order.status = status
+        if status == 'delivered' and old_status != 'delivered':
+            _apply_order_to_revenue_rollups(order, 1)
+        elif old_status == 'delivered' and status != 'delivered':
+            _apply_order_to_revenue_rollups(order, -1)
+        db.session.commit()
+        return True
+    except Exception as e:
+        db.session.rollback()
+        log_db_error('updating order status', e)
+        return False
+
+
+def create_order_item(order_id: str, dish_id: str, quantity: int, price: float, section: str = None) -> Optional[Dict[str, Any]]:
+    """Create an order item; section defaults to the dish's current section"""
+    try:
+        if section is None:
+            dish = db.session.get(Dish, _uuid(dish_id))
+            section = (dish.section if dish else None) or ''
+        item = OrderItem(id=uuid.uuid4(), order_id=_uuid(order_id), dish_id=_uuid(dish_id),
+                         quantity=quantity, price=price, section=section)
+        db.session.add(item)
+        db.session.commit()
+        return _to_dict(item)
+    except Exception as e:
+        db.session.rollback()
+        log_db_error('creating order item', e)
+        return None
+
+
+def checkout_cart(user_id: str, discount: float = 0, phone_number: str = None) -> Optional[Dict[str, Any]]:
+    """Create an order from the user's cart, clear the cart and credit points in one transaction.
+
+    Returns the order, {} when the cart is empty, or None when checkout failed.
+    """
+    try:
+        user_uuid = _uuid(user_id)
+        # Lock the cart so a double-submitted checkout cannot order it twice
+        cart_items = db.session.execute(select(CartItem).where(CartItem.user_id == user_uuid).options(
+            selectinload(CartItem.dish)).with_for_update()).scalars().all()
+        if not cart_items:
+            db.session.rollback()
+            return {}
+
+        total = sum((item.dish.price * item.quantity for item in cart_items), Decimal('0'))
+        applied_discount = min(max(Decimal(str(discount or 0)), Decimal('0')), total)
+        final_total = total - applied_discount
+        order = Order(id=uuid.uuid4(), user_id=user_uuid, phone_number=phone_number, total=final_total,
+                      status='pending', points_earned=int(final_total))  # 1 point per dollar
+        db.session.add(order)
+        for item in cart_items:
+            db.session.add(OrderItem(id=uuid.uuid4(), order_id=order.id, dish_id=item.dish_id,
+                                     quantity=item.quantity, price=item.dish.price,
+                                     section=item.dish.section or ''))
+            db.session.delete(item)
+        db.session.execute(update(Users).where(Users.id == user_uuid).values(
+            points=Users.points + order.points_earned))
+        db.session.commit()
+        user_cache.invalidate(str(user_id))  # points were credited
+        return _to_dict(order)
+    except Exception as e:
+        db.session.rollback()
+        log_db_error('checking out cart', e)
+        return None
+
+
+def get_order_items(order_id: str) -> List[Dict[str, Any]]:
+    """Get order items for an order"""
+    try:
+        items = db.session.execute(select(OrderItem).where(OrderItem.order_id == _uuid(
+            order_id)).options(selectinload(OrderItem.dish))).scalars()
+        return [{**_to_dict(item), 'dish': _to_dict(item.dish) if item.dish else None} for item in items]
+    except Exception as e:
+        log_db_error('getting order items', e)
+        return []
+
+# Review operations
+
+
+def get_reviews_by_dish(dish_id: str) -> List[Dict[str, Any]]:
+    """Get reviews for a dish"""
+    try:
+        reviews = db.session.execute(select(Review).where(Review.dish_id == _uuid(dish_id)).options(
+            selectinload(Review.user)).order_by(Review.created_at.desc())).scalars()
+        return [{**_to_dict(review), 'users': _to_dict(review.user) if review.user else None} for review in reviews]
+    except Exception as e:
+        log_db_error('getting reviews by dish', e)
+        return []
+
+
+def create_review(user_id: str, dish_id: str, rating: int, review_text: str = None) -> Optional[Dict[str, Any]]:
+    """Create a new review and update the dish's rating aggregate"""
+    try:
+        review = Review(id=uuid.uuid4(), user_id=_uuid(user_id), dish_id=_uuid(dish_id),
+                        rating=rating, review_text=review_text)
+        db.session.add(review)
+        _increment(DishRatingStats, {'dish_id': review.dish_id}, {
+                   'review_count': 1, 'rating_sum': rating})
+        db.session.commit()
+        return _to_dict(review)
+    except Exception as e:
+        db.session.rollback()
+        log_db_error('creating review', e)
+        return None
+
+
+def get_review_stats() -> Dict[str, Dict[str, Any]]:
+    """Get review statistics for all dishes, keyed by dish ID"""
+    try:
+        return {
+            str(row.dish_id): {
+                'avg_rating': row.rating_sum / row.review_count if row.review_count else 0,
+                'review_count': row.review_count
+            }
+            for row in db.session.execute(select(DishRatingStats)).scalars()
+        }
+    except Exception as e:
+        log_db_error('getting review stats', e)
+        return {}
+
+# Revenue calculation functions (read from the rollup tables)
+
+
+def _day_range(query, column, start_date, end_date):
+    if start_date:
+        query = query.where(column >= date.fromisoformat(start_date[:10]))
+    if end_date:
+        query = query.where(column <= date.fromisoformat(end_date[:10]))
+    return query
+
+
+def get_total_revenue() -> float:
+    """Get total revenue from all completed orders (delivered status)"""
+    return get_revenue_by_date_range(None, None)
+
+
+def get_revenue_by_date_range(start_date: str, end_date: str) -> float:
+    """Get revenue within a specific date range for completed orders"""
+    try:
+        query = _day_range(select(func.coalesce(func.sum(RevenueDailyRollup.revenue), 0)),
+                           RevenueDailyRollup.day, start_date, end_date)
+        return float(db.session.execute(query).scalar())
+    except Exception as e:
+        log_db_error('getting revenue by date range', e)
+        return 0.0
+
+
+def get_revenue_by_dish(start_date: str = None, end_date: str = None) -> List[Dict[str, Any]]:
+    """Get revenue breakdown by dish from completed orders, highest first"""
+    try:
+        revenue = func.sum(RevenueDishRollup.revenue)
+        query = select(Dish.name, revenue).join(
+            Dish, Dish.id == RevenueDishRollup.dish_id)
+        query = _day_range(query, RevenueDishRollup.day, start_date, end_date)
+        rows = db.session.execute(query.group_by(
+            Dish.name).order_by(revenue.desc())).all()
+        return [{'dish_name': name, 'revenue': float(total)} for name, total in rows]
+    except Exception as e:
+        log_db_error('getting revenue by dish', e)
+        return []
+
+
+def _daily_totals(start_date: datetime) -> Dict[date, float]:
+    rows = db.session.execute(select(RevenueDailyRollup.day, RevenueDailyRollup.revenue).where(
+        RevenueDailyRollup.day >= start_date.date())).all()
+    return {day: float(revenue) for day, revenue in rows}
+
+
+def get_daily_revenue(days: int = 30) -> List[Dict[str, Any]]:
+    """Get daily revenue for the last N days from completed orders"""
+    try:
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=days)
+        daily_totals = _daily_totals(start_date)
+
+        # Fill in missing dates with 0
+        return [{'date': (start_date + timedelta(days=offset)).strftime('%Y-%m-%d'),
+                 'revenue': daily_totals.get((start_date + timedelta(days=offset)).date(), 0.0)}
+                for offset in range(days + 1)]
+    except Exception as e:
+        log_db_error('getting daily revenue', e)
+        return []
+
+
+def get_monthly_revenue(months: int = 12) -> List[Dict[str, Any]]:
+    """Get monthly revenue for the last N months from completed orders"""
+    try:
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=months*30)  # Approximate
+
+        # At most a year of daily rollup rows; bucket them by month here
+        monthly_totals = {}
+        for day, revenue in _daily_totals(start_date).items():
+            month_key = f"{day.year}-{day.month:02d}"
+            monthly_totals[month_key] = monthly_totals.get(
+                month_key, 0.0) + revenue
+
+        # Fill in missing months with 0
+        result = []
+        current_date = start_date.replace(day=1)
+        while current_date <= end_date:
+            month_key = f"{current_date.year}-{current_date.month:02d}"
+            result.append({
+                'month': month_key,
+                'revenue': monthly_totals.get(month_key, 0.0)
+            })
+            # Move to next month
+            if current_date.month == 12:
+                current_date = current_date.replace(
+                    year=current_date.year + 1, month=1)
+            else:
+                current_date = current_date.replace(
+                    month=current_date.month + 1)
+
+        return result
+    except Exception as e:
+        log_db_error('getting monthly revenue', e)
+        return []
+
+
+def get_first_order_date() -> Optional[str]:
+    """Get the creation date (YYYY-MM-DD) of the oldest order"""
+    try:
+        first = db.session.execute(select(func.min(Order.created_at))).scalar()
+        return _utc_day(first).isoformat() if first else None
+    except Exception as e:
+        log_db_error('getting first order date', e)
+        return None
+
+
+def rebuild_revenue_rollups(start_date: str, end_date: str) -> Optional[int]:
+    """Recompute revenue rollups for an inclusive range of days; returns orders counted"""
+    try:
+        first_day = date.fromisoformat(start_date)
+        last_day = date.fromisoformat(end_date)
+        window_start = datetime.combine(first_day, datetime.min.time(), timezone.utc)
+        window_end = datetime.combine(
+            last_day + timedelta(days=1), datetime.min.time(), timezone.utc)
+
+        db.session.execute(delete(RevenueDailyRollup).where(
+            RevenueDailyRollup.day.between(first_day, last_day)))
+        db.session.execute(delete(RevenueDishRollup).where(
+            RevenueDishRollup.day.between(first_day, last_day)))
+
+        delivered = and_(Order.status == 'delivered', Order.created_at >= window_start,
+                         Order.created_at < window_end)
+        day = _sql_utc_day(Order.created_at)
+        # One INSERT ... SELECT ... GROUP BY per rollup, like the SQL function
+        _increment_from_select(
+            RevenueDailyRollup, ['day'], ['order_count', 'revenue'],
+            select(day, func.count(), func.sum(Order.total)).where(delivered).group_by(day))
+        section = func.coalesce(OrderItem.section, '')
+        _increment_from_select(
+            RevenueDishRollup, ['day', 'dish_id', 'section'], ['quantity', 'revenue'],
+            select(day, OrderItem.dish_id, section, func.sum(OrderItem.quantity),
+                   func.sum(OrderItem.quantity * OrderItem.price)).join(
+                Order, Order.id == OrderItem.order_id).where(delivered).group_by(
+                day, OrderItem.dish_id, section))
+        orders = db.session.execute(select(func.count()).select_from(Order).where(delivered)).scalar()
+        db.session.commit()
+        return orders
+    except Exception as e:
+        db.session.rollback()
+        log_db_error('rebuilding revenue rollups', e)
+        return None
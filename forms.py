@@ -2,7 +2,7 @@ from flask_wtf import FlaskForm
 from flask_wtf.file import FileField, FileAllowed
 from wtforms import StringField, FloatField, TextAreaField, SelectField, SubmitField, RadioField, PasswordField
 from wtforms.validators import DataRequired, NumberRange, ValidationError, InputRequired, Regexp, Length
-from db import get_all_dishes, get_all_users
+from db import dish_name_exists, username_exists, email_exists
 
 
 class DishForm(FlaskForm):
@@ -21,9 +21,13 @@ class DishForm(FlaskForm):
         ('Other', 'Other')
     ], validators=[DataRequired()])
 
+    def __init__(self, *args, dish_id=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Set when editing so the dish's current name does not count as taken
+        self.dish_id = dish_id
+
     def validate_name(self, field):
-        dishes = get_all_dishes()
-        if any(dish['name'].lower() == field.data.lower() for dish in dishes):
+        if dish_name_exists(field.data, self.dish_id):
             raise ValidationError('Dish name must be unique.')
 
 
@@ -48,11 +52,9 @@ class RegisterForm(FlaskForm):
     admin_code = PasswordField('Admin Code (Optional)')
 
     def validate_username(self, field):
-        users = get_all_users()
-        if any(user['username'].lower() == field.data.lower() for user in users):
+        if username_exists(field.data):
             raise ValidationError('Username already taken.')
 
     def validate_email(self, field):
-        users = get_all_users()
-        if any(user['email'].lower() == field.data.lower() for user in users):
+        if email_exists(field.data):
             raise ValidationError('Email already registered.')
@@ -0,0 +1,154 @@
+"""
+Background processing of dish images.
+Uploads are saved as they are and the request returns at once; a worker
+then writes resized copies at IMAGE_VARIANT_WIDTHS, in each format of
+IMAGE_FORMATS that Pillow can encode (AVIF needs Pillow 11.3+ or the
+pillow-avif-plugin package), to static/uploads/variants/ without any
+EXIF/ICC/XMP metadata, and records them on the dish:
+
+    image_variants = {"webp": {"320": "variants/<name>-320q80.webp", ...}, ...}
+
+Templates render them with the dish_picture macro (templates/dish_image.html),
+built on the dish_image_url and dish_srcset globals registered here.
+`flask process_images` creates variants for dishes uploaded before this.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import url_for
+from PIL import Image, ImageOps
+
+try:
+    import pillow_avif  # noqa: F401  registers AVIF with older Pillow releases
+except ImportError:
+    pillow_avif = None
+
+import db as db_api
+from parallel import green_threads_available
+
+logger = logging.getLogger(__name__)
+
+IMAGE_VARIANT_WIDTHS = tuple(sorted(
+    int(width) for width in os.environ.get('IMAGE_VARIANT_WIDTHS', '320,640,1024').split(',')))
+IMAGE_FORMATS = tuple(
+    name.strip().lower() for name in os.environ.get('IMAGE_FORMATS', 'avif,webp').split(','))
+IMAGE_QUALITY = {
+    'avif': int(os.environ.get('IMAGE_AVIF_QUALITY', 55)),
+    'webp': int(os.environ.get('IMAGE_WEBP_QUALITY', 80)),
+}
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', 2))
+
+VARIANTS_DIR = 'variants'
+
+
+def is_remote(image_filename):
+    """Seeded dishes point at external URLs instead of uploads"""
+    return image_filename.startswith(('http://', 'https://'))
+
+
+def supported_formats():
+    """The formats of IMAGE_FORMATS that this Pillow build can write"""
+    Image.init()
+    return [name for name in IMAGE_FORMATS if name.upper() in Image.SAVE]
+
+
+def build_variants(upload_folder, image_filename):
+    """Write the resized, metadata-free variants of one upload; returns
+    the image_variants mapping"""
+    formats = supported_formats()
+    stem = os.path.splitext(image_filename)[0]
+    os.makedirs(os.path.join(upload_folder, VARIANTS_DIR), exist_ok=True)
+    variants = {}
+    with Image.open(os.path.join(upload_folder, image_filename)) as original:
+        # Apply the EXIF orientation before the EXIF data is dropped
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            transparent = image.mode in ('LA', 'PA') or 'transparency' in image.info
+            image = image.convert('RGBA' if transparent else 'RGB')
+        # Never upscale; an image narrower than every width gets one variant
+        widths = [width for width in IMAGE_VARIANT_WIDTHS if width <= image.width] or [image.width]
+        for width in widths:
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.LANCZOS)
+            resized.info = {}  # no EXIF, ICC profile or XMP in the output
+            for name in formats:
+                quality = IMAGE_QUALITY.get(name, 80)
+                # Settings are part of the name, so a name always means the same bytes
+                variant = f'{VARIANTS_DIR}/{stem}-{width}q{quality}.{name}'
+                resized.save(os.path.join(upload_folder, variant), name.upper(), quality=quality)
+                variants.setdefault(name, {})[str(width)] = variant
+    return variants
+
+
+def dish_image_url(dish):
+    """URL of a dish's original image, or the logo when it has none"""
+    image_filename = dish.get('image_filename') if dish else None
+    if not image_filename:
+        return url_for('static', filename='logo.png')
+    if is_remote(image_filename):
+        return image_filename
+    return url_for('static', filename=f'uploads/{image_filename}')
+
+
+def dish_srcset(dish, image_format):
+    """srcset of a dish's variants in one format ('' until processed)"""
+    variants = ((dish.get('image_variants') if dish else None) or {}).get(image_format) or {}
+    return ', '.join(f"{url_for('static', filename=f'uploads/{path}')} {width}w"
+                     for width, path in sorted(variants.items(), key=lambda item: int(item[0])))
+
+
+class ImagePipeline:
+    """Thread pool that processes uploads after the request has returned"""
+
+    def __init__(self):
+        self._app = None
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self._app = app
+        app.add_template_global(dish_image_url)
+        app.add_template_global(dish_srcset)
+        formats = supported_formats()
+        skipped = sorted(set(IMAGE_FORMATS) - set(formats))
+        if skipped:
+            logger.info('Pillow cannot write %s; skipping those image variants', ', '.join(skipped))
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=IMAGE_WORKERS, thread_name_prefix='image-pipeline')
+        return self._executor
+
+    def submit(self, dish_id, image_filename):
+        """Queue variants for a dish's new upload; returns the future (or None)"""
+        if not image_filename or is_remote(image_filename):
+            return None
+        return self._get_executor().submit(self.process, dish_id, image_filename)
+
+    def process(self, dish_id, image_filename):
+        """Build and record the variants of one upload"""
+        upload_folder = self._app.config['UPLOAD_FOLDER']
+        try:
+            if green_threads_available():
+                # Green threads would stall every request while Pillow works
+                from eventlet import tpool
+                variants = tpool.execute(build_variants, upload_folder, image_filename)
+            else:
+                variants = build_variants(upload_folder, image_filename)
+            with self._app.app_context():
+                if not db_api.set_dish_image_variants(dish_id, image_filename, variants):
+                    logger.info('Dish %s no longer uses %s; variants not recorded',
+                                dish_id, image_filename)
+                    return None
+            return variants
+        except Exception as e:
+            logger.error('Processing image %s of dish %s failed: %s', image_filename, dish_id, e)
+            return None
+
+
+image_pipeline = ImagePipeline()
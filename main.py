@@ -5,18 +5,30 @@ from functools import wraps
 from collections import defaultdict
 from flask import Flask, render_template, redirect, url_for, request, flash, Blueprint, session, jsonify
 from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
 from flask_login import LoginManager, login_user, login_required, logout_user, current_user, UserMixin
 from flask_socketio import SocketIO
 from flask_wtf import CSRFProtect
-from flask_sqlalchemy import SQLAlchemy
+from flask_wtf.csrf import generate_csrf
 from flask_migrate import Migrate
 from forms import DishForm, ReviewForm, RegisterForm
+from validation import is_valid_uuid, parse_timestamp
 from db import *
+import db as db_api
 from sockets import socketio, emit_order_status_update
+from parallel import run_parallel
+from cart_store import cart_store
+from db_metrics import init_db_metrics
+from query_watch import init_query_watch
+from db_recorder import init_db_recorder
+from static_assets import init_static_assets
+from image_pipeline import image_pipeline, is_remote
+from upload_store import save_upload, collect_garbage
+from page_cache import init_page_cache, page_etag, not_modified, cached_page, review_stats, ratings_changed, render_menu_section
 import os
 import uuid
 import logging
+import click
+from datetime import date, timedelta
 from supabase import create_client, Client
 from dotenv import load_dotenv
 from logging_config import setup_logging, init_sentry
@@ -26,9 +38,23 @@ load_dotenv()
 app = Flask(__name__)
 
 # Database configuration (use DATABASE_URL if provided, otherwise fallback to sqlite)
-app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
-    'DATABASE_URL', 'sqlite:///app.db')
+database_url = os.environ.get('DATABASE_URL', 'sqlite:///app.db')
+if database_url.startswith('postgres://'):
+    # Heroku-style URLs are no longer accepted by SQLAlchemy 1.4+
+    database_url = database_url.replace('postgres://', 'postgresql://', 1)
+app.config['SQLALCHEMY_DATABASE_URI'] = database_url
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Pooled connections for the SQLAlchemy data backend (DATA_BACKEND=sqlalchemy)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'pool_pre_ping': True,
+    'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+}
+if not database_url.startswith('sqlite'):
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'].update({
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+    })
 
 # Security configuration
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', os.urandom(32))
@@ -41,11 +67,10 @@ init_security(app)
 # Initialize CORS (applies secure CORS config depending on environment)
 init_cors(app)
 
-db = SQLAlchemy(app)
+# Bind the models' SQLAlchemy instance (app.extensions.db) to this app
+db.init_app(app)
 migrate = Migrate(app, db)
 
-# Import models after initializing SQLAlchemy
-
 # Set up logging
 setup_logging(app)
 
@@ -77,24 +102,41 @@ else:
 login_manager = LoginManager(app)
 login_manager.login_view = 'login'
 socketio.init_app(app, async_mode='eventlet')
+# Active carts live in Redis/memory and are written behind to cart_item
+cart_store.init_app(app)
+# Data-access call metrics (/metrics, X-DB-Calls)
+init_db_metrics(app)
+# Dev/staging warnings for N+1 patterns and slow calls (QUERY_WATCH)
+init_query_watch(app)
+# Record requests and their data-access calls for offline replay (DB_RECORD_PATH)
+init_db_recorder(app)
+# Shared cache for rendered menu fragments and rating stats (REDIS_URL)
+init_page_cache(app)
+# Fingerprinted, precompressed static files (scripts/build_static.py)
+init_static_assets(app)
+# Resized WebP/AVIF variants of dish uploads, built after the request returns
+image_pipeline.init_app(app)
+
+
+class User(UserMixin):
+    """Flask-Login user built from a users row"""
+
+    def __init__(self, data):
+        self.id = data['id']
+        self.username = data['username']
+        self.email = data['email']
+        self.is_admin = data['is_admin']
+        self.points = data['points']
+
+    def get_id(self):
+        return str(self.id)
 
 
 @login_manager.user_loader
 def load_user(user_id):
+    # get_user_by_id is served from a short-TTL per-worker cache
     user_data = get_user_by_id(user_id)
     if user_data:
-        # Create a user object for Flask-Login
-        class User(UserMixin):
-            def __init__(self, data):
-                self.id = data['id']
-                self.username = data['username']
-                self.email = data['email']
-                self.is_admin = data['is_admin']
-                self.points = data['points']
-
-            def get_id(self):
-                return str(self.id)
-
         return User(user_data)
     return None
 
@@ -132,12 +174,9 @@ def admin_add_dish():
     if form.validate_on_submit():
         image_filename = None
         if form.image.data:
-            image_file = form.image.data
-            filename = secure_filename(image_file.filename)
-            upload_path = os.path.join('static', 'uploads', filename)
             try:
-                image_file.save(upload_path)
-                image_filename = filename
+                # Stored under its content hash (see upload_store.py)
+                image_filename = save_upload(form.image.data, app.config['UPLOAD_FOLDER'])
             except Exception as e:
                 print(f"Error saving image: {e}")
                 flash('Error saving image!')
@@ -151,7 +190,8 @@ def admin_add_dish():
             section=form.section.data
         )
         if dish:
-
+            # Variants are recorded on the dish when ready
+            image_pipeline.submit(dish['id'], image_filename)
             flash('Dish added!')
             return redirect(url_for('admin_dashboard'))
         else:
@@ -165,12 +205,12 @@ def admin_add_dish():
 @login_required
 @admin_required
 def admin_edit_dish(dish_id):
-    dish = get_dish_by_id(dish_id)
+    dish = get_dish_by_id(dish_id) if is_valid_uuid(dish_id) else None
     if not dish:
         flash('Dish not found!')
         return redirect(url_for('admin_dashboard'))
 
-    form = DishForm(obj=dish)
+    form = DishForm(obj=dish, dish_id=dish_id)
     if form.validate_on_submit():
         updates = {
             'name': form.name.data,
@@ -180,13 +220,15 @@ def admin_edit_dish(dish_id):
         }
 
         if form.image.data:
-            image_file = form.image.data
-            filename = secure_filename(image_file.filename)
-            upload_path = os.path.join('static', 'uploads', filename)
-            image_file.save(upload_path)
-            updates['image_filename'] = filename
+            filename = save_upload(form.image.data, app.config['UPLOAD_FOLDER'])
+            if filename != dish.get('image_filename'):
+                updates['image_filename'] = filename
+                # The old variants belong to the previous image
+                updates['image_variants'] = None
 
         if update_dish(dish_id, updates):
+            if 'image_filename' in updates:
+                image_pipeline.submit(dish_id, updates['image_filename'])
             flash('Dish updated!')
             return redirect(url_for('admin_dashboard'))
         else:
@@ -200,7 +242,7 @@ def admin_edit_dish(dish_id):
 @login_required
 @admin_required
 def admin_delete_dish(dish_id):
-    if delete_dish(dish_id):
+    if is_valid_uuid(dish_id) and delete_dish(dish_id):
         flash('Dish deleted!')
     else:
         flash('Error deleting dish!')
@@ -209,26 +251,77 @@ def admin_delete_dish(dish_id):
 # Admin orders route
 
 
+ORDER_STATUSES = ['pending', 'preparing', 'ready', 'delivered']
+ADMIN_ORDERS_PAGE_SIZE = 50
+
+
+def parse_order_cursor(cursor):
+    """(created_at, id) of an order board cursor, normalised; raises
+    ValueError unless it is "<ISO timestamp>|<order UUID>"."""
+    created_at, _, order_id = cursor.rpartition('|')
+    timestamp = parse_timestamp(created_at)
+    if timestamp is None or not is_valid_uuid(order_id):
+        raise ValueError(f'Invalid order cursor: {cursor!r}')
+    return timestamp.isoformat(), str(uuid.UUID(order_id))
+
+
+def get_admin_orders_page(status, cursor):
+    """Return (orders, next_cursor) for the order board.
+
+    Cursors are "<created_at>|<id>" of the last row shown; next_cursor is None
+    on the last page. Raises ValueError for a malformed cursor.
+    """
+    before = parse_order_cursor(cursor) if cursor else None
+    # Fetch one extra row to know whether another page exists
+    orders = get_orders_page(ADMIN_ORDERS_PAGE_SIZE + 1, status, before)
+    next_cursor = None
+    if len(orders) > ADMIN_ORDERS_PAGE_SIZE:
+        orders = orders[:ADMIN_ORDERS_PAGE_SIZE]
+        last = orders[-1]
+        next_cursor = f"{last['created_at']}|{last['id']}"
+    return orders, next_cursor
+
+
 @app.route('/admin/orders')
 @login_required
 @admin_required
 def admin_orders():
-    orders = get_all_orders()
-    return render_template('admin_orders.html', orders=orders)
+    status = request.args.get('status')
+    if status not in ORDER_STATUSES:
+        status = None
+    orders, next_cursor = get_admin_orders_page(status, None)
+    return render_template('admin_orders.html', orders=orders, next_cursor=next_cursor,
+                           status=status, statuses=ORDER_STATUSES)
+
+
+@app.route('/admin/orders/page')
+@login_required
+@admin_required
+def admin_orders_page():
+    status = request.args.get('status')
+    if status not in ORDER_STATUSES:
+        status = None
+    try:
+        orders, next_cursor = get_admin_orders_page(
+            status, request.args.get('cursor'))
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    return jsonify({'orders': orders, 'next_cursor': next_cursor})
 
 
 @app.route('/admin/orders/<order_id>/status/<status>', methods=['POST'])
 @login_required
 @admin_required
 def update_order_status(order_id, status):
-    if status not in ['pending', 'preparing', 'ready', 'delivered']:
+    if status not in ORDER_STATUSES:
         flash('Invalid status')
         return redirect(url_for('admin_orders'))
 
-    if update_order_status(order_id, status):
+    # The db function also folds the order into the revenue rollups on delivery
+    if db_api.update_order_status(order_id, status):
         flash(f'Order {order_id} status updated to {status}')
         try:
-            emit_order_status_update(socketio, order_id, status)
+            emit_order_status_update(order_id, status)
         except Exception as e:
             print(f"SocketIO emit failed: {e}")
     else:
@@ -240,18 +333,38 @@ def update_order_status(order_id, status):
 @login_required
 @admin_required
 def admin_revenue():
-    from db import get_total_revenue, get_revenue_by_dish, get_daily_revenue, get_monthly_revenue
+    from db import get_total_revenue, get_revenue_by_date_range, get_revenue_by_dish, get_daily_revenue, get_monthly_revenue
 
-    total_revenue = get_total_revenue()
-    dish_revenue = get_revenue_by_dish()
-    daily_revenue = get_daily_revenue(30)
-    monthly_revenue = get_monthly_revenue(12)
+    # Optional YYYY-MM-DD filters for the total and per-dish figures
+    start_date = request.args.get('start') or None
+    end_date = request.args.get('end') or None
+    try:
+        for value in (start_date, end_date):
+            if value:
+                date.fromisoformat(value)
+    except ValueError:
+        flash('Invalid date filter')
+        return redirect(url_for('admin_revenue'))
+
+    if start_date or end_date:
+        total_call = (get_revenue_by_date_range, start_date, end_date)
+    else:
+        total_call = (get_total_revenue,)
+    # The four queries are independent; run them concurrently
+    results = run_parallel({
+        'total_revenue': total_call,
+        'dish_revenue': (get_revenue_by_dish, start_date, end_date),
+        'daily_revenue': (get_daily_revenue, 30),
+        'monthly_revenue': (get_monthly_revenue, 12),
+    }, defaults={'total_revenue': 0.0, 'dish_revenue': [], 'daily_revenue': [], 'monthly_revenue': []})
 
     return render_template('admin_revenue.html',
-                           total_revenue=total_revenue,
-                           dish_revenue=dish_revenue,
-                           daily_revenue=daily_revenue,
-                           monthly_revenue=monthly_revenue)
+                           total_revenue=results['total_revenue'],
+                           dish_revenue=results['dish_revenue'],
+                           daily_revenue=results['daily_revenue'],
+                           monthly_revenue=results['monthly_revenue'],
+                           start_date=start_date,
+                           end_date=end_date)
 
 
 @app.route('/admin/promote_all', methods=['POST'])
@@ -261,9 +374,7 @@ def promote_all_users():
     admin_code = request.form.get('admin_code', '').strip()
     admin_code = ''.join(admin_code.split())  # Remove all spaces
     if admin_code.lower() == app.config.get('ADMIN_CLAIM_CODE').lower():
-        users = get_all_users()
-        for user in users:
-            update_user(user['id'], {'is_admin': True})
+        bulk_update_users({'is_admin': True}, {'is_admin': False})
         flash('All users have been promoted to admin.')
     else:
         flash('Invalid admin code.')
@@ -274,12 +385,9 @@ def promote_all_users():
 
 @app.route('/')
 def home():
-    dishes = get_all_dishes()
-    # Group dishes by section
-    sections = defaultdict(list)
-    for dish in dishes:
-        sections[dish['section']].append(dish)
-    return render_template('home.html', sections=sections)
+    # home.html only varies by the viewer, which the ETag covers
+    etag = page_etag()
+    return not_modified(etag) or cached_page(etag, lambda: render_template('home.html'))
 
 
 @app.route('/register', methods=['GET', 'POST'])
@@ -344,18 +452,6 @@ def login():
             if auth_response.user:
                 user_data = get_user_by_auth_id(auth_response.user.id)
                 if user_data:
-                    # Create user object for Flask-Login
-                    class User(UserMixin):
-                        def __init__(self, data):
-                            self.id = data['id']
-                            self.username = data['username']
-                            self.email = data['email']
-                            self.is_admin = data['is_admin']
-                            self.points = data['points']
-
-                        def get_id(self):
-                            return str(self.id)
-
                     user = User(user_data)
                     login_user(user)
                     return redirect(url_for('home'))
@@ -376,41 +472,61 @@ def logout():
     return redirect(url_for('home'))
 
 
+@app.route('/csrf-token')
+def csrf_token():
+    """Token for forms on cached pages, fetched by static/csrf.js"""
+    response = jsonify({'csrf_token': generate_csrf()})
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
 @app.route('/menu', methods=['GET', 'POST'])
 @login_required
 def menu():
-    # Fetch all dishes
-    dishes = get_all_dishes()
-
-    # Get review stats for all dishes
-    review_stats = get_review_stats()
-
-    menu_sections = defaultdict(list)
-    for dish in dishes:
-        stats = review_stats.get(
-            dish['id'], {'avg_rating': 0, 'review_count': 0})
-        dish['avg_rating'] = stats['avg_rating']
-        dish['review_count'] = stats['review_count']
-        menu_sections[dish['section']].append(dish)
-
-    # Define the desired order of sections
-    section_order = ['Breakfast', 'Lunch', 'Dinner',
-                     'Drinks', 'Daily Specials', 'Other']
-    sorted_menu_sections = {key: menu_sections[key]
-                            for key in section_order if key in menu_sections}
-    return render_template('menu.html', menu_sections=sorted_menu_sections)
+    review_stats_by_dish, stats_digest = review_stats()
+    etag = page_etag(get_menu_version(), stats_digest)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    def render():
+        # Fetch all dishes
+        dishes = get_all_dishes()
+
+        menu_sections = defaultdict(list)
+        for dish in dishes:
+            stats = review_stats_by_dish.get(
+                dish['id'], {'avg_rating': 0, 'review_count': 0})
+            dish['avg_rating'] = stats['avg_rating']
+            dish['review_count'] = stats['review_count']
+            menu_sections[dish['section']].append(dish)
+
+        # Define the desired order of sections
+        section_order = ['Breakfast', 'Lunch', 'Dinner',
+                         'Drinks', 'Daily Specials', 'Other']
+        # Each section is rendered from the fragment cache unless it changed
+        sorted_menu_sections = {key: render_menu_section(key, menu_sections[key])
+                                for key in section_order if key in menu_sections}
+        return render_template('menu.html', menu_sections=sorted_menu_sections)
+
+    return cached_page(etag, render)
 
 
 @app.route('/add_to_cart/<dish_id>', methods=['POST'])
 @login_required
 def add_to_cart(dish_id):
     try:
-        dish = get_dish_by_id(dish_id)
+        # Malformed IDs never reach the database
+        if not is_valid_uuid(dish_id):
+            flash('Dish not found!')
+            return redirect(url_for('menu'))
+        # Menu snapshot lookup; archived dishes are not on the menu
+        dish = get_menu_dish(dish_id)
         if not dish:
             flash('Dish not found!')
             return redirect(url_for('menu'))
 
-        if add_to_cart(current_user.id, dish_id):
+        if cart_store.add_item(current_user.id, dish_id):
             flash('Added to cart!')
         else:
             flash('Error adding to cart!')
@@ -425,8 +541,11 @@ def add_to_cart(dish_id):
 @login_required
 def dish_detail(dish_id):
     try:
+        if not is_valid_uuid(dish_id):
+            flash('Dish not found!')
+            return redirect(url_for('menu'))
         dish = get_dish_by_id(dish_id)
-        if not dish:
+        if not dish or dish.get('is_archived'):
             flash('Dish not found!')
             return redirect(url_for('menu'))
 
@@ -449,16 +568,19 @@ def dish_detail(dish_id):
 @login_required
 def submit_review(dish_id):
     try:
+        if not is_valid_uuid(dish_id):
+            flash('Dish not found!')
+            return redirect(url_for('menu'))
         dish = get_dish_by_id(dish_id)
-        if not dish:
+        if not dish or dish.get('is_archived'):
             flash('Dish not found!')
             return redirect(url_for('menu'))
 
         form = ReviewForm()
-        reviews = get_reviews_by_dish(dish_id)
         if form.validate_on_submit():
             rating = form.rating.data
             if create_review(current_user.id, dish_id, int(rating) if rating else None, form.review_text.data):
+                ratings_changed()
                 flash('Review submitted!')
                 return redirect(url_for('dish_detail', dish_id=dish_id))
             else:
@@ -466,6 +588,8 @@ def submit_review(dish_id):
         else:
             flash('Please select a rating.')
 
+        # Only needed when re-rendering the form; the success path redirects
+        reviews = get_reviews_by_dish(dish_id)
         # Calculate average rating and review count for the template
         stats = calculate_review_stats(reviews)
         dish['avg_rating'] = stats['avg_rating']
@@ -480,7 +604,7 @@ def submit_review(dish_id):
 @app.route('/cart', methods=['GET', 'POST'])
 @login_required
 def cart():
-    cart_items = get_cart_items(current_user.id)
+    cart_items = cart_store.get_cart(current_user.id)
     items = []
     total = 0
     for item in cart_items:
@@ -513,50 +637,24 @@ def cart():
 @login_required
 def checkout():
     try:
-        cart_items = get_cart_items(current_user.id)
-        if not cart_items:
-            flash('Your cart is empty!')
+        discount = float(request.form.get('discount', 0))
+        # Order, order items, cart clearing and points credit happen in one
+        # transaction, after the cart store has flushed the latest cart
+        order = cart_store.checkout(
+            current_user.id, lambda: checkout_cart(current_user.id, discount))
+        if order is None:
+            flash('We could not place your order. Please try again.')
             return redirect(url_for('cart'))
-        total = 0
-        order = create_order(current_user.id, 0, None)
         if not order:
-            flash('Error creating order!')
+            flash('Your cart is empty!')
             return redirect(url_for('cart'))
 
-        for item in cart_items:
-            dish = item['dish']
-            if dish:
-                subtotal = dish['price'] * item['quantity']
-                total += subtotal
-                create_order_item(order['id'], dish['id'],
-                                  item['quantity'], dish['price'])
-                remove_cart_item(item['id'])
-
-        discount = float(request.form.get('discount', 0))
-        final_total = total - discount
-        points_earned = int(final_total)  # 1 point per $1 spent
-
-        # Update order with final total and points
-        # This is just to update, but we need to add total update
-        update_order_status(order['id'], 'pending')
-        # Note: We need to add a function to update order total and points
-
-        # Update user points
-        current_user.points += points_earned
-        update_user(current_user.id, {'points': current_user.points})
+        current_user.points += order['points_earned']
 
         if 'redeem_points' in session:
             # Clear redeemed points after checkout
             session.pop('redeem_points')
 
-        # For now, manually update order total (we should add this to db.py)
-        # This is a temporary fix - ideally we'd have update_order function
-        try:
-            supabase.table('order').update(
-                {'total': final_total, 'points_earned': points_earned}).eq('id', order['id']).execute()
-        except Exception as e:
-            print(f"Error updating order total: {e}")
-
         return render_template('order_confirmation.html', order=order, discount=discount)
     except Exception as e:
         print(f"Error in checkout: {e}")
@@ -569,7 +667,7 @@ def checkout():
 def update_cart_item(cart_item_id):
     try:
         quantity = int(request.form['quantity'])
-        if update_cart_item(cart_item_id, quantity):
+        if cart_store.update_item(current_user.id, cart_item_id, quantity):
             flash('Cart updated!')
         else:
             flash('Error updating cart!')
@@ -584,7 +682,7 @@ def update_cart_item(cart_item_id):
 @login_required
 def remove_cart_item(cart_item_id):
     try:
-        if remove_cart_item(cart_item_id):
+        if cart_store.remove_item(current_user.id, cart_item_id):
             flash('Item removed from cart!')
         else:
             flash('Error removing item from cart!')
@@ -604,15 +702,9 @@ def profile():
         password = request.form.get('password')
 
         # Check for unique username/email (ignore current user's own)
-        all_users = get_all_users()
-        existing_username = any(
-            u['username'] == username and u['id'] != current_user.id for u in all_users)
-        existing_email = any(u['email'] == email and u['id']
-                             != current_user.id for u in all_users)
-
-        if existing_username:
+        if username_exists(username, current_user.id):
             flash('Username already taken')
-        elif existing_email:
+        elif email_exists(email, current_user.id):
             flash('Email already taken')
         else:
             updates = {'username': username, 'email': email}
@@ -704,14 +796,80 @@ def seed():
     seed_database()
 
 
+# Rebuild the revenue rollup tables from order history, one batch of days at a time
+@app.cli.command('backfill_revenue_rollups')
+@click.option('--batch-days', default=31, show_default=True, type=click.IntRange(min=1),
+              help='Days recomputed per database call.')
+def backfill_revenue_rollups(batch_days):
+    first_date = get_first_order_date()
+    if not first_date:
+        print('No orders found. Nothing to backfill.')
+        return
+
+    batch_start = date.fromisoformat(first_date)
+    today = date.today()
+    total_orders = 0
+    while batch_start <= today:
+        batch_end = min(batch_start + timedelta(days=batch_days - 1), today)
+        orders = rebuild_revenue_rollups(
+            batch_start.isoformat(), batch_end.isoformat())
+        if orders is None:
+            print(f'Failed to rebuild rollups for {batch_start} to {batch_end}.')
+            return
+        total_orders += orders
+        print(f'Rebuilt {batch_start} to {batch_end}: {orders} delivered orders.')
+        batch_start = batch_end + timedelta(days=1)
+    print(f'Backfill complete: {total_orders} delivered orders rolled up.')
+
+
+# Build image variants for dishes uploaded before the image pipeline
+@app.cli.command('process_images')
+@click.option('--force', is_flag=True, help='Rebuild variants that already exist.')
+def process_images(force):
+    processed = 0
+    for dish in get_all_dishes():
+        image_filename = dish.get('image_filename')
+        if not image_filename or is_remote(image_filename) or (dish.get('image_variants') and not force):
+            continue
+        if not os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], image_filename)):
+            print(f'Missing upload for {dish["name"]}: {image_filename}')
+            continue
+        if image_pipeline.process(dish['id'], image_filename):
+            processed += 1
+            print(f'Processed {dish["name"]}')
+    print(f'{processed} dish image(s) processed.')
+
+
+# Delete uploads no dish references any more (run periodically)
+@app.cli.command('gc_uploads')
+@click.option('--dry-run', is_flag=True, help='List what would be deleted.')
+@click.option('--grace', type=int, default=None,
+              help='Keep unreferenced files younger than this many seconds (default: UPLOAD_GC_GRACE).')
+def gc_uploads(dry_run, grace):
+    references = get_dish_image_counts()
+    if references is None:
+        print('Could not read dish images; nothing deleted.')
+        return
+    kwargs = {} if grace is None else {'grace': grace}
+    deleted, freed = collect_garbage(app.config['UPLOAD_FOLDER'], references, dry_run=dry_run, **kwargs)
+    for path in deleted:
+        print(('Would delete ' if dry_run else 'Deleted ') + os.path.relpath(path, app.config['UPLOAD_FOLDER']))
+    print(f'{len(deleted)} file(s), {freed / 1024:.0f} KB {"reclaimable" if dry_run else "freed"}.')
+
+
 # Make the first user an admin (run once)
 @app.cli.command('make_admin')
-def make_admin():
-    users = get_all_users()
-    if users:
-        user = users[0]
-        update_user(user['id'], {'is_admin': True})
-        print(f'User {user["username"]} is now an admin.')
+@click.option('--email', 'emails', multiple=True,
+              help='Email of a user to promote (repeatable). Defaults to the first user.')
+def make_admin(emails):
+    if emails:
+        promoted = bulk_update_users({'is_admin': True}, {'email': list(emails)})
+        print(f'{promoted} user(s) are now admins.')
+    else:
+        user = get_first_user()
+        if user:
+            bulk_update_users({'is_admin': True}, {'id': user['id']})
+            print(f'User {user["username"]} is now an admin.')
 
     # Initialize rate limiting
     from rate_limiting import init_limiter, configure_route_limits
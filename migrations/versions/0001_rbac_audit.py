@@ -6,7 +6,6 @@ Create Date: 2025-11-08 00:00:00.000000
 """
 from alembic import op
 import sqlalchemy as sa
-from sqlalchemy.dialects import postgresql
 
 # revision identifiers, used by Alembic.
 revision = '0001_rbac_audit'
@@ -19,7 +18,7 @@ def upgrade():
     # Roles table
     op.create_table(
         'roles',
-        sa.Column('id', postgresql.UUID(as_uuid=True),
+        sa.Column('id', sa.Uuid(),
                   primary_key=True, nullable=False),
         sa.Column('name', sa.String(length=100), nullable=False, unique=True),
         sa.Column('created_at', sa.TIMESTAMP(timezone=True),
@@ -29,7 +28,7 @@ def upgrade():
     # Permissions table
     op.create_table(
         'permissions',
-        sa.Column('id', postgresql.UUID(as_uuid=True),
+        sa.Column('id', sa.Uuid(),
                   primary_key=True, nullable=False),
         sa.Column('code', sa.String(length=150), nullable=False, unique=True),
         sa.Column('description', sa.String(length=255)),
@@ -40,27 +39,27 @@ def upgrade():
     # Role-Permissions association
     op.create_table(
         'role_permissions',
-        sa.Column('role_id', postgresql.UUID(as_uuid=True), sa.ForeignKey(
+        sa.Column('role_id', sa.Uuid(), sa.ForeignKey(
             'roles.id', ondelete='CASCADE'), primary_key=True, nullable=False),
-        sa.Column('permission_id', postgresql.UUID(as_uuid=True), sa.ForeignKey(
+        sa.Column('permission_id', sa.Uuid(), sa.ForeignKey(
             'permissions.id', ondelete='CASCADE'), primary_key=True, nullable=False),
     )
 
     # User-Roles association
     op.create_table(
         'user_roles',
-        sa.Column('user_id', postgresql.UUID(as_uuid=True), sa.ForeignKey(
+        sa.Column('user_id', sa.Uuid(), sa.ForeignKey(
             'users.id', ondelete='CASCADE'), primary_key=True, nullable=False),
-        sa.Column('role_id', postgresql.UUID(as_uuid=True), sa.ForeignKey(
+        sa.Column('role_id', sa.Uuid(), sa.ForeignKey(
             'roles.id', ondelete='CASCADE'), primary_key=True, nullable=False),
     )
 
     # Audit logs
     op.create_table(
         'audit_logs',
-        sa.Column('id', postgresql.UUID(as_uuid=True),
+        sa.Column('id', sa.Uuid(),
                   primary_key=True, nullable=False),
-        sa.Column('actor_id', postgresql.UUID(as_uuid=True),
+        sa.Column('actor_id', sa.Uuid(),
                   sa.ForeignKey('users.id', ondelete='SET NULL')),
         sa.Column('action', sa.String(length=100), nullable=False),
         sa.Column('entity', sa.String(length=100), nullable=False),
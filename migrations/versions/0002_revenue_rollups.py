@@ -0,0 +1,45 @@
+"""create revenue rollup tables
+
+Revision ID: 0002_revenue_rollups
+Revises: 0001_rbac_audit
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0002_revenue_rollups'
+down_revision = '0001_rbac_audit'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Delivered revenue per day
+    op.create_table(
+        'revenue_daily_rollup',
+        sa.Column('day', sa.Date(), primary_key=True, nullable=False),
+        sa.Column('order_count', sa.Integer(),
+                  nullable=False, server_default='0'),
+        sa.Column('revenue', sa.Numeric(12, 2),
+                  nullable=False, server_default='0'),
+    )
+
+    # Delivered revenue per day x dish x section
+    op.create_table(
+        'revenue_dish_rollup',
+        sa.Column('day', sa.Date(), primary_key=True, nullable=False),
+        sa.Column('dish_id', sa.Uuid(), sa.ForeignKey(
+            'dish.id', ondelete='CASCADE'), primary_key=True, nullable=False),
+        sa.Column('section', sa.String(length=100), primary_key=True,
+                  nullable=False, server_default=''),
+        sa.Column('quantity', sa.Integer(),
+                  nullable=False, server_default='0'),
+        sa.Column('revenue', sa.Numeric(12, 2),
+                  nullable=False, server_default='0'),
+    )
+
+
+def downgrade():
+    op.drop_table('revenue_dish_rollup')
+    op.drop_table('revenue_daily_rollup')
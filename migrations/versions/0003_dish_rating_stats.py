@@ -0,0 +1,36 @@
+"""create dish rating aggregate
+
+Revision ID: 0003_dish_rating_stats
+Revises: 0002_revenue_rollups
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0003_dish_rating_stats'
+down_revision = '0002_revenue_rollups'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'dish_rating_stats',
+        sa.Column('dish_id', sa.Uuid(), sa.ForeignKey(
+            'dish.id', ondelete='CASCADE'), primary_key=True, nullable=False),
+        sa.Column('review_count', sa.Integer(),
+                  nullable=False, server_default='0'),
+        sa.Column('rating_sum', sa.Integer(),
+                  nullable=False, server_default='0'),
+    )
+
+    # Seed the aggregate from reviews written before this table existed
+    op.execute(
+        'INSERT INTO dish_rating_stats (dish_id, review_count, rating_sum) '
+        'SELECT dish_id, COUNT(*), SUM(rating) FROM review GROUP BY dish_id'
+    )
+
+
+def downgrade():
+    op.drop_table('dish_rating_stats')
@@ -0,0 +1,26 @@
+"""add keyset pagination indexes on order
+
+Revision ID: 0004_order_keyset_indexes
+Revises: 0003_dish_rating_stats
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0004_order_keyset_indexes'
+down_revision = '0003_dish_rating_stats'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('order_created_at_id_idx', 'order', [
+                    sa.text('created_at DESC'), sa.text('id DESC')])
+    op.create_index('order_status_created_at_id_idx', 'order', [
+                    'status', sa.text('created_at DESC'), sa.text('id DESC')])
+
+
+def downgrade():
+    op.drop_index('order_status_created_at_id_idx', table_name='order')
+    op.drop_index('order_created_at_id_idx', table_name='order')
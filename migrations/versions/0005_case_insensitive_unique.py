@@ -0,0 +1,30 @@
+"""add case-insensitive unique indexes on usernames, emails and dish names
+
+Revision ID: 0005_case_insensitive_unique
+Revises: 0004_order_keyset_indexes
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0005_case_insensitive_unique'
+down_revision = '0004_order_keyset_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Fails if existing rows already collide case-insensitively; dedupe first.
+    op.create_index('users_username_lower_key', 'users', [
+                    sa.text('lower(username)')], unique=True)
+    op.create_index('users_email_lower_key', 'users', [
+                    sa.text('lower(email)')], unique=True)
+    op.create_index('dish_name_lower_key', 'dish', [
+                    sa.text('lower(name)')], unique=True)
+
+
+def downgrade():
+    op.drop_index('dish_name_lower_key', table_name='dish')
+    op.drop_index('users_email_lower_key', table_name='users')
+    op.drop_index('users_username_lower_key', table_name='users')
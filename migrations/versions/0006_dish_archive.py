@@ -0,0 +1,32 @@
+"""archive dishes instead of deleting them
+
+Revision ID: 0006_dish_archive
+Revises: 0005_case_insensitive_unique
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0006_dish_archive'
+down_revision = '0005_case_insensitive_unique'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('dish', sa.Column('is_archived', sa.Boolean(),
+                  server_default=sa.false(), nullable=False))
+    # Names only need to be unique among dishes still on the menu
+    op.drop_index('dish_name_lower_key', table_name='dish')
+    op.create_index('dish_active_name_lower_key', 'dish', [sa.text('lower(name)')],
+                    unique=True, postgresql_where=sa.text('NOT is_archived'),
+                    sqlite_where=sa.text('NOT is_archived'))
+
+
+def downgrade():
+    op.drop_index('dish_active_name_lower_key', table_name='dish')
+    # Fails if an archived dish shares a name with an active one
+    op.create_index('dish_name_lower_key', 'dish', [
+                    sa.text('lower(name)')], unique=True)
+    op.drop_column('dish', 'is_archived')
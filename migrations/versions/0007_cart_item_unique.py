@@ -0,0 +1,45 @@
+"""one cart row per (user, dish) so add_to_cart can upsert
+
+Revision ID: 0007_cart_item_unique
+Revises: 0006_dish_archive
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0007_cart_item_unique'
+down_revision = '0006_dish_archive'
+branch_labels = None
+depends_on = None
+
+
+# Another row for the same (user, dish) that is older, ties broken by id
+OLDER_DUPLICATE = """
+    SELECT 1 FROM cart_item older
+    WHERE older.user_id = cart_item.user_id AND older.dish_id = cart_item.dish_id
+      AND (older.created_at < cart_item.created_at
+           OR (older.created_at = cart_item.created_at AND older.id < cart_item.id))
+"""
+
+
+def upgrade():
+    # Fold duplicate rows into the oldest one before enforcing uniqueness.
+    # Plain correlated subqueries, so this runs on Postgres and SQLite alike
+    op.execute(f"""
+        UPDATE cart_item SET quantity = (
+            SELECT SUM(same.quantity) FROM cart_item same
+            WHERE same.user_id = cart_item.user_id AND same.dish_id = cart_item.dish_id)
+        WHERE NOT EXISTS ({OLDER_DUPLICATE})
+          AND EXISTS (
+            SELECT 1 FROM cart_item same
+            WHERE same.user_id = cart_item.user_id AND same.dish_id = cart_item.dish_id
+              AND same.id <> cart_item.id)
+    """)
+    op.execute(f"DELETE FROM cart_item WHERE EXISTS ({OLDER_DUPLICATE})")
+    op.create_index('cart_item_user_dish_key', 'cart_item',
+                    ['user_id', 'dish_id'], unique=True)
+
+
+def downgrade():
+    op.drop_index('cart_item_user_dish_key', table_name='cart_item')
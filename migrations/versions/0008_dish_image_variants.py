@@ -0,0 +1,23 @@
+"""resized image variants of dish uploads
+
+Revision ID: 0008_dish_image_variants
+Revises: 0007_cart_item_unique
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0008_dish_image_variants'
+down_revision = '0007_cart_item_unique'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # {format: {width: path under static/uploads}}, written by image_pipeline.py
+    op.add_column('dish', sa.Column('image_variants', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('dish', 'image_variants')
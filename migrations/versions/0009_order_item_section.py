@@ -0,0 +1,28 @@
+"""keep the dish's section on each order item
+
+Revision ID: 0009_order_item_section
+Revises: 0008_dish_image_variants
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0009_order_item_section'
+down_revision = '0008_dish_image_variants'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Revenue rollups are keyed on the section an item was ordered under, so
+    # delivering and then cancelling an order nets to zero after a dish moves
+    op.add_column('order_item', sa.Column('section', sa.String(length=100), nullable=True))
+    op.execute(
+        "UPDATE order_item SET section = COALESCE("
+        "(SELECT dish.section FROM dish WHERE dish.id = order_item.dish_id), '') "
+        "WHERE section IS NULL")
+
+
+def downgrade():
+    op.drop_column('order_item', 'section')
@@ -0,0 +1,27 @@
+"""order_item.created_at, as in create_tables.sql
+
+Revision ID: 0010_order_item_created_at
+Revises: 0009_order_item_section
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0010_order_item_created_at'
+down_revision = '0009_order_item_section'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Batch mode so SQLite, which cannot ADD COLUMN with a non-constant
+    # default, rebuilds the table instead
+    with op.batch_alter_table('order_item') as batch_op:
+        batch_op.add_column(sa.Column('created_at', sa.TIMESTAMP(timezone=True),
+                                      server_default=sa.func.now(), nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('order_item') as batch_op:
+        batch_op.drop_column('created_at')
@@ -1,5 +1,5 @@
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 from sqlalchemy import (
     Column,
     String,
@@ -8,9 +8,13 @@ from sqlalchemy import (
     Integer,
     Numeric,
     TIMESTAMP,
+    Date,
     ForeignKey,
+    Index,
+    JSON,
+    Uuid,
+    false,
 )
-from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.extensions import db
@@ -19,7 +23,7 @@ from app.extensions import db
 class Users(db.Model):
     __tablename__ = "users"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     # Maps to Supabase Auth user's UUID
     auth_user_id = Column(String(36), unique=True,
                           index=True, nullable=True)
@@ -49,12 +53,17 @@ class Users(db.Model):
 class Dish(db.Model):
     __tablename__ = "dish"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     name = Column(String(255), nullable=False)
     price = Column(Numeric(10, 2), nullable=False)
     description = Column(Text)
     image_filename = Column(String(255))
+    # Resized copies of the upload by format and width (image_pipeline.py)
+    image_variants = Column(JSON)
     section = Column(String(100))
+    # Archived dishes leave the menu but keep their order history
+    is_archived = Column(Boolean, default=False,
+                         server_default=false(), nullable=False)
     created_at = Column(TIMESTAMP(timezone=True),
                         server_default=func.now(), nullable=False)
     # relationships
@@ -67,30 +76,49 @@ class Dish(db.Model):
 class Order(db.Model):
     __tablename__ = "order"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey(
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    user_id = Column(Uuid, ForeignKey(
         "users.id", ondelete="CASCADE"), nullable=False)
     phone_number = Column(String(50))
     total = Column(Numeric(10, 2), nullable=False, default=0)
     status = Column(String(50), nullable=False, default="pending")
     points_earned = Column(Integer, default=0)
-    created_at = Column(TIMESTAMP(timezone=True),
+    # Also set here: SQLite's CURRENT_TIMESTAMP has whole seconds and another
+    # text format than bound datetimes, which breaks the keyset comparisons
+    created_at = Column(TIMESTAMP(timezone=True), default=lambda: datetime.now(timezone.utc),
                         server_default=func.now(), nullable=False)
     user = relationship("Users", back_populates="orders")
     order_items = relationship(
         "OrderItem", back_populates="order", cascade="all, delete-orphan")
 
 
+# Case-insensitive uniqueness, also used by the existence checks in db.py
+Index('users_username_lower_key', func.lower(Users.username), unique=True)
+Index('users_email_lower_key', func.lower(Users.email), unique=True)
+Index('dish_active_name_lower_key', func.lower(Dish.name), unique=True,
+      postgresql_where=Dish.is_archived.is_(False),
+      sqlite_where=Dish.is_archived.is_(False))
+
+# (created_at, id) keyset pagination for the admin order board
+Index('order_created_at_id_idx', Order.created_at.desc(), Order.id.desc())
+Index('order_status_created_at_id_idx', Order.status,
+      Order.created_at.desc(), Order.id.desc())
+
+
 class OrderItem(db.Model):
     __tablename__ = "order_item"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    order_id = Column(UUID(as_uuid=True), ForeignKey(
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    order_id = Column(Uuid, ForeignKey(
         "order.id", ondelete="CASCADE"), nullable=False)
-    dish_id = Column(UUID(as_uuid=True), ForeignKey(
+    dish_id = Column(Uuid, ForeignKey(
         "dish.id", ondelete="RESTRICT"), nullable=False)
     quantity = Column(Integer, nullable=False, default=1)
     price = Column(Numeric(10, 2), nullable=False)
+    # The dish's section when ordered; revenue rollups are keyed on it
+    section = Column(String(100))
+    created_at = Column(TIMESTAMP(timezone=True),
+                        server_default=func.now(), nullable=False)
     order = relationship("Order", back_populates="order_items")
     dish = relationship("Dish", back_populates="order_items")
 
@@ -98,10 +126,10 @@ class OrderItem(db.Model):
 class CartItem(db.Model):
     __tablename__ = "cart_item"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey(
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    user_id = Column(Uuid, ForeignKey(
         "users.id", ondelete="CASCADE"), nullable=False)
-    dish_id = Column(UUID(as_uuid=True), ForeignKey(
+    dish_id = Column(Uuid, ForeignKey(
         "dish.id", ondelete="RESTRICT"), nullable=False)
     quantity = Column(Integer, nullable=False, default=1)
     created_at = Column(TIMESTAMP(timezone=True),
@@ -110,13 +138,18 @@ class CartItem(db.Model):
     dish = relationship("Dish")
 
 
+# One row per (user, dish) so add_to_cart can upsert the quantity
+Index('cart_item_user_dish_key', CartItem.user_id,
+      CartItem.dish_id, unique=True)
+
+
 class Review(db.Model):
     __tablename__ = "review"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey(
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    user_id = Column(Uuid, ForeignKey(
         "users.id", ondelete="CASCADE"), nullable=False)
-    dish_id = Column(UUID(as_uuid=True), ForeignKey(
+    dish_id = Column(Uuid, ForeignKey(
         "dish.id", ondelete="CASCADE"), nullable=False)
     # validate 1-5 at application layer or use CheckConstraint
     rating = Column(Integer, nullable=False)
@@ -127,27 +160,59 @@ class Review(db.Model):
     dish = relationship("Dish", back_populates="reviews")
 
 
+# Per-dish rating aggregate, updated together with each new review
+class DishRatingStats(db.Model):
+    __tablename__ = "dish_rating_stats"
+
+    dish_id = Column(Uuid, ForeignKey(
+        "dish.id", ondelete="CASCADE"), primary_key=True)
+    review_count = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Integer, nullable=False, default=0)
+
+
+# Revenue rollups: pre-aggregated delivered-order revenue, maintained when an
+# order is marked delivered and rebuilt by `flask backfill_revenue_rollups`.
+class RevenueDailyRollup(db.Model):
+    __tablename__ = "revenue_daily_rollup"
+
+    day = Column(Date, primary_key=True)
+    order_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(Numeric(12, 2), nullable=False, default=0)
+
+
+class RevenueDishRollup(db.Model):
+    __tablename__ = "revenue_dish_rollup"
+
+    day = Column(Date, primary_key=True)
+    dish_id = Column(Uuid, ForeignKey(
+        "dish.id", ondelete="CASCADE"), primary_key=True)
+    section = Column(String(100), primary_key=True, default='')
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(Numeric(12, 2), nullable=False, default=0)
+    dish = relationship("Dish")
+
+
 # RBAC models: roles, permissions, and association tables
 role_permissions = db.Table(
     'role_permissions',
-    db.Column('role_id', UUID(as_uuid=True), db.ForeignKey(
+    db.Column('role_id', Uuid, db.ForeignKey(
         'roles.id', ondelete='CASCADE'), primary_key=True),
-    db.Column('permission_id', UUID(as_uuid=True), db.ForeignKey(
+    db.Column('permission_id', Uuid, db.ForeignKey(
         'permissions.id', ondelete='CASCADE'), primary_key=True),
 )
 
 user_roles = db.Table(
     'user_roles',
-    db.Column('user_id', UUID(as_uuid=True), db.ForeignKey(
+    db.Column('user_id', Uuid, db.ForeignKey(
         'users.id', ondelete='CASCADE'), primary_key=True),
-    db.Column('role_id', UUID(as_uuid=True), db.ForeignKey(
+    db.Column('role_id', Uuid, db.ForeignKey(
         'roles.id', ondelete='CASCADE'), primary_key=True),
 )
 
 
 class Role(db.Model):
     __tablename__ = 'roles'
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     name = Column(String(100), unique=True, nullable=False)
     created_at = Column(TIMESTAMP(timezone=True),
                         server_default=func.now(), nullable=False)
@@ -161,7 +226,7 @@ class Role(db.Model):
 
 class Permission(db.Model):
     __tablename__ = 'permissions'
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     code = Column(String(150), unique=True, nullable=False)
     description = Column(String(255))
     created_at = Column(TIMESTAMP(timezone=True),
@@ -176,8 +241,8 @@ class Permission(db.Model):
 
 class AuditLog(db.Model):
     __tablename__ = 'audit_logs'
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    actor_id = Column(UUID(as_uuid=True), ForeignKey(
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    actor_id = Column(Uuid, ForeignKey(
         'users.id', ondelete='SET NULL'), nullable=True)
     action = Column(String(100), nullable=False)
     entity = Column(String(100), nullable=False)
@@ -0,0 +1,149 @@
+"""
+Rendered-fragment caching and conditional GETs for the menu pages.
+Each menu section is rendered once per change of its dishes or ratings and
+kept in the shared `cache` (app/extensions.py), so a cache miss on one
+worker is filled for all of them. Pages get an ETag built from the menu
+version, the rating stats and the viewer's role; a request whose
+If-None-Match already has it is answered with 304 before any rendering, and
+(once the menu snapshot and rating stats are cached) without the database.
+The ETag is weak, as equal pages still differ in their CSP nonce.
+
+With CSP_MODE=hash (security.py) pages have no per-request nonce, so their
+ETag is strong, whole pages are cached too, and anonymous ones may be kept
+by shared caches/CDNs for PAGE_CACHE_MAX_AGE seconds. Forms on them get
+their CSRF token from /csrf-token (static/csrf.js).
+"""
+import hashlib
+import json
+import os
+
+from flask import current_app, render_template, request, session
+from flask_login import current_user
+from markupsafe import Markup
+
+from app.extensions import cache
+import db as db_api
+from static_assets import asset_version
+
+FRAGMENT_CACHE_TTL = int(os.environ.get('FRAGMENT_CACHE_TTL', 60 * 60))
+REVIEW_STATS_CACHE_TTL = int(os.environ.get('REVIEW_STATS_CACHE_TTL', 60))
+PAGE_CACHE_MAX_AGE = int(os.environ.get('PAGE_CACHE_MAX_AGE', 60))
+
+# Templates whose output is covered by the ETags and fragments below
+PAGE_TEMPLATES = ('base.html', 'home.html', 'menu.html', 'menu_section.html', 'dish_image.html')
+REVIEW_STATS_KEY = 'menu:review-stats'
+
+_templates_digest = None
+
+
+def init_page_cache(app):
+    """Configure the shared cache the same way as the app factory
+    (app/__init__.py): Redis when REDIS_URL is set, else per process"""
+    redis_url = app.config.get('REDIS_URL') or os.environ.get('REDIS_URL')
+    cache_config = {
+        'CACHE_TYPE': 'RedisCache' if redis_url else 'SimpleCache',
+        'CACHE_DEFAULT_TIMEOUT': 300,
+    }
+    if redis_url:
+        cache_config['CACHE_REDIS_URL'] = redis_url
+    cache.init_app(app, config=cache_config)
+
+
+def _digest(*parts):
+    data = json.dumps(parts, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha1(data.encode()).hexdigest()
+
+
+def _templates_version():
+    # So a deploy that only changes templates or static assets still
+    # changes every ETag
+    global _templates_digest
+    if _templates_digest is None:
+        sha = hashlib.sha1()
+        for name in PAGE_TEMPLATES:
+            with open(os.path.join(current_app.root_path, current_app.template_folder, name), 'rb') as f:
+                sha.update(f.read())
+        # Pages link fingerprinted asset names
+        sha.update(asset_version(current_app).encode())
+        _templates_digest = sha.hexdigest()
+    return _templates_digest
+
+
+def review_stats():
+    """(stats, digest) for the menu's ratings, shared by all workers for
+    REVIEW_STATS_CACHE_TTL seconds or until ratings_changed()"""
+    entry = cache.get(REVIEW_STATS_KEY)
+    if entry is None:
+        stats = db_api.get_review_stats()
+        entry = (stats, _digest(stats))
+        if stats:  # {} may be a failed read; do not pin it for everyone
+            cache.set(REVIEW_STATS_KEY, entry, timeout=REVIEW_STATS_CACHE_TTL)
+    return entry
+
+
+def ratings_changed():
+    """Forget the shared rating stats after a review is created"""
+    cache.delete(REVIEW_STATS_KEY)
+
+
+def _viewer():
+    # base.html only varies by these
+    if not current_user.is_authenticated:
+        return 'anonymous'
+    return 'admin' if current_user.is_admin else 'user'
+
+
+def page_etag(*versions):
+    """ETag value for a page built from `versions`, or None when the page
+    must not be revalidated (a flash message is pending or data is missing)"""
+    if session.get('_flashes') or not all(versions):
+        return None
+    return _digest(_templates_version(), request.endpoint, _viewer(), *versions)
+
+
+def not_modified(etag):
+    """A 304 response when the client already holds this version of the page"""
+    if etag is None or not request.if_none_match.contains_weak(etag):
+        return None
+    return with_etag(current_app.response_class(status=304), etag)
+
+
+def _whole_pages_cacheable():
+    return current_app.config.get('CSP_MODE') == 'hash'
+
+
+def with_etag(response, etag):
+    """Mark a response revalidatable: browsers keep it but ask every time.
+    Anonymous pages may also be shared when they carry no nonce."""
+    if etag is not None:
+        # Byte-identical only without a per-request nonce
+        response.set_etag(etag, weak=not _whole_pages_cacheable())
+        if _whole_pages_cacheable() and not current_user.is_authenticated and not session.modified:
+            response.headers['Cache-Control'] = f'public, max-age=0, s-maxage={PAGE_CACHE_MAX_AGE}'
+        else:
+            response.headers['Cache-Control'] = 'private, no-cache'
+        response.vary.add('Cookie')
+    return response
+
+
+def cached_page(etag, render):
+    """Response for the page identified by etag; render() builds its HTML
+    when the page is not in the full-page cache (or cannot be cached)"""
+    key = 'page:' + etag if etag is not None and _whole_pages_cacheable() else None
+    html = cache.get(key) if key else None
+    if html is None:
+        html = render()
+        if key:
+            cache.set(key, html, timeout=FRAGMENT_CACHE_TTL)
+    return with_etag(current_app.response_class(html, mimetype='text/html'), etag)
+
+
+def render_menu_section(section, dishes):
+    """Rendered HTML of one menu section, from the fragment cache when its
+    dishes and ratings are unchanged"""
+    key = 'fragment:menu-section:' + _digest(_templates_version(), section, dishes)
+    html = cache.get(key)
+    if html is None:
+        html = render_template('menu_section.html', section=section, dishes=dishes)
+        cache.set(key, html, timeout=FRAGMENT_CACHE_TTL)
+    return Markup(html)
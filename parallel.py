@@ -0,0 +1,119 @@
+"""
+Concurrent fan-out for independent data-access calls.
+Pages that need several unrelated queries (e.g. the revenue dashboard) can
+run them together so latency approaches the slowest query rather than the
+sum. Under a monkey-patched eventlet server the calls run on green threads;
+otherwise on a small shared thread pool. Each call runs in a copy of the
+caller's request (or app) context, so db.py, flask.g and the SQLAlchemy
+session behave as they do in the view itself.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from flask import current_app, copy_current_request_context, g, has_app_context, has_request_context
+from flask.globals import app_ctx
+
+logger = logging.getLogger(__name__)
+
+PARALLEL_QUERY_TIMEOUT = float(os.environ.get('PARALLEL_QUERY_TIMEOUT', 10))
+PARALLEL_MAX_WORKERS = int(os.environ.get('PARALLEL_MAX_WORKERS', 8))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def green_threads_available():
+    """Whether this process runs under monkey-patched eventlet"""
+    try:
+        from eventlet import patcher
+    except ImportError:
+        return False
+    return patcher.is_monkey_patched('socket')
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=PARALLEL_MAX_WORKERS, thread_name_prefix='db-fanout')
+    return _executor
+
+
+def bind_context(fn):
+    """Wrap fn so it runs inside a copy of the current Flask context"""
+    if not has_app_context():
+        return fn
+    # The copy gets a fresh app context; share the caller's flask.g with it
+    # so the request memo and the logged-in user carry over
+    shared_g = g._get_current_object()
+
+    def with_g(*args, **kwargs):
+        app_ctx.g = shared_g
+        return fn(*args, **kwargs)
+    if has_request_context():
+        return copy_current_request_context(with_g)
+    app = current_app._get_current_object()
+
+    def run(*args, **kwargs):
+        with app.app_context():
+            return with_g(*args, **kwargs)
+    return run
+
+
+def run_parallel(calls: Dict[str, Tuple[Callable, ...]], timeout: float = None,
+                 defaults: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Run independent calls concurrently and return their results by name.
+
+    `calls` maps a name to a tuple of (function, *args). All calls share one
+    `timeout` (seconds); a call that raises or does not finish in time yields
+    defaults.get(name) instead. Do not nest run_parallel inside a call.
+    """
+    timeout = PARALLEL_QUERY_TIMEOUT if timeout is None else timeout
+    defaults = defaults or {}
+    results = {name: defaults.get(name) for name in calls}
+    if green_threads_available():
+        _run_green(calls, timeout, results)
+    else:
+        _run_threaded(calls, timeout, results)
+    return results
+
+
+def _run_threaded(calls, timeout, results):
+    executor = _get_executor()
+    futures = {executor.submit(bind_context(fn), *args): name
+               for name, (fn, *args) in calls.items()}
+    done, not_done = wait(futures, timeout=timeout)
+    for future in done:
+        name = futures[future]
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            logger.error('Parallel call %s failed: %s', name, e)
+    for future in not_done:
+        future.cancel()
+        logger.warning('Parallel call %s timed out after %.1fs',
+                       futures[future], timeout)
+
+
+def _run_green(calls, timeout, results):
+    import eventlet
+
+    pool = eventlet.GreenPool(min(len(calls), PARALLEL_MAX_WORKERS) or 1)
+    threads = {name: pool.spawn(bind_context(fn), *args)
+               for name, (fn, *args) in calls.items()}
+    pending = dict(threads)
+    with eventlet.Timeout(timeout, False):
+        for name, thread in threads.items():
+            try:
+                results[name] = thread.wait()
+            except Exception as e:
+                logger.error('Parallel call %s failed: %s', name, e)
+            del pending[name]
+    for name, thread in pending.items():
+        thread.kill()
+        logger.warning('Parallel call %s timed out after %.1fs', name, timeout)
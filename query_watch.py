@@ -0,0 +1,108 @@
+"""
+N+1 and slow-query detector for development and staging.
+With QUERY_WATCH enabled, every request counts its db.py backend calls by
+function (the ones db_metrics counts; in-memory lookups such as
+get_menu_dish are not calls) and its SQLAlchemy statements by shape. A
+warning with the endpoint and a short stack excerpt is logged the first time
+a request repeats the same function or statement more than
+QUERY_WATCH_REPEAT_LIMIT times, and for any single call slower than
+QUERY_WATCH_SLOW_MS.
+"""
+import logging
+import os
+import re
+import threading
+import time
+import traceback
+
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from db_metrics import add_call_listener
+
+logger = logging.getLogger(__name__)
+
+QUERY_WATCH_REPEAT_LIMIT = int(os.environ.get('QUERY_WATCH_REPEAT_LIMIT', 5))
+QUERY_WATCH_SLOW_MS = float(os.environ.get('QUERY_WATCH_SLOW_MS', 500))
+
+_PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+_SKIP_FILES = ('db_metrics.py', 'query_watch.py',
+               'request_memo.py', 'parallel.py')
+
+_installed = False
+
+
+class _RequestCounts:
+    def __init__(self):
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def add(self, key):
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+            return self.counts[key]
+
+
+def _request_counts():
+    if not has_request_context():
+        return None
+    # Kept in the environ so parallel.py's context copies share it
+    return request.environ.setdefault('app.query_watch', _RequestCounts())
+
+
+def _stack_excerpt(limit=5):
+    """Innermost application frames leading to the current call"""
+    frames = [frame for frame in traceback.extract_stack()[:-1]
+              if frame.filename.startswith(_PROJECT_ROOT)
+              and os.path.basename(frame.filename) not in _SKIP_FILES]
+    return ''.join(traceback.format_list(frames[-limit:]))
+
+
+def _shape(statement):
+    """Normalise an SQL statement so calls differing only in values match"""
+    shape = re.sub(r'\s+', ' ', statement).strip()
+    # Expanding IN lists render one placeholder per value
+    return re.sub(r'\((?:\s*(?:\?|%\(\w+\)s|:\w+)\s*,?)+\)', '(...)', shape)
+
+
+def _observe(kind, key, seconds):
+    if not has_request_context():
+        return
+    endpoint = request.endpoint or request.path
+    count = _request_counts().add((kind, key))
+    if count == QUERY_WATCH_REPEAT_LIMIT + 1:
+        logger.warning('Possible N+1 in %s: %s %s called more than %d times\n%s',
+                       endpoint, kind, key[:200], QUERY_WATCH_REPEAT_LIMIT, _stack_excerpt())
+    if seconds * 1000 >= QUERY_WATCH_SLOW_MS:
+        logger.warning('Slow %s in %s: %s took %.0fms\n%s',
+                       kind, endpoint, key[:200], seconds * 1000, _stack_excerpt())
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_watch_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, '_query_watch_start', None)
+    if start is not None:
+        _observe('statement', _shape(statement), time.perf_counter() - start)
+
+
+def init_query_watch(app):
+    """Enable the detector when QUERY_WATCH is set (defaults to app.debug)"""
+    enabled = os.environ.get('QUERY_WATCH', str(app.debug)).lower() in (
+        '1', 'true', 'yes')
+    if not enabled:
+        return False
+    global _installed
+    if _installed:
+        return True
+    _installed = True
+    add_call_listener(lambda name, seconds: _observe(
+        'db function', name, seconds))
+    # All engines, so it covers the SQLAlchemy data backend and the models
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    return True
@@ -3,3 +3,5 @@
 set -o errexit
 
 pip install -r requirements.txt
+python scripts/build_csp_hashes.py
+python scripts/build_static.py
@@ -0,0 +1,65 @@
+"""
+Request-scoped memo for the data-access layer.
+Read results are kept on flask.g, keyed by function name and arguments, so a
+row looked up several times while handling one request costs one round trip.
+Any write clears the memo. Outside a request context the wrapped functions
+call straight through.
+"""
+import copy
+from functools import wraps
+
+from flask import g, has_request_context
+
+
+def _memo():
+    if not has_request_context():
+        return None
+    memo = g.get('_db_memo')
+    if memo is None:
+        memo = g._db_memo = {}
+    return memo
+
+
+def _key(name, args, kwargs):
+    return (name, args, tuple(sorted(kwargs.items())))
+
+
+def clear():
+    """Forget everything memoized for the current request"""
+    if has_request_context():
+        g._db_memo = {}
+
+
+def memoized(fn):
+    """Memoize a read function for the rest of the request.
+
+    Callers get deep copies because views decorate the returned dicts.
+    None results (not found or failed) are not memoized.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        memo = _memo()
+        if memo is None:
+            return fn(*args, **kwargs)
+        key = _key(fn.__name__, args, kwargs)
+        try:
+            if key in memo:
+                return copy.deepcopy(memo[key])
+        except TypeError:  # unhashable arguments
+            return fn(*args, **kwargs)
+        result = fn(*args, **kwargs)
+        if result is not None:
+            memo[key] = result
+        return copy.deepcopy(result)
+    return wrapper
+
+
+def invalidating(fn):
+    """Clear the request memo after a write"""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            clear()
+    return wrapper
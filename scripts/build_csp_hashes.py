@@ -0,0 +1,86 @@
+"""
+Build the script/style hashes used by CSP_MODE=hash (see security.py).
+Every inline <script> and <style> block in templates/ is hashed as Jinja
+renders it, and the sha256 sources are written to csp_hashes.json. Blocks
+containing Jinja syntax render differently per request and cannot be
+hashed; they are listed and stay blocked by the policy.
+
+    python scripts/build_csp_hashes.py [--check]
+
+Run it as part of the build, after any template change.
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import re
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATES = os.path.join(ROOT, 'templates')
+OUTPUT = os.path.join(ROOT, 'csp_hashes.json')
+
+INLINE_BLOCK = re.compile(r'<(script|style)\b([^>]*)>(.*?)</\1\s*>', re.S | re.I)
+JINJA_SYNTAX = ('{{', '{%', '{#')
+
+
+def _source(content):
+    digest = hashlib.sha256(content.encode()).digest()
+    return f"'sha256-{base64.b64encode(digest).decode()}'"
+
+
+def collect_hashes(templates=TEMPLATES):
+    """Returns ({'script-src': [...], 'style-src': [...]}, unhashable blocks)"""
+    hashes = {'script-src': set(), 'style-src': set()}
+    skipped = []
+    for dirpath, _, filenames in os.walk(templates):
+        for filename in sorted(filenames):
+            if not filename.endswith('.html'):
+                continue
+            path = os.path.join(dirpath, filename)
+            with open(path, encoding='utf-8') as f:
+                # Jinja normalizes line endings to \n when loading templates
+                text = f.read().replace('\r\n', '\n').replace('\r', '\n')
+            for match in INLINE_BLOCK.finditer(text):
+                tag, attrs, content = match.group(1).lower(), match.group(2), match.group(3)
+                if tag == 'script' and re.search(r'\bsrc\s*=', attrs):
+                    continue
+                if any(token in content for token in JINJA_SYNTAX):
+                    line = text.count('\n', 0, match.start()) + 1
+                    skipped.append(f'{os.path.relpath(path, ROOT)}:{line} <{tag}>')
+                    continue
+                hashes[f'{tag}-src'].add(_source(content))
+    return {directive: sorted(values) for directive, values in hashes.items()}, skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--output', default=OUTPUT)
+    parser.add_argument('--check', action='store_true',
+                        help='exit non-zero if the output file is missing or out of date')
+    args = parser.parse_args(argv)
+
+    hashes, skipped = collect_hashes()
+    for block in skipped:
+        print(f'warning: not hashable (contains Jinja): {block}', file=sys.stderr)
+    if args.check:
+        try:
+            with open(args.output) as f:
+                current = json.load(f)
+        except (OSError, ValueError):
+            current = None
+        if current != hashes:
+            print(f'{args.output} is out of date; run scripts/build_csp_hashes.py', file=sys.stderr)
+            return 1
+        return 0
+    with open(args.output, 'w') as f:
+        json.dump(hashes, f, indent=2, sort_keys=True)
+        f.write('\n')
+    print(f"wrote {len(hashes['script-src'])} script and {len(hashes['style-src'])} "
+          f'style hashes to {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+Build fingerprinted, precompressed copies of the files in static/.
+Each asset is copied to static/dist/ under a content-hashed name
+(theme.css -> dist/theme.1a2b3c4d5e.css), compressible ones get .gz and
+.br siblings (.br needs the Brotli package), and static/dist/manifest.json
+maps the original names to the hashed ones. static_assets.py rewrites
+url_for('static', ...) through the manifest and serves the hashed files
+as immutable.
+
+    python scripts/build_static.py
+
+Uploads (static/uploads/) are not fingerprinted: their names are stored
+in the database.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+try:
+    import brotli
+except ImportError:  # .br siblings are skipped without it
+    brotli = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATIC = os.path.join(ROOT, 'static')
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+SKIP_DIRS = {DIST, 'uploads'}
+COMPRESSIBLE = {'.css', '.js', '.json', '.svg', '.ico', '.txt', '.html', '.map', '.xml'}
+# Smaller files gain nothing from compression (and cost a header round trip)
+MIN_COMPRESS_SIZE = 256
+
+
+def _hashed_name(name, data):
+    digest = hashlib.sha256(data).hexdigest()[:10]
+    stem, ext = os.path.splitext(name)
+    return f'{stem}.{digest}{ext}'
+
+
+def _write(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def _compress(path, data):
+    written = []
+    # mtime=0 keeps the .gz bytes identical between builds
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gz) < len(data):
+        _write(path + '.gz', gz)
+        written.append('gz')
+    if brotli is not None:
+        br = brotli.compress(data, quality=11)
+        if len(br) < len(data):
+            _write(path + '.br', br)
+            written.append('br')
+    return written
+
+
+def build(static=STATIC):
+    """Rebuild static/dist; returns the manifest"""
+    dist = os.path.join(static, DIST)
+    shutil.rmtree(dist, ignore_errors=True)
+    os.makedirs(dist)
+    manifest = {}
+    for dirpath, dirnames, filenames in os.walk(static):
+        if dirpath == static:
+            dirnames[:] = [name for name in dirnames if name not in SKIP_DIRS]
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.startswith('.'):
+                continue
+            source = os.path.join(dirpath, filename)
+            name = os.path.relpath(source, static).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                data = f.read()
+            hashed = f'{DIST}/{_hashed_name(name, data)}'
+            target = os.path.join(static, hashed)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            _write(target, data)
+            encodings = []
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE and len(data) >= MIN_COMPRESS_SIZE:
+                encodings = _compress(target, data)
+            manifest[name] = hashed
+            print(f"{name} -> {hashed}{' (+' + ', '.join(encodings) + ')' if encodings else ''}")
+    with open(os.path.join(dist, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write('\n')
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--static', default=STATIC, help='static folder to build')
+    args = parser.parse_args(argv)
+    if brotli is None:
+        print('warning: Brotli is not installed; skipping .br files', file=sys.stderr)
+    manifest = build(args.static)
+    print(f'wrote {len(manifest)} assets to {os.path.join(args.static, DIST)}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,9 +3,32 @@ Security configuration for the application.
 This module contains security-related configurations and middleware.
 """
 from functools import wraps
+import json
+import logging
+import os
 import secrets
 from flask import request, abort, g
 
+logger = logging.getLogger(__name__)
+
+# 'nonce': a fresh nonce per request (every page is unique, so not cacheable)
+# 'hash': build-time hashes of the inline scripts/styles in templates/
+#         (scripts/build_csp_hashes.py), so identical pages are byte-identical
+CSP_MODE = os.environ.get('CSP_MODE', 'nonce').lower()
+CSP_HASHES_PATH = os.environ.get('CSP_HASHES_PATH')
+
+
+def _load_csp_hashes(app):
+    path = CSP_HASHES_PATH or os.path.join(app.root_path, 'csp_hashes.json')
+    try:
+        with open(path) as f:
+            hashes = json.load(f)
+        return ' '.join(hashes.get('script-src', [])), ' '.join(hashes.get('style-src', []))
+    except (OSError, ValueError) as e:
+        logger.warning('CSP_MODE=hash but %s could not be read (%s); using nonces. '
+                       'Run scripts/build_csp_hashes.py', path, e)
+        return None
+
 
 def init_security(app):
     """Initialize security configurations, CSP nonces, and response headers."""
@@ -24,10 +47,23 @@ def init_security(app):
     # Configure password hashing (existing choice kept)
     app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:600000'
 
+    csp_hashes = _load_csp_hashes(app) if CSP_MODE == 'hash' else None
+    # Read by page_cache.py: whole pages are only shareable without nonces
+    app.config['CSP_MODE'] = 'hash' if csp_hashes else 'nonce'
+    if csp_hashes:
+        script_hashes, style_hashes = csp_hashes
+        hash_csp = (
+            "default-src 'self'; "
+            f"script-src 'self' {script_hashes}; "
+            f"style-src 'self' {style_hashes}; "
+            "img-src 'self' data:; connect-src 'self' blob:; frame-ancestors 'none'; base-uri 'self';"
+        )
+
     # Per-request CSP nonce
     @app.before_request
     def _set_csp_nonce():
-        g.csp_nonce = secrets.token_urlsafe(16)
+        if not csp_hashes:
+            g.csp_nonce = secrets.token_urlsafe(16)
 
     # Expose nonce to templates
     @app.context_processor
@@ -41,15 +77,22 @@ def init_security(app):
         response.headers['X-Frame-Options'] = 'SAMEORIGIN'
         response.headers['X-XSS-Protection'] = '1; mode=block'
 
-        # Content Security Policy: do not use unsafe-inline. Use per-request nonce for scripts/styles.
-        nonce = getattr(g, 'csp_nonce', '')
-        csp = (
-            "default-src 'self'; "
-            f"script-src 'self' 'nonce-{nonce}'; "
-            f"style-src 'self' 'nonce-{nonce}'; "
-            "img-src 'self' data:; connect-src 'self' blob:; frame-ancestors 'none'; base-uri 'self';"
-        )
-        response.headers['Content-Security-Policy'] = csp
+        # Content Security Policy: do not use unsafe-inline. Use per-request nonce
+        # or build-time hashes for scripts/styles.
+        if csp_hashes:
+            csp = hash_csp
+        else:
+            nonce = getattr(g, 'csp_nonce', '')
+            csp = (
+                "default-src 'self'; "
+                f"script-src 'self' 'nonce-{nonce}'; "
+                f"style-src 'self' 'nonce-{nonce}'; "
+                "img-src 'self' data:; connect-src 'self' blob:; frame-ancestors 'none'; base-uri 'self';"
+            )
+        # Not on 304s: the browser keeps the cached page, whose inline
+        # scripts carry the nonce of the policy it was stored with
+        if response.status_code != 304:
+            response.headers['Content-Security-Policy'] = csp
 
         # HSTS only when explicitly enabled and request is secure (or via X-Forwarded-Proto)
         if app.config.get('ENABLE_HSTS') and (request.is_secure or request.headers.get('X-Forwarded-Proto') == 'https'):
@@ -0,0 +1,55 @@
+// CSRF tokens for pages served from a cache.
+// Cached pages cannot carry a per-session token, so POST forms without one
+// fetch it from /csrf-token when they are first submitted. Scripts that
+// post with fetch() can use `await window.csrfToken()` for the X-CSRFToken
+// header.
+(() => {
+    let pending = null;
+
+    function csrfToken() {
+        if (!pending) {
+            pending = fetch('/csrf-token', { credentials: 'same-origin', cache: 'no-store' })
+                .then(response => {
+                    if (!response.ok) {
+                        throw new Error(`csrf-token: ${response.status}`);
+                    }
+                    return response.json();
+                })
+                .then(data => data.csrf_token)
+                .catch(error => {
+                    pending = null; // retry on the next submit
+                    throw error;
+                });
+        }
+        return pending;
+    }
+
+    window.csrfToken = csrfToken;
+
+    document.addEventListener('submit', event => {
+        const form = event.target;
+        if (event.defaultPrevented || (form.getAttribute('method') || 'get').toLowerCase() !== 'post') {
+            return;
+        }
+        let input = form.querySelector('input[name="csrf_token"]');
+        if (input && input.value) {
+            return;
+        }
+        event.preventDefault();
+        const submitter = event.submitter;
+        csrfToken().then(token => {
+            if (!input) {
+                input = document.createElement('input');
+                input.type = 'hidden';
+                input.name = 'csrf_token';
+                form.appendChild(input);
+            }
+            input.value = token;
+            if (form.requestSubmit) {
+                form.requestSubmit(submitter && submitter.form === form ? submitter : undefined);
+            } else {
+                form.submit();
+            }
+        }).catch(() => form.submit()); // let the server report the failure
+    });
+})();
@@ -0,0 +1,110 @@
+"""
+Fingerprinted static assets (built by scripts/build_static.py).
+When static/dist/manifest.json exists, url_for('static', filename=...)
+points at the content-hashed copy, which is served with a year-long
+immutable Cache-Control, and as its .br/.gz sibling to clients that accept
+one. Content-addressed uploads (upload_store.py) are immutable too; other
+files are served as before.
+
+STATIC_SENDFILE hands file bodies to the front-end server so workers do not
+stream them:
+
+- 'x-accel' (nginx): the response carries X-Accel-Redirect to
+  STATIC_ACCEL_PREFIX + filename and its headers; nginx picks the
+  precompressed sibling itself, e.g.
+
+      location /_static/ { internal; alias /app/static/; gzip_static on; brotli_static on; }
+
+- 'x-sendfile' (Apache mod_xsendfile, lighttpd): Flask's USE_X_SENDFILE.
+"""
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+
+from flask import abort, request, send_from_directory
+from werkzeug.security import safe_join
+
+from upload_store import is_immutable
+
+logger = logging.getLogger(__name__)
+
+STATIC_SENDFILE = os.environ.get('STATIC_SENDFILE', '').lower()
+STATIC_ACCEL_PREFIX = os.environ.get('STATIC_ACCEL_PREFIX', '/_static/')
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# In order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _load_manifest(app):
+    path = os.path.join(app.static_folder, 'dist', 'manifest.json')
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning('Ignoring static manifest %s: %s', path, e)
+        return {}
+
+
+def asset_version(app):
+    """Digest of the static manifest; changes whenever an asset does"""
+    state = app.extensions.get('static_assets')
+    return state['version'] if state else ''
+
+
+def init_static_assets(app):
+    """Serve fingerprinted, precompressed static files (see module docstring)"""
+    manifest = _load_manifest(app)
+    hashed = frozenset(manifest.values())
+    app.extensions['static_assets'] = {
+        'manifest': manifest,
+        'version': hashlib.sha1(json.dumps(manifest, sort_keys=True).encode()).hexdigest(),
+    }
+    if STATIC_SENDFILE == 'x-sendfile':
+        app.config['USE_X_SENDFILE'] = True
+    elif STATIC_SENDFILE not in ('', 'x-accel'):
+        logger.warning('Unknown STATIC_SENDFILE %r; serving static files directly', STATIC_SENDFILE)
+
+    @app.url_defaults
+    def _fingerprint(endpoint, values):
+        if endpoint == 'static' and manifest:
+            filename = values.get('filename')
+            values['filename'] = manifest.get(filename, filename)
+
+    def serve_static(filename):
+        path = safe_join(app.static_folder, filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+        immutable = filename in hashed or is_immutable(filename)
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+        if STATIC_SENDFILE == 'x-accel':
+            response = app.response_class(mimetype=mimetype)
+            response.headers['X-Accel-Redirect'] = STATIC_ACCEL_PREFIX + filename
+        else:
+            encoding = None
+            if filename in hashed:  # only built assets have precompressed siblings
+                for name, suffix in ENCODINGS:
+                    if name in request.accept_encodings and os.path.isfile(path + suffix):
+                        encoding = name
+                        filename += suffix
+                        break
+            response = send_from_directory(
+                app.static_folder, filename, mimetype=mimetype,
+                max_age=None if immutable else app.get_send_file_max_age(filename))
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+
+        if immutable:
+            response.headers['Cache-Control'] = IMMUTABLE
+            response.vary.add('Accept-Encoding')
+        return response
+
+    app.view_functions['static'] = serve_static
+    if manifest:
+        logger.info('Serving %d fingerprinted static assets', len(manifest))
+    return manifest
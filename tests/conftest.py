@@ -1,30 +1,70 @@
 """
 Test configuration and fixtures for the application.
+db.py connects to its data backend when it is imported, so before any test
+module imports it the Supabase clients are replaced by the in-process
+stand-in from the route benchmark (benchmarks/fake_supabase.py): the suite
+needs no credentials and makes no network calls.
 """
 import os
+import sys
+
 import pytest
-from main import app as flask_app
-from db import db, init_db
-from models import User
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_supabase import FakeSupabase  # noqa: E402
+from benchmarks.route_bench import use_fake_supabase  # noqa: E402
+
+fake_supabase = FakeSupabase()
+use_fake_supabase(fake_supabase)
+
+BASE_URL = 'https://localhost'  # session cookies are Secure-only
 
 
 @pytest.fixture
-def app():
+def supabase_stub():
+    """The stand-in behind db.supabase, emptied for each test"""
+    for table in fake_supabase.tables.values():
+        table.rows.clear()
+        for index in table.indexes.values():
+            index.clear()
+    yield fake_supabase
+
+
+@pytest.fixture
+def app(supabase_stub):
+    from main import app as flask_app
+    from app.extensions import cache
+    from data_cache import menu_snapshot, user_cache
+
     flask_app.config.update({
         'TESTING': True,
-        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
         'WTF_CSRF_ENABLED': False,
         'SECRET_KEY': 'test-key'
     })
-
-    # Initialize database
     with flask_app.app_context():
-        db.create_all()
-
+        cache.clear()
+    menu_snapshot.invalidate()
+    user_cache.invalidate()
     yield flask_app
 
-    # Cleanup
-    with flask_app.app_context():
+
+@pytest.fixture
+def sqlite_db():
+    """The models on a fresh in-memory SQLite database, in an app context
+    (for the SQLAlchemy data backend, db_sqlalchemy.py)"""
+    from flask import Flask
+    from app.extensions import db
+    import models  # noqa: F401  (registers the tables)
+
+    sqlite_app = Flask(__name__)
+    sqlite_app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(sqlite_app)
+    with sqlite_app.app_context():
+        db.create_all()
+        yield db
+        db.session.remove()
         db.drop_all()
 
 
@@ -38,41 +78,30 @@ def runner(app):
     return app.test_cli_runner()
 
 
+def _login(client, user_id):
+    with client.session_transaction(base_url=BASE_URL) as session:
+        session['_user_id'] = user_id
+        session['_fresh'] = True
+    return client
+
+
 @pytest.fixture
-def auth_client(client):
+def auth_client(client, supabase_stub):
     """Client with authenticated user"""
-    with flask_app.app_context():
-        user = User(
-            username='testuser',
-            email='test@example.com',
-            password_hash='testpass',
-            is_admin=False
-        )
-        db.session.add(user)
-        db.session.commit()
-
-        client.post('/login', data={
-            'username': 'testuser',
-            'password': 'testpass'
-        })
-        return client
+    user = supabase_stub.table('users').insert({
+        'username': 'testuser',
+        'email': 'test@example.com',
+        'is_admin': False
+    }).execute().data[0]
+    return _login(client, user['id'])
 
 
 @pytest.fixture
-def admin_client(client):
+def admin_client(client, supabase_stub):
     """Client with authenticated admin user"""
-    with flask_app.app_context():
-        admin = User(
-            username='admin',
-            email='admin@example.com',
-            password_hash='adminpass',
-            is_admin=True
-        )
-        db.session.add(admin)
-        db.session.commit()
-
-        client.post('/login', data={
-            'username': 'admin',
-            'password': 'adminpass'
-        })
-        return client
+    admin = supabase_stub.table('users').insert({
+        'username': 'admin',
+        'email': 'admin@example.com',
+        'is_admin': True
+    }).execute().data[0]
+    return _login(client, admin['id'])
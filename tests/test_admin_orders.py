@@ -0,0 +1,72 @@
+"""
+Test keyset pagination of the admin order board.
+"""
+import uuid
+
+import pytest
+
+import main
+
+BASE_URL = 'https://localhost'
+
+
+@pytest.fixture
+def orders(supabase_stub, monkeypatch):
+    monkeypatch.setattr(main, 'ADMIN_ORDERS_PAGE_SIZE', 2)
+    rows = []
+    for n, status in enumerate(['pending', 'delivered', 'pending', 'delivered', 'pending']):
+        rows.append(supabase_stub.table('order').insert({
+            'user_id': str(uuid.uuid4()),
+            'status': status,
+            'total': 10 + n,
+            # Trailing zeros trimmed from the fraction, as Postgres returns it
+            'created_at': f'2024-05-0{n + 1}T12:00:00.5+00:00',
+        }).execute().data[0])
+    return rows[::-1]  # newest first
+
+
+def page(client, **params):
+    response = client.get('/admin/orders/page', query_string=params, base_url=BASE_URL)
+    return response.status_code, response.get_json()
+
+
+def ids(data):
+    return [order['id'] for order in data['orders']]
+
+
+def test_pages_follow_each_other(admin_client, orders):
+    status, first = page(admin_client)
+    assert status == 200
+    assert ids(first) == [order['id'] for order in orders[:2]]
+
+    _, second = page(admin_client, cursor=first['next_cursor'])
+    _, third = page(admin_client, cursor=second['next_cursor'])
+
+    assert ids(second) == [order['id'] for order in orders[2:4]]
+    assert ids(third) == [orders[4]['id']]
+    assert third['next_cursor'] is None
+
+
+def test_status_filter(admin_client, orders):
+    delivered = [order['id'] for order in orders if order['status'] == 'delivered']
+
+    _, first = page(admin_client, status='delivered')
+
+    assert ids(first) == delivered
+    assert first['next_cursor'] is None
+
+
+@pytest.mark.parametrize('cursor', [
+    'garbage',
+    '2024-05-03T12:00:00|not-a-uuid',
+    f'yesterday|{uuid.uuid4()}',
+    f'2024-05-03T12:00:00",id.gt.0,created_at.gt."2000-01-01|{uuid.uuid4()}',
+])
+def test_malformed_cursor_is_rejected(admin_client, orders, supabase_stub, cursor):
+    before = supabase_stub.round_trips
+
+    status, data = page(admin_client, cursor=cursor)
+
+    assert status == 400
+    assert data == {'error': 'Invalid cursor'}
+    assert supabase_stub.round_trips - before <= 1  # only the admin user
@@ -1,47 +1,92 @@
 """
 Test authentication functionality.
 """
+import uuid
+from types import SimpleNamespace
+
 import pytest
-from flask import session
-from models import User
+
+BASE_URL = 'https://localhost'
+
+
+class FakeAuth:
+    """Supabase Auth stand-in: accounts by email"""
+
+    def __init__(self):
+        self.accounts = {}
+
+    def sign_up(self, credentials):
+        if credentials['email'] in self.accounts:
+            raise Exception('User already registered')
+        user = SimpleNamespace(id=str(uuid.uuid4()))
+        self.accounts[credentials['email']] = (credentials['password'], user)
+        return SimpleNamespace(user=user)
+
+    def sign_in_with_password(self, credentials):
+        password, user = self.accounts.get(credentials['email'], (None, None))
+        if password is None or password != credentials['password']:
+            raise Exception('Invalid login credentials')
+        return SimpleNamespace(user=user)
+
+
+@pytest.fixture
+def auth(app, supabase_stub, monkeypatch):
+    fake_auth = FakeAuth()
+    monkeypatch.setattr(supabase_stub, 'auth', fake_auth, raising=False)
+    return fake_auth
 
 
-def test_register(client):
-    """Test user registration"""
-    response = client.post('/register', data={
-        'username': 'newuser',
-        'email': 'new@example.com',
-        'password': 'password123',
-        'confirm_password': 'password123'
-    }, follow_redirects=True)
+def register(client, username='newuser', email='new@example.com', password='password123'):
+    return client.post('/register', data={
+        'username': username,
+        'email': email,
+        'password': password,
+    }, base_url=BASE_URL, follow_redirects=True)
+
+
+def login(client, email='new@example.com', password='password123'):
+    return client.post('/login', data={'email': email, 'password': password},
+                       base_url=BASE_URL, follow_redirects=True)
+
+
+def test_register(client, auth, supabase_stub):
+    response = register(client)
 
     assert response.status_code == 200
-    assert b'Successfully registered' in response.data
+    assert b'Registration successful! Please log in.' in response.data
+    (user,) = supabase_stub.tables['users'].rows.values()
+    assert (user['username'], user['email'], user['is_admin']) == ('newuser', 'new@example.com', False)
+
 
+def test_register_taken_username(client, auth):
+    register(client)
 
-def test_login_logout(client):
-    """Test login and logout functionality"""
-    # Test login
-    response = client.post('/login', data={
-        'username': 'testuser',
-        'password': 'testpass'
-    }, follow_redirects=True)
+    response = register(client, username='NEWUSER', email='other@example.com')
 
+    assert b'Username already taken.' in response.data
+    assert 'other@example.com' not in auth.accounts
+
+
+def test_login_logout(client, auth):
+    register(client)
+
+    response = login(client)
     assert response.status_code == 200
-    assert b'Logged in successfully' in response.data
+    with client.session_transaction(base_url=BASE_URL) as session:
+        assert session.get('_user_id')
 
-    # Test logout
-    response = client.get('/logout', follow_redirects=True)
+    response = client.get('/logout', base_url=BASE_URL, follow_redirects=True)
     assert response.status_code == 200
-    assert b'Logged out successfully' in response.data
+    with client.session_transaction(base_url=BASE_URL) as session:
+        assert not session.get('_user_id')
+
 
+def test_invalid_login(client, auth):
+    register(client)
 
-def test_invalid_login(client):
-    """Test login with invalid credentials"""
-    response = client.post('/login', data={
-        'username': 'wronguser',
-        'password': 'wrongpass'
-    }, follow_redirects=True)
+    response = login(client, password='wrongpass')
 
     assert response.status_code == 200
-    assert b'Invalid username or password' in response.data
+    assert b'Login failed. Please check your credentials.' in response.data
+    with client.session_transaction(base_url=BASE_URL) as session:
+        assert not session.get('_user_id')
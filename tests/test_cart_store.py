@@ -0,0 +1,47 @@
+"""
+Test the write-behind cart store.
+"""
+import threading
+
+import pytest
+
+import cart_store as cart_store_module
+import db
+from cart_store import CartStore, LocalCartBackend
+
+
+@pytest.fixture
+def store(app, monkeypatch):
+    monkeypatch.setattr(cart_store_module.atexit, 'register', lambda fn: None)
+    store = CartStore(LocalCartBackend())
+    store.init_app(app)
+    return store
+
+
+def test_flusher_starts_with_first_cart_change(app, store):
+    dish = db.create_dish('Pancakes', 6.0, section='Breakfast')
+    assert store._flusher is None
+
+    with app.app_context():
+        assert store.get_cart('user-1') == []
+        assert store._flusher is None  # reads alone never start it
+        store.add_item('user-1', dish['id'])
+
+    assert isinstance(store._flusher, threading.Thread)
+    assert store._flusher.is_alive()
+    started = store._flusher
+    with app.app_context():
+        store.add_item('user-1', dish['id'])
+    assert store._flusher is started
+
+
+def test_flush_writes_cart_items(app, store, supabase_stub):
+    user = supabase_stub.table('users').insert({
+        'username': 'alice', 'email': 'alice@example.com'}).execute().data[0]
+    dish = db.create_dish('Pancakes', 6.0, section='Breakfast')
+    with app.app_context():
+        store.add_item(user['id'], dish['id'], 2)
+        assert store.flush(user['id'])
+
+    rows = list(supabase_stub.tables['cart_item'].rows.values())
+    assert [(row['dish_id'], row['quantity']) for row in rows] == [(dish['id'], 2)]
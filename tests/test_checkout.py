@@ -0,0 +1,61 @@
+"""
+Test checking out the cart.
+"""
+import db
+from cart_store import cart_store
+
+BASE_URL = 'https://localhost'
+
+
+def current_user_id(client):
+    with client.session_transaction(base_url=BASE_URL) as session:
+        return session['_user_id']
+
+
+def flashes(client):
+    with client.session_transaction(base_url=BASE_URL) as session:
+        return [message for _, message in session.pop('_flashes', [])]
+
+
+def fill_cart(app, user_id):
+    dish = db.create_dish('Pancakes', 6.0, section='Breakfast')
+    with app.app_context():
+        cart_store.add_item(user_id, dish['id'], 2)
+    return dish
+
+
+def test_checkout_places_order_and_empties_cart(app, auth_client, supabase_stub):
+    user_id = current_user_id(auth_client)
+    fill_cart(app, user_id)
+
+    response = auth_client.post('/checkout', data={'discount': '0'}, base_url=BASE_URL)
+    assert response.status_code == 200
+    orders = list(supabase_stub.tables['order'].rows.values())
+    assert [(order['user_id'], order['total']) for order in orders] == [(user_id, 12.0)]
+    with app.app_context():
+        assert cart_store.get_cart(user_id) == []
+
+
+def test_checkout_of_empty_cart(auth_client, supabase_stub):
+    response = auth_client.post('/checkout', data={'discount': '0'}, base_url=BASE_URL)
+    assert response.status_code == 302
+    assert flashes(auth_client) == ['Your cart is empty!']
+
+
+def test_failed_checkout_asks_to_retry_and_keeps_cart(app, auth_client, supabase_stub, monkeypatch):
+    user_id = current_user_id(auth_client)
+    dish = fill_cart(app, user_id)
+    rpc = supabase_stub.rpc
+
+    def failing_rpc(name, params=None):
+        if name == 'checkout_cart':
+            raise ConnectionError('connection reset')
+        return rpc(name, params)
+    monkeypatch.setattr(supabase_stub, 'rpc', failing_rpc)
+
+    response = auth_client.post('/checkout', data={'discount': '0'}, base_url=BASE_URL)
+    assert response.status_code == 302
+    assert flashes(auth_client) == ['We could not place your order. Please try again.']
+    assert not supabase_stub.tables['order'].rows
+    with app.app_context():
+        assert [item['dish_id'] for item in cart_store.get_cart(user_id)] == [dish['id']]
@@ -0,0 +1,44 @@
+"""
+Test the in-process menu snapshot.
+"""
+import threading
+
+import data_cache
+from data_cache import MenuSnapshot
+
+
+def test_failed_refresh_thread_start_releases_lock(monkeypatch):
+    snapshot = MenuSnapshot(ttl=0)
+    menu = [{'id': '1', 'name': 'Soup'}]
+    assert snapshot.get(lambda: menu) == menu
+
+    class Unstartable(threading.Thread):
+        def start(self):
+            raise RuntimeError("can't start new thread")
+    monkeypatch.setattr(data_cache.threading, 'Thread', Unstartable)
+    monkeypatch.setattr(data_cache, 'MENU_REFRESH_RETRY', 0)
+    # The stale menu is still served, and the lock is free for the next try
+    assert snapshot.get(lambda: []) == menu
+    assert not snapshot._lock.locked()
+
+    monkeypatch.undo()
+    refreshed = [{'id': '2', 'name': 'Salad'}]
+    snapshot.get(lambda: refreshed)
+    with snapshot._lock:  # wait for the background refresh to finish
+        pass
+    assert snapshot.get(lambda: refreshed) == refreshed
+
+
+def test_stale_menu_is_served_while_refreshing():
+    snapshot = MenuSnapshot(ttl=0)
+    snapshot.get(lambda: [{'id': '1'}])
+    release = threading.Event()
+
+    def slow_loader():
+        release.wait(5)
+        return [{'id': '2'}]
+    assert snapshot.get(slow_loader) == [{'id': '1'}]
+    release.set()
+    with snapshot._lock:
+        pass
+    assert snapshot.get_dish(slow_loader, '2') == {'id': '2'}
@@ -0,0 +1,65 @@
+"""
+Test which data-access calls are counted as backend round trips.
+"""
+import pytest
+
+import db
+import db_metrics
+from db_metrics import _request_stats, add_call_listener
+
+
+@pytest.fixture
+def counted_calls():
+    names = []
+
+    def listener(name, seconds):
+        names.append(name)
+    add_call_listener(listener)
+    yield names
+    db_metrics._call_listeners.remove(listener)
+
+
+def test_menu_snapshot_lookups_are_not_round_trips(app, supabase_stub, counted_calls):
+    dishes = [db.create_dish(f'Dish {number}', 5.0, section='Lunch') for number in range(8)]
+    counted_calls.clear()
+
+    with app.test_request_context('/cart'):
+        for dish in dishes:
+            assert db.get_menu_dish(dish['id'])['name'] == dish['name']
+        db.get_menu_version()
+        db.get_all_dishes()
+        db.calculate_review_stats([{'rating': 4}])
+        # One snapshot load, however many lookups it answered
+        assert counted_calls == ['_fetch_all_dishes']
+        assert _request_stats().calls == 1
+
+    with app.test_request_context('/cart'):
+        db.get_menu_dish(dishes[0]['id'])
+        assert _request_stats().calls == 0
+
+
+def test_backend_reads_are_counted(app, supabase_stub, counted_calls):
+    dish = db.create_dish('Soup', 4.5, section='Lunch')
+    with app.test_request_context('/dish'):
+        db.get_dish_by_id(dish['id'])
+        db.get_reviews_by_dish(dish['id'])
+        assert counted_calls[-2:] == ['get_dish_by_id', 'get_reviews_by_dish']
+        assert _request_stats().calls == 2
+
+
+def test_metrics_endpoint_is_off_by_default(client):
+    assert not db_metrics.METRICS_ENABLED
+    assert client.get('/metrics', base_url='https://localhost').status_code == 404
+
+
+def test_metrics_require_token_or_admin(app, monkeypatch):
+    monkeypatch.setattr(db_metrics, 'METRICS_TOKEN', 's3cret')
+    with app.test_request_context('/metrics'):
+        assert not db_metrics._metrics_authorized()
+    with app.test_request_context('/metrics', headers={'Authorization': 'Bearer wrong'}):
+        assert not db_metrics._metrics_authorized()
+    with app.test_request_context('/metrics', headers={'Authorization': 'Bearer s3cret'}):
+        assert db_metrics._metrics_authorized()
+    monkeypatch.setattr(db_metrics, 'METRICS_TOKEN', None)
+    with app.test_request_context('/metrics', headers={'Authorization': 'Bearer '}):
+        assert not db_metrics._metrics_authorized()
@@ -0,0 +1,108 @@
+"""
+Test redaction and replay matching of recorded data-access calls.
+"""
+import json
+
+import pytest
+from flask import Flask, jsonify
+
+import db_recorder
+from benchmarks.replay_db import replay
+from db_recorder import REDACTED, Replay, ReplayQueue, recorded
+
+
+def create_user(auth_user_id, username, email, is_admin=False):
+    return {'id': 'u1', 'username': username, 'email': email, 'auth_user_id': auth_user_id}
+
+
+def update_user(user_id, updates):
+    return True
+
+
+def get_user_by_id(user_id):
+    return {'id': user_id, 'username': f'user {user_id}', 'email': f'{user_id}@example.com',
+            'points': len(user_id)}
+
+
+@pytest.fixture
+def recording(tmp_path, monkeypatch):
+    path = tmp_path / 'db.jsonl'
+    monkeypatch.setenv('DB_RECORD_PATH', str(path))
+    monkeypatch.setattr(db_recorder, '_writer', None)
+    monkeypatch.setattr(db_recorder, '_replay', None)
+
+    def records():
+        db_recorder._writer._file.close()
+        return [json.loads(line) for line in path.read_text().splitlines()]
+    return records
+
+
+def test_positional_arguments_are_redacted_by_parameter_name(recording):
+    recorded(create_user)('auth-123', 'alice', 'alice@example.com', True)
+    recorded(update_user)('u1', {'email': 'new@example.com', 'points': 5})
+
+    first, second = (record['calls'][0] for record in recording())
+    assert first['args'] == [REDACTED, REDACTED, REDACTED, True]
+    assert first['result'] == {'id': 'u1', 'username': REDACTED, 'email': REDACTED,
+                               'auth_user_id': REDACTED}
+    assert second['args'] == ['u1', {'email': REDACTED, 'points': 5}]
+    assert 'alice' not in json.dumps(first)
+
+
+def test_keyword_arguments_snapshot_like_positional_ones(recording):
+    recorded(create_user)('auth-123', 'alice', email='alice@example.com')
+    recorded(create_user)(auth_user_id='auth-123', username='alice', email='alice@example.com')
+
+    first, second = (record['calls'][0] for record in recording())
+    assert first['args'] == second['args'] == [REDACTED, REDACTED, REDACTED]
+    assert first['kwargs'] == second['kwargs'] == {}
+
+
+def test_replay_matches_calls_with_redacted_arguments(recording, monkeypatch):
+    wrapped = recorded(get_user_by_id)
+    wrapped('u1')
+    wrapped('user-2')
+    calls = [record['calls'][0] for record in recording()]
+
+    monkeypatch.setattr(db_recorder, '_replay', Replay(latency_scale=0))
+    app = Flask(__name__)
+    # Recorded in the other order: the arguments, not the position, pick the call
+    with app.test_request_context(environ_base={'db_replay.calls': ReplayQueue(calls)}):
+        assert wrapped('user-2') == {'id': 'user-2', 'username': REDACTED, 'email': REDACTED,
+                                     'points': 6}
+        assert wrapped('u1')['points'] == 2
+    assert db_recorder._replay.matched == 2
+
+
+def test_recorded_requests_replay_without_the_backend(recording, monkeypatch):
+    backend_calls = []
+
+    @recorded
+    def get_user_by_id(user_id):
+        backend_calls.append(user_id)
+        return {'id': user_id, 'username': 'alice', 'email': 'alice@example.com', 'points': 7}
+
+    app = Flask(__name__)
+
+    @app.route('/points/<user_id>')
+    def points(user_id):
+        user = get_user_by_id(user_id)
+        return jsonify(points=user['points'], username=user['username'])
+
+    assert db_recorder.init_db_recorder(app)
+    client = app.test_client()
+    assert client.get('/points/u1').get_json() == {'points': 7, 'username': 'alice'}
+    client.get('/points/u2')
+    path = db_recorder._writer.path
+    records = recording()
+    assert [record['path'] for record in records] == ['/points/u1', '/points/u2']
+    assert 'alice' not in json.dumps(records)
+
+    state = Replay(latency_scale=0)
+    monkeypatch.setattr(db_recorder, '_replay', state)
+    timings, mismatches = replay(app, state.load([path]))
+
+    assert backend_calls == ['u1', 'u2']  # only while recording
+    assert (state.matched, state.fallbacks, state.passthrough) == (2, 0, 0)
+    assert sorted(timings) == ['points'] and len(timings['points']) == 2
+    assert mismatches == {}
@@ -0,0 +1,178 @@
+"""
+Test the SQLAlchemy data backend on SQLite against the Supabase one.
+Both run the same calls; db.py is answered by the Supabase stand-in, so
+this also checks the two return the same shapes.
+"""
+import uuid
+
+import pytest
+
+import db
+import db_sqlalchemy
+
+
+@pytest.fixture(params=['supabase', 'sqlalchemy'])
+def backend(request):
+    if request.param == 'supabase':
+        request.getfixturevalue('supabase_stub')
+        return db
+    request.getfixturevalue('sqlite_db')
+    return db_sqlalchemy
+
+
+@pytest.fixture
+def both(request):
+    """Run fn(backend) against each backend; returns (supabase, sqlalchemy) results"""
+    def run(fn):
+        request.getfixturevalue('supabase_stub')
+        supabase_result = fn(db)
+        request.getfixturevalue('sqlite_db')
+        return supabase_result, fn(db_sqlalchemy)
+    return run
+
+
+def shape(value):
+    """Keys and value types, ignoring the values themselves"""
+    if isinstance(value, dict):
+        return {key: shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [shape(item) for item in value[:1]]
+    if isinstance(value, int) and not isinstance(value, bool):
+        return 'number'
+    return 'number' if isinstance(value, float) else type(value).__name__
+
+
+def user_with_dishes(backend, *prices):
+    user = backend.create_user(str(uuid.uuid4()), 'alice', 'alice@example.com')
+    dishes = [backend.create_dish(f'Dish {n}', price, section='Mains')
+              for n, price in enumerate(prices)]
+    return user, dishes
+
+
+def place_order(backend, user, dish, quantity=1):
+    backend.add_to_cart(user['id'], dish['id'], quantity)
+    return backend.checkout_cart(user['id'])
+
+
+def test_add_to_cart_and_replace_cart(backend):
+    user, (first, second) = user_with_dishes(backend, 5.0, 7.5)
+
+    backend.add_to_cart(user['id'], first['id'])
+    backend.add_to_cart(user['id'], first['id'], 2)
+    assert [(item['dish_id'], item['quantity']) for item in backend.get_cart_items(user['id'])] == [
+        (first['id'], 3)]
+
+    assert backend.replace_cart(user['id'], [
+        {'id': str(uuid.uuid4()), 'dish_id': second['id'], 'quantity': 4},
+        {'id': str(uuid.uuid4()), 'dish_id': first['id'], 'quantity': 0},
+    ])
+    items = backend.get_cart_items(user['id'])
+    assert [(item['dish_id'], item['quantity']) for item in items] == [(second['id'], 4)]
+    assert items[0]['dish']['name'] == 'Dish 1'
+
+
+def test_adding_the_same_dish_twice_merges_into_one_row(backend):
+    user, (dish,) = user_with_dishes(backend, 5.0)
+
+    first = backend.add_to_cart(user['id'], dish['id'])
+    second = backend.add_to_cart(user['id'], dish['id'], 2)
+
+    assert second['id'] == first['id']
+    assert second['quantity'] == 3
+    assert len(backend.get_cart_items(user['id'])) == 1
+
+
+def test_checkout_cart(backend):
+    user, (dish,) = user_with_dishes(backend, 6.0)
+    assert backend.checkout_cart(user['id']) == {}
+
+    order = place_order(backend, user, dish, 3)
+
+    assert order['total'] == 18.0
+    assert order['status'] == 'pending'
+    assert order['points_earned'] == 18
+    assert backend.get_cart_items(user['id']) == []
+    assert backend.get_user_by_id(user['id'])['points'] == 18
+    items = backend.get_order_items(order['id'])
+    assert [(item['dish_id'], item['quantity'], item['price'], item['section']) for item in items] == [
+        (dish['id'], 3, 6.0, 'Mains')]
+
+
+def test_update_order_status_maintains_rollups(backend):
+    user, (dish,) = user_with_dishes(backend, 4.0)
+    order = place_order(backend, user, dish, 2)
+
+    assert backend.update_order_status(order['id'], 'delivered')
+    assert backend.get_order_by_id(order['id'])['status'] == 'delivered'
+    assert backend.get_total_revenue() == 8.0
+    assert backend.get_revenue_by_dish() == [{'dish_name': 'Dish 0', 'revenue': 8.0}]
+
+    assert backend.update_order_status(order['id'], 'cancelled')
+    assert backend.get_total_revenue() == 0.0
+    assert not backend.update_order_status(str(uuid.uuid4()), 'delivered')
+
+
+def test_rebuild_revenue_rollups(backend):
+    user, (soup, bread) = user_with_dishes(backend, 4.5, 2.0)
+    for dish, quantity in [(soup, 1), (soup, 2), (bread, 3)]:
+        backend.update_order_status(place_order(backend, user, dish, quantity)['id'], 'delivered')
+    place_order(backend, user, bread)  # pending, not counted
+    expected = backend.get_revenue_by_dish()
+    today = backend.get_first_order_date()
+
+    assert backend.rebuild_revenue_rollups(today, today) == 3
+
+    assert backend.get_total_revenue() == 4.5 * 3 + 2.0 * 3
+    assert sorted(backend.get_revenue_by_dish(), key=lambda row: row['dish_name']) == sorted(
+        expected, key=lambda row: row['dish_name'])
+    assert backend.rebuild_revenue_rollups('2000-01-01', '2000-01-01') == 0
+    assert backend.get_total_revenue() == 4.5 * 3 + 2.0 * 3
+
+
+def test_get_review_stats(backend):
+    user, (soup, bread, salad) = user_with_dishes(backend, 4.5, 2.0, 6.0)
+    for dish, rating in [(soup, 5), (soup, 4), (soup, 2), (bread, 3)]:
+        assert backend.create_review(user['id'], dish['id'], rating, 'ok')
+
+    stats = backend.get_review_stats()
+
+    assert stats == {
+        soup['id']: {'avg_rating': pytest.approx(11 / 3), 'review_count': 3},
+        bread['id']: {'avg_rating': 3, 'review_count': 1},
+    }
+    assert salad['id'] not in stats  # unreviewed dishes fall back to no rating
+
+
+def test_get_orders_page(backend):
+    user, (dish,) = user_with_dishes(backend, 1.0)
+    orders = [place_order(backend, user, dish) for _ in range(5)]
+    backend.update_order_status(orders[0]['id'], 'delivered')
+    newest_first = [order['id'] for order in reversed(orders)]
+
+    first_page = backend.get_orders_page(limit=3)
+    last = first_page[-1]
+    next_page = backend.get_orders_page(limit=3, before=(last['created_at'], last['id']))
+
+    assert [order['id'] for order in first_page + next_page] == newest_first
+    assert [order['id'] for order in backend.get_orders_page(status='delivered')] == [orders[0]['id']]
+
+
+def test_backends_return_the_same_shapes(both):
+    def calls(backend):
+        user, (dish,) = user_with_dishes(backend, 6.0)
+        cart_item = backend.add_to_cart(user['id'], dish['id'])
+        cart = backend.get_cart_items(user['id'])
+        order = backend.checkout_cart(user['id'])
+        return {
+            'user': user,
+            'dish': dish,
+            'cart_item': cart_item,
+            'cart': cart,
+            'order': order,
+            'orders_page': backend.get_orders_page(),
+            'order_items': backend.get_order_items(order['id']),
+            'status_updated': backend.update_order_status(order['id'], 'delivered'),
+        }
+
+    supabase_result, sqlalchemy_result = both(calls)
+    assert shape(sqlalchemy_result) == shape(supabase_result)
@@ -0,0 +1,61 @@
+"""
+Test the uniqueness validators of the forms.
+"""
+import pytest
+from werkzeug.datastructures import MultiDict
+
+import db
+from forms import DishForm, RegisterForm
+
+
+def dish_form(name, dish_id=None):
+    return DishForm(formdata=MultiDict({'name': name, 'price': '5', 'section': 'Lunch'}),
+                    dish_id=dish_id)
+
+
+def register_form(username, email):
+    return RegisterForm(formdata=MultiDict(
+        {'username': username, 'email': email, 'password': 'secret1'}))
+
+
+@pytest.fixture
+def context(app):
+    with app.test_request_context():
+        yield
+
+
+@pytest.mark.parametrize('name', ['Pancakes', 'pancakes', 'PANCAKES'])
+def test_dish_name_match_ignores_case(context, name):
+    db.create_dish('Pancakes', 6.0, section='Breakfast')
+
+    form = dish_form(name)
+
+    assert not form.validate()
+    assert form.name.errors == ['Dish name must be unique.']
+
+
+def test_editing_a_dish_may_keep_its_own_name(context):
+    dish = db.create_dish('Pancakes', 6.0, section='Breakfast')
+    other = db.create_dish('Waffles', 7.0, section='Breakfast')
+
+    assert dish_form('pancakes', dish_id=dish['id']).validate()
+    assert not dish_form('Pancakes', dish_id=other['id']).validate()
+
+
+def test_archived_dish_name_is_free(context):
+    dish = db.create_dish('Pancakes', 6.0, section='Breakfast')
+    db.delete_dish(dish['id'])  # archives it
+
+    assert dish_form('Pancakes').validate()
+
+
+def test_username_and_email_match_ignores_case(context, supabase_stub):
+    supabase_stub.table('users').insert(
+        {'username': 'Alice', 'email': 'Alice@Example.com'}).execute()
+
+    form = register_form('ALICE', 'alice@example.COM')
+
+    assert not form.validate()
+    assert form.username.errors == ['Username already taken.']
+    assert form.email.errors == ['Email already registered.']
+    assert register_form('bob', 'bob@example.com').validate()
@@ -0,0 +1,81 @@
+"""
+Test the resized image variants of dish uploads and their markup.
+"""
+import pytest
+from PIL import Image
+
+import db
+import image_pipeline
+from image_pipeline import build_variants
+
+
+@pytest.fixture(autouse=True)
+def webp_only(monkeypatch):
+    monkeypatch.setattr(image_pipeline, 'IMAGE_FORMATS', ('webp',))
+    monkeypatch.setattr(image_pipeline, 'IMAGE_VARIANT_WIDTHS', (320, 640, 1024))
+
+
+def make_png(folder, name='photo.png', size=(700, 350)):
+    image = Image.new('RGB', size, (200, 120, 40))
+    image.save(folder / name, 'PNG', dpi=(300, 300))
+    return name
+
+
+def test_build_webp_variants_no_wider_than_the_source(tmp_path):
+    variants = build_variants(str(tmp_path), make_png(tmp_path))
+
+    assert variants == {'webp': {'320': 'variants/photo-320q80.webp',
+                                 '640': 'variants/photo-640q80.webp'}}
+    for width, path in variants['webp'].items():
+        with Image.open(tmp_path / path) as variant:
+            assert variant.format == 'WEBP'
+            assert variant.size == (int(width), int(width) // 2)
+            assert 'exif' not in variant.info and 'dpi' not in variant.info
+
+
+def test_narrow_image_gets_one_variant_at_its_own_width(tmp_path):
+    variants = build_variants(str(tmp_path), make_png(tmp_path, size=(200, 100)))
+
+    assert variants == {'webp': {'200': 'variants/photo-200q80.webp'}}
+
+
+def render_picture(app, dish):
+    with app.test_request_context():
+        macro = app.jinja_env.get_template('dish_image.html').module.dish_picture
+        return str(macro(dish, '(min-width: 768px) 33vw, 100vw', 'rounded'))
+
+
+def test_picture_markup_lists_variants_by_width(app):
+    dish = {'name': 'Soup', 'image_filename': 'photo.png', 'image_variants': {'webp': {
+        '640': 'variants/photo-640q80.webp', '320': 'variants/photo-320q80.webp'}}}
+
+    html = render_picture(app, dish)
+
+    assert ('<source type="image/webp" srcset="/static/uploads/variants/photo-320q80.webp 320w, '
+            '/static/uploads/variants/photo-640q80.webp 640w" '
+            'sizes="(min-width: 768px) 33vw, 100vw" />') in html
+    assert 'image/avif' not in html
+    assert 'src="/static/uploads/photo.png"' in html
+
+
+def test_unprocessed_and_remote_images_offer_only_the_original(app):
+    unprocessed = render_picture(app, {'name': 'Soup', 'image_filename': 'photo.png'})
+    remote = render_picture(app, {'name': 'Tea', 'image_filename': 'https://example.com/tea.jpg'})
+    missing = render_picture(app, {'name': 'Bread', 'image_filename': None})
+
+    assert '<source' not in unprocessed + remote + missing
+    assert 'src="https://example.com/tea.jpg"' in remote
+    assert 'src="/static/logo.png"' in missing
+
+
+def test_process_records_variants_on_the_dish(app, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'UPLOAD_FOLDER', str(tmp_path))
+    dish = db.create_dish('Soup', 4.5, image_filename=make_png(tmp_path))
+
+    variants = image_pipeline.image_pipeline.process(dish['id'], 'photo.png')
+
+    assert set(variants['webp']) == {'320', '640'}
+    assert db.get_dish_by_id(dish['id'])['image_variants'] == variants
+    # Variants of an image the dish no longer uses are not recorded
+    assert image_pipeline.image_pipeline.process(dish['id'], make_png(tmp_path, 'old.png')) is None
+    assert db.get_dish_by_id(dish['id'])['image_variants'] == variants
@@ -0,0 +1,38 @@
+"""
+Test the make_admin command.
+"""
+
+
+def add_user(supabase_stub, username, created_at):
+    return supabase_stub.table('users').insert({
+        'username': username,
+        'email': f'{username}@example.com',
+        'created_at': created_at,
+    }).execute().data[0]
+
+
+def test_promotes_earliest_user_without_loading_all(runner, supabase_stub):
+    later = add_user(supabase_stub, 'later', '2024-02-01T00:00:00+00:00')
+    first = add_user(supabase_stub, 'first', '2024-01-01T00:00:00+00:00')
+    for n in range(20):
+        add_user(supabase_stub, f'user{n}', '2024-03-01T00:00:00+00:00')
+    before = supabase_stub.round_trips
+
+    result = runner.invoke(args=['make_admin'])
+
+    assert 'User first is now an admin.' in result.output
+    assert supabase_stub.tables['users'].rows[first['id']]['is_admin']
+    assert not supabase_stub.tables['users'].rows[later['id']]['is_admin']
+    assert supabase_stub.round_trips - before == 2  # first user, then the update
+
+
+def test_promotes_users_by_email(runner, supabase_stub):
+    user = add_user(supabase_stub, 'alice', '2024-02-01T00:00:00+00:00')
+    add_user(supabase_stub, 'bob', '2024-01-01T00:00:00+00:00')
+
+    result = runner.invoke(args=['make_admin', '--email', 'alice@example.com'])
+
+    assert '1 user(s) are now admins.' in result.output
+    admins = [row['username'] for row in supabase_stub.tables['users'].rows.values()
+              if row['is_admin']]
+    assert admins == [user['username']]
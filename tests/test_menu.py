@@ -1,58 +1,58 @@
 """
 Test menu and dish functionality.
 """
-import pytest
-from models import Dish
-from db import db
+import db
 
+BASE_URL = 'https://localhost'
+
+
+def test_view_menu(auth_client):
+    db.create_dish('Pancakes', 6.0, section='Breakfast')
+
+    response = auth_client.get('/menu', base_url=BASE_URL)
 
-def test_view_menu(client):
-    """Test viewing the menu page"""
-    response = client.get('/menu')
     assert response.status_code == 200
-    assert b'Menu' in response.data
+    assert b"Today's Menu" in response.data
+    assert b'Pancakes' in response.data
 
 
-def test_add_dish(admin_client):
-    """Test adding a new dish (admin only)"""
-    response = admin_client.post('/admin/add_dish', data={
+def test_menu_requires_login(client):
+    response = client.get('/menu', base_url=BASE_URL)
+    assert response.status_code == 302
+
+
+def test_add_dish(admin_client, supabase_stub):
+    response = admin_client.post('/admin/dish/add', data={
         'name': 'Test Dish',
         'description': 'A test dish',
         'price': '9.99',
         'section': 'Lunch'
-    }, follow_redirects=True)
+    }, base_url=BASE_URL, follow_redirects=True)
 
     assert response.status_code == 200
-    assert b'Dish added successfully' in response.data
-
-
-def test_edit_dish(admin_client, app):
-    """Test editing an existing dish"""
-    # Create a test dish
-    with app.app_context():
-        dish = Dish(
-            name='Original Dish',
-            description='Original description',
-            price=10.99,
-            section='Dinner'
-        )
-        db.session.add(dish)
-        db.session.commit()
-        dish_id = dish.id
-
-    # Edit the dish
-    response = admin_client.post(f'/admin/edit_dish/{dish_id}', data={
+    assert b'Dish added!' in response.data
+    (dish,) = supabase_stub.tables['dish'].rows.values()
+    assert (dish['name'], dish['price'], dish['section']) == ('Test Dish', 9.99, 'Lunch')
+
+
+def test_add_dish_requires_admin(auth_client, supabase_stub):
+    auth_client.post('/admin/dish/add', data={'name': 'Test Dish', 'price': '9.99', 'section': 'Lunch'},
+                     base_url=BASE_URL)
+    assert not supabase_stub.tables['dish'].rows
+
+
+def test_edit_dish(admin_client):
+    dish = db.create_dish('Original Dish', 10.99, 'Original description', section='Dinner')
+
+    response = admin_client.post(f"/admin/dish/edit/{dish['id']}", data={
         'name': 'Updated Dish',
         'description': 'Updated description',
         'price': '12.99',
         'section': 'Dinner'
-    }, follow_redirects=True)
+    }, base_url=BASE_URL, follow_redirects=True)
 
     assert response.status_code == 200
-    assert b'Dish updated successfully' in response.data
-
-    # Verify the changes
-    with app.app_context():
-        updated_dish = Dish.query.get(dish_id)
-        assert updated_dish.name == 'Updated Dish'
-        assert updated_dish.price == 12.99
+    assert b'Dish updated!' in response.data
+    updated_dish = db.get_dish_by_id(dish['id'])
+    assert updated_dish['name'] == 'Updated Dish'
+    assert updated_dish['price'] == 12.99
@@ -0,0 +1,55 @@
+"""
+Test data migrations on SQLite (Postgres-only SQL would fail here).
+"""
+import importlib.util
+import os
+
+import pytest
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+VERSIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        'migrations', 'versions')
+
+
+def load_migration(name):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(VERSIONS, f'{name}.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def connection():
+    engine = sa.create_engine('sqlite://')
+    with engine.begin() as connection:
+        yield connection
+
+
+def upgrade(connection, name):
+    with Operations.context(MigrationContext.configure(connection)):
+        load_migration(name).upgrade()
+
+
+def test_cart_item_unique_folds_duplicates_into_oldest_row(connection):
+    connection.exec_driver_sql(
+        'CREATE TABLE cart_item (id CHAR(32) PRIMARY KEY, user_id CHAR(32), dish_id CHAR(32), '
+        'quantity INTEGER, created_at TIMESTAMP)')
+    connection.exec_driver_sql("""
+        INSERT INTO cart_item VALUES
+            ('c', 'u1', 'd1', 2, '2024-01-02 00:00:00'),
+            ('b', 'u1', 'd1', 1, '2024-01-01 00:00:00'),
+            ('a', 'u1', 'd1', 4, '2024-01-02 00:00:00'),
+            ('d', 'u1', 'd2', 5, '2024-01-01 00:00:00'),
+            ('e', 'u2', 'd1', 3, '2024-01-03 00:00:00')
+    """)
+
+    upgrade(connection, '0007_cart_item_unique')
+
+    rows = connection.exec_driver_sql(
+        'SELECT id, user_id, dish_id, quantity FROM cart_item ORDER BY id').fetchall()
+    assert rows == [('b', 'u1', 'd1', 7), ('d', 'u1', 'd2', 5), ('e', 'u2', 'd1', 3)]
+    with pytest.raises(sa.exc.IntegrityError):
+        connection.exec_driver_sql(
+            "INSERT INTO cart_item VALUES ('f', 'u1', 'd1', 1, '2024-01-04 00:00:00')")
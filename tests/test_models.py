@@ -0,0 +1,38 @@
+"""
+Test model constraints that must hold on every database backend.
+"""
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.schema import CreateIndex
+
+from models import Dish
+
+
+def add_dish(db, name, is_archived=False):
+    db.session.add(Dish(name=name, price=5, is_archived=is_archived))
+    db.session.commit()
+
+
+def test_active_dish_names_are_unique_ignoring_case(sqlite_db):
+    add_dish(sqlite_db, 'Pancakes')
+
+    with pytest.raises(IntegrityError):
+        add_dish(sqlite_db, 'PANCAKES')
+    sqlite_db.session.rollback()
+
+
+def test_archived_dishes_may_share_a_name(sqlite_db):
+    add_dish(sqlite_db, 'Pancakes', is_archived=True)
+    add_dish(sqlite_db, 'Pancakes', is_archived=True)
+    add_dish(sqlite_db, 'pancakes')
+
+    assert sqlite_db.session.query(Dish).filter_by(is_archived=True).count() == 2
+
+
+def test_postgres_index_is_partial_too():
+    index = next(index for index in Dish.__table__.indexes
+                 if index.name == 'dish_active_name_lower_key')
+    ddl = str(CreateIndex(index).compile(dialect=postgresql.dialect()))
+    assert ddl.startswith('CREATE UNIQUE INDEX')
+    assert 'WHERE' in ddl and 'is_archived' in ddl
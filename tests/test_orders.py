@@ -1,63 +1,49 @@
 """
 Test order functionality.
 """
-import pytest
-from models import Order, OrderItem, Dish
-from db import db
+import db
+from cart_store import cart_store
 
+BASE_URL = 'https://localhost'
 
-def test_add_to_cart(auth_client, app):
-    """Test adding items to cart"""
-    # Create a test dish
-    with app.app_context():
-        dish = Dish(
-            name='Test Dish',
-            description='Test description',
-            price=9.99,
-            section='Lunch'
-        )
-        db.session.add(dish)
-        db.session.commit()
-        dish_id = dish.id
-
-    # Add dish to cart
-    response = auth_client.post('/add_to_cart', json={
-        'dish_id': dish_id,
-        'quantity': 2
-    })
 
-    assert response.status_code == 200
-    assert 'success' in response.get_json()
+def current_user_id(client):
+    with client.session_transaction(base_url=BASE_URL) as session:
+        return session['_user_id']
+
 
+def test_add_to_cart(app, auth_client):
+    dish = db.create_dish('Test Dish', 9.99, 'Test description', section='Lunch')
+
+    for _ in range(2):
+        response = auth_client.post(f"/add_to_cart/{dish['id']}", base_url=BASE_URL,
+                                    follow_redirects=True)
+        assert response.status_code == 200
+        assert b'Added to cart!' in response.data
 
-def test_place_order(auth_client, app):
-    """Test placing an order"""
-    # Create a test dish and add to cart first
     with app.app_context():
-        dish = Dish(
-            name='Order Dish',
-            description='Order description',
-            price=15.99,
-            section='Dinner'
-        )
-        db.session.add(dish)
-        db.session.commit()
-        dish_id = dish.id
-
-    # Add to cart
-    auth_client.post('/add_to_cart', json={
-        'dish_id': dish_id,
-        'quantity': 1
-    })
-
-    # Place order
-    response = auth_client.post('/place_order', follow_redirects=True)
+        cart = cart_store.get_cart(current_user_id(auth_client))
+    assert [(item['dish_id'], item['quantity']) for item in cart] == [(dish['id'], 2)]
+
+
+def test_place_order(auth_client):
+    dish = db.create_dish('Order Dish', 15.99, 'Order description', section='Dinner')
+    auth_client.post(f"/add_to_cart/{dish['id']}", base_url=BASE_URL)
+
+    response = auth_client.post('/checkout', data={'discount': '0'}, base_url=BASE_URL)
+
     assert response.status_code == 200
-    assert b'Order placed successfully' in response.data
+    (order,) = db.get_orders_page()
+    assert order['user_id'] == current_user_id(auth_client)
+    assert order['total'] == 15.99
+
+
+def test_view_orders(admin_client, supabase_stub):
+    order = supabase_stub.table('order').insert({
+        'user_id': current_user_id(admin_client), 'total': 12.5}).execute().data[0]
 
+    response = admin_client.get('/admin/orders', base_url=BASE_URL)
 
-def test_view_orders(admin_client):
-    """Test viewing orders (admin only)"""
-    response = admin_client.get('/admin/orders')
     assert response.status_code == 200
     assert b'Orders' in response.data
+    assert f"order-{order['id']}".encode() in response.data
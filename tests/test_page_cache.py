@@ -0,0 +1,74 @@
+"""
+Test ETags and conditional GETs of the menu pages.
+"""
+import db
+
+BASE_URL = 'https://localhost'
+
+
+def get(client, path, etag=None, weak=True):
+    headers = {'If-None-Match': ('W/' if weak else '') + f'"{etag}"'} if etag else {}
+    return client.get(path, headers=headers, base_url=BASE_URL)
+
+
+def test_home_is_revalidated_with_its_etag(client):
+    first = get(client, '/')
+    etag, weak = first.get_etag()
+    assert first.status_code == 200
+    assert etag and weak  # pages differ in their CSP nonce
+    assert 'no-cache' in first.headers['Cache-Control']
+
+    repeat = get(client, '/', etag)
+    assert repeat.status_code == 304
+    assert repeat.get_etag() == (etag, True)
+    assert repeat.data == b''
+    assert get(client, '/', etag, weak=False).status_code == 304
+
+
+def test_etag_is_strong_without_a_nonce(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, 'CSP_MODE', 'hash')
+
+    first = get(client, '/')
+    etag, weak = first.get_etag()
+    assert etag and not weak
+    assert first.headers['ETag'] == f'"{etag}"'
+
+    repeat = get(client, '/', etag, weak=False)
+    assert repeat.status_code == 304
+    assert repeat.get_etag() == (etag, False)
+
+
+def test_etag_varies_by_viewer(app, auth_client):
+    anonymous = get(app.test_client(), '/').get_etag()[0]
+    signed_in = get(auth_client, '/')
+    assert signed_in.get_etag()[0] != anonymous
+    assert get(auth_client, '/', anonymous).status_code == 200
+
+
+def test_menu_etag_changes_with_the_menu(auth_client, supabase_stub):
+    dish = db.create_dish('Pancakes', 6.0, section='Breakfast')
+    # Empty rating stats are never cached (they may be a failed read)
+    supabase_stub.table('dish_rating_stats').insert({
+        'dish_id': dish['id'], 'review_count': 1, 'rating_sum': 5}).execute()
+    first = get(auth_client, '/menu')
+    etag = first.get_etag()[0]
+    assert b'Pancakes' in first.data
+
+    before = supabase_stub.round_trips
+    assert get(auth_client, '/menu', etag).status_code == 304
+    assert supabase_stub.round_trips == before  # snapshot and stats are cached
+
+    db.create_dish('Waffles', 7.0, section='Breakfast')
+    changed = get(auth_client, '/menu', etag)
+    assert changed.status_code == 200
+    assert changed.get_etag()[0] != etag
+    assert b'Waffles' in changed.data
+
+
+def test_no_etag_while_a_flash_message_is_pending(client):
+    with client.session_transaction(base_url=BASE_URL) as session:
+        session['_flashes'] = [('message', 'Welcome back!')]
+
+    response = get(client, '/')
+    assert response.status_code == 200
+    assert response.get_etag() == (None, None)
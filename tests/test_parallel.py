@@ -0,0 +1,72 @@
+"""
+Test the concurrent fan-out of independent calls.
+"""
+import threading
+import time
+
+from flask import Flask, g, request
+
+from parallel import run_parallel
+
+
+def add(a, b):
+    return a + b
+
+
+def fail():
+    raise RuntimeError('backend down')
+
+
+def test_results_by_name():
+    assert run_parallel({'sum': (add, 1, 2), 'same': (add, 'a', 'b')}) == {'sum': 3, 'same': 'ab'}
+
+
+def test_failed_call_yields_its_default(caplog):
+    results = run_parallel({'ok': (add, 1, 2), 'failed': (fail,), 'no_default': (fail,)},
+                           defaults={'failed': []})
+
+    assert results == {'ok': 3, 'failed': [], 'no_default': None}
+    assert 'Parallel call failed failed: backend down' in caplog.text
+
+
+def test_slow_call_times_out_to_its_default(caplog):
+    release = threading.Event()
+
+    def slow():
+        release.wait(5)
+        return 'late'
+
+    started = time.monotonic()
+    results = run_parallel({'fast': (add, 1, 1), 'slow': (slow,)}, timeout=0.05,
+                           defaults={'slow': 0.0})
+    elapsed = time.monotonic() - started
+    release.set()
+
+    assert results == {'fast': 2, 'slow': 0.0}
+    assert elapsed < 1
+    assert 'Parallel call slow timed out' in caplog.text
+
+
+def test_calls_see_the_request_context():
+    app = Flask(__name__)
+
+    def where():
+        return request.path, g.user, threading.current_thread() is not caller
+
+    caller = threading.current_thread()
+    with app.test_request_context('/admin/revenue'):
+        g.user = 'admin'
+        results = run_parallel({'first': (where,), 'second': (where,)})
+
+    assert results == {'first': ('/admin/revenue', 'admin', True),
+                       'second': ('/admin/revenue', 'admin', True)}
+
+
+def test_calls_see_the_app_context():
+    app = Flask(__name__)
+
+    with app.app_context():
+        g.memo = {'dish': 'soup'}
+        results = run_parallel({'memo': (lambda: g.memo,)})
+
+    assert results['memo'] == {'dish': 'soup'}
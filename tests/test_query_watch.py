@@ -0,0 +1,96 @@
+"""
+Test the N+1 and slow-query warnings.
+"""
+import logging
+import time
+
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+
+import db_metrics
+import query_watch
+from db_metrics import instrumented
+
+LIMIT = 3
+
+
+@pytest.fixture
+def watch(monkeypatch, caplog):
+    """The detector installed on a small app, removed again afterwards"""
+    monkeypatch.setenv('QUERY_WATCH', 'true')
+    monkeypatch.setattr(query_watch, '_installed', False)
+    monkeypatch.setattr(query_watch, 'QUERY_WATCH_REPEAT_LIMIT', LIMIT)
+    monkeypatch.setattr(query_watch, 'QUERY_WATCH_SLOW_MS', 30)
+    monkeypatch.setattr(db_metrics, '_call_listeners', [])
+    app = Flask(__name__)
+    assert query_watch.init_query_watch(app)
+    caplog.set_level(logging.WARNING, logger='query_watch')
+    yield app
+    event.remove(Engine, 'before_cursor_execute', query_watch._before_cursor_execute)
+    event.remove(Engine, 'after_cursor_execute', query_watch._after_cursor_execute)
+
+
+@instrumented
+def get_dish_by_id(dish_id):
+    return {'id': dish_id}
+
+
+@instrumented
+def get_slow_report():
+    time.sleep(0.05)
+    return []
+
+
+def warnings(caplog):
+    return [record.getMessage() for record in caplog.records if record.levelno == logging.WARNING]
+
+
+def test_disabled_by_default_outside_debug(monkeypatch):
+    monkeypatch.delenv('QUERY_WATCH', raising=False)
+    monkeypatch.setattr(query_watch, '_installed', False)
+    assert not query_watch.init_query_watch(Flask(__name__))
+
+
+def test_repeated_calls_warn_once_per_request(watch, caplog):
+    with watch.test_request_context('/menu'):
+        for n in range(LIMIT):
+            get_dish_by_id(n)
+        assert warnings(caplog) == []
+
+        for n in range(LIMIT * 3):
+            get_dish_by_id(n)
+
+    (message,) = warnings(caplog)
+    assert message.startswith(
+        f'Possible N+1 in /menu: db function get_dish_by_id called more than {LIMIT} times')
+    assert 'test_query_watch.py' in message  # the stack excerpt
+
+    with watch.test_request_context('/menu'):
+        for n in range(LIMIT):
+            get_dish_by_id(n)
+    assert len(warnings(caplog)) == 1  # counts start again per request
+
+
+def test_slow_call_warns(watch, caplog):
+    with watch.test_request_context('/admin/revenue'):
+        get_slow_report()
+        get_dish_by_id(1)
+
+    (message,) = warnings(caplog)
+    assert message.startswith('Slow db function in /admin/revenue: get_slow_report took')
+
+
+def test_repeated_statements_match_by_shape(watch, caplog):
+    engine = create_engine('sqlite://')
+    with watch.test_request_context('/orders'), engine.connect() as connection:
+        for n in range(LIMIT + 1):
+            connection.execute(text('SELECT :n'), {'n': n})
+            connection.exec_driver_sql(
+                f'SELECT 1 WHERE 1 IN ({", ".join("?" * (n + 1))})', (1,) * (n + 1))
+
+    assert [message.splitlines()[0] for message in warnings(caplog)] == [
+        f'Possible N+1 in /orders: statement SELECT ? called more than {LIMIT} times',
+        f'Possible N+1 in /orders: statement SELECT 1 WHERE 1 IN (...) called more than {LIMIT} times',
+    ]
@@ -0,0 +1,23 @@
+"""
+Test the request-scoped memo around db.py reads.
+"""
+import db
+
+
+def test_reads_are_memoized_per_request_and_cleared_by_writes(app, supabase_stub):
+    dish = db.create_dish('Soup', 4.5, section='Lunch')
+    with app.test_request_context('/dish'):
+        before = supabase_stub.round_trips
+        first = db.get_dish_by_id(dish['id'])
+        first['avg_rating'] = 5  # views decorate the dicts they get
+        second = db.get_dish_by_id(dish['id'])
+        assert supabase_stub.round_trips - before == 1
+        assert 'avg_rating' not in second
+
+        db.update_dish(dish['id'], {'price': 5.0})
+        assert db.get_dish_by_id(dish['id'])['price'] == 5.0
+
+    with app.test_request_context('/dish'):
+        before = supabase_stub.round_trips
+        db.get_dish_by_id(dish['id'])
+        assert supabase_stub.round_trips - before == 1
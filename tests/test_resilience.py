@@ -0,0 +1,160 @@
+"""
+Test failure classification, retries and circuit breaking of db reads.
+"""
+import threading
+import time
+
+import httpx
+import pytest
+from postgrest.exceptions import APIError
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+import db_resilience
+from db_metrics import ERROR, TRANSIENT, checked_call, instrumented, is_transient, log_db_error
+
+
+def api_error(code):
+    return APIError({'message': 'error', 'code': code, 'hint': None, 'details': None})
+
+
+@pytest.mark.parametrize('error', [
+    ConnectionError('refused'),
+    TimeoutError('timed out'),
+    httpx.ConnectTimeout('timed out'),
+    httpx.ReadError('reset'),
+    api_error('502'),
+    api_error('PGRST000'),
+    api_error('57014'),  # statement timeout
+    OperationalError('SELECT 1', {}, Exception('server closed the connection')),
+])
+def test_transient_errors(error):
+    assert is_transient(error)
+
+
+@pytest.mark.parametrize('error', [
+    api_error('22P02'),  # invalid input syntax for type uuid
+    api_error('23505'),
+    api_error('404'),
+    api_error('PGRST116'),
+    IntegrityError('INSERT', {}, Exception('duplicate key')),
+    ValueError('bad value'),
+    'refusing to update without filters',
+])
+def test_rejected_calls_are_not_transient(error):
+    assert not is_transient(error)
+
+
+def test_checked_call_reports_failure_kind():
+    def fails_with(error):
+        log_db_error('testing', error)
+        return None
+
+    assert checked_call(lambda: 'ok') == ('ok', None)
+    assert checked_call(fails_with, api_error('22P02')) == (None, ERROR)
+    assert checked_call(fails_with, httpx.ConnectError('down')) == (None, TRANSIENT)
+
+
+def test_instrumented_passes_failure_kind_to_caller():
+    @instrumented
+    def lookup():
+        log_db_error('getting dish by ID', api_error('503'))
+
+    assert checked_call(lookup) == (None, TRANSIENT)
+
+
+@pytest.fixture
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(db_resilience, 'RESILIENCE_RETRIES', 2)
+    monkeypatch.setattr(db_resilience, 'RESILIENCE_RETRY_BASE_MS', 0)
+    monkeypatch.setattr(db_resilience, 'RESILIENCE_BREAKER_FAILURES', 5)
+
+
+def flaky_lookup(error):
+    calls = []
+
+    def get_dish_by_id(dish_id):
+        calls.append(dish_id)
+        if error is not None:
+            log_db_error('getting dish by ID', error)
+            return None
+        return {'id': dish_id}
+    return get_dish_by_id, calls
+
+
+def test_rejected_call_is_not_retried_and_keeps_breaker_closed(fast_retries):
+    fn, calls = flaky_lookup(api_error('22P02'))
+    lookup = db_resilience.resilient(fn)
+    for _ in range(10):
+        assert lookup('not-a-uuid') is None
+    assert len(calls) == 10
+    assert db_resilience.breakers['get_dish_by_id'].state == 'closed'
+
+
+def test_transient_failures_are_retried_and_open_breaker(fast_retries):
+    fn, calls = flaky_lookup(httpx.ConnectError('down'))
+    lookup = db_resilience.resilient(fn)
+    assert lookup('a') is None
+    assert len(calls) == 3
+    assert lookup('b') is None
+    assert db_resilience.breakers['get_dish_by_id'].state == 'open'
+    assert lookup('c') is None
+    assert len(calls) == 5  # skipped while open
+
+
+def test_rejected_call_closes_half_open_breaker():
+    breaker = db_resilience.CircuitBreaker('test', failures=1, reset_after=0)
+    breaker.record(False)
+    assert breaker.state == 'open'
+    fn, calls = flaky_lookup(api_error('22P02'))
+    result, failure = db_resilience._call_with_retries(fn, breaker, ('x',), {})
+    assert (result, failure) == (None, ERROR)
+    assert breaker.state == 'closed'
+
+
+def test_malformed_dish_id_never_reaches_database(auth_client, supabase_stub):
+    before = supabase_stub.round_trips
+    for path in ('/dish/not-a-uuid', '/dish/not-a-uuid/review', '/add_to_cart/not-a-uuid'):
+        method = auth_client.get if path == '/dish/not-a-uuid' else auth_client.post
+        response = method(path, base_url='https://localhost')
+        assert response.status_code == 302
+        assert response.headers['Location'].endswith('/menu')
+    # Only the logged-in user was loaded
+    assert supabase_stub.round_trips - before <= 1
+
+
+def test_cached_reads_run_on_the_calling_thread_while_healthy(fast_retries):
+    threads = []
+
+    def get_dish_by_id(dish_id):
+        threads.append(threading.current_thread())
+        return {'id': dish_id}
+
+    lookup = db_resilience.resilient(get_dish_by_id)
+    for _ in range(3):
+        assert lookup('a') == {'id': 'a'}
+    assert threads == [threading.current_thread()] * 3
+
+
+def test_slow_read_moves_later_calls_to_the_pool_and_serves_stale(fast_retries, monkeypatch):
+    monkeypatch.setattr(db_resilience, 'RESILIENCE_STALE_AFTER_MS', 20)
+    release = threading.Event()
+    delay = {'seconds': 0}
+    threads = []
+
+    def get_dish_by_id(dish_id):
+        threads.append(threading.current_thread())
+        time.sleep(delay['seconds'])
+        if len(threads) > 2:
+            release.wait(1)
+        return {'id': dish_id, 'version': len(threads)}
+
+    lookup = db_resilience.resilient(get_dish_by_id)
+    assert lookup('a') == {'id': 'a', 'version': 1}
+    delay['seconds'] = 0.05
+    # Slow but on the calling thread: the caller waits for it
+    assert lookup('a') == {'id': 'a', 'version': 2}
+    assert threads == [threading.current_thread()] * 2
+
+    assert lookup('a') == {'id': 'a', 'version': 2}  # stale while the pool call runs
+    assert threads[2] is not threading.current_thread()
+    release.set()
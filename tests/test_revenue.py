@@ -0,0 +1,74 @@
+"""
+Test the revenue figures on the admin revenue page.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import db
+
+BASE_URL = 'https://localhost'
+
+
+def day(days_ago):
+    return (datetime.now(timezone.utc) - timedelta(days=days_ago)).strftime('%Y-%m-%d')
+
+
+@pytest.fixture
+def orders(app, supabase_stub):
+    """Soup: 2 x 4.50 yesterday, 1 x 4.50 ten days ago; bread: 3 x 2.00 three
+    days ago; plus a pending soup order, which does not count"""
+    user = supabase_stub.table('users').insert(
+        {'username': 'buyer', 'email': 'buyer@example.com'}).execute().data[0]
+    soup = db.create_dish('Soup', 4.5)
+    bread = db.create_dish('Bread', 2.0)
+    for dish, quantity, days_ago, status in [(soup, 2, 1, 'delivered'), (bread, 3, 3, 'delivered'),
+                                             (soup, 1, 10, 'delivered'), (soup, 5, 1, 'pending')]:
+        order = supabase_stub.table('order').insert({
+            'user_id': user['id'], 'status': 'pending', 'total': quantity * dish['price'],
+            'created_at': f'{day(days_ago)}T12:00:00+00:00',
+        }).execute().data[0]
+        supabase_stub.table('order_item').insert({
+            'order_id': order['id'], 'dish_id': dish['id'], 'quantity': quantity,
+            'price': dish['price'], 'section': dish.get('section'),
+        }).execute()
+        assert db.update_order_status(order['id'], status)
+
+
+def test_totals_and_grouping(orders):
+    assert db.get_total_revenue() == 19.5
+    assert db.get_revenue_by_dish() == [
+        {'dish_name': 'Soup', 'revenue': 13.5}, {'dish_name': 'Bread', 'revenue': 6.0}]
+
+    daily = db.get_daily_revenue(30)
+    assert len(daily) == 31
+    assert {row['date']: row['revenue'] for row in daily if row['revenue']} == {
+        day(10): 4.5, day(3): 6.0, day(1): 9.0}
+    assert sum(row['revenue'] for row in db.get_monthly_revenue(12)) == 19.5
+
+
+def test_date_range_filter(orders):
+    assert db.get_revenue_by_date_range(day(3), day(1)) == 15.0
+    assert db.get_revenue_by_date_range(day(2), day(2)) == 0.0
+    assert db.get_revenue_by_dish(day(3), day(1)) == [
+        {'dish_name': 'Soup', 'revenue': 9.0}, {'dish_name': 'Bread', 'revenue': 6.0}]
+    assert db.get_revenue_by_dish(day(10), day(4)) == [{'dish_name': 'Soup', 'revenue': 4.5}]
+
+
+def test_admin_revenue_page(admin_client, orders):
+    page = admin_client.get('/admin/revenue', base_url=BASE_URL).get_data(as_text=True)
+    assert 'Dh19.50' in page
+    assert 'Dh13.50' in page
+
+    filtered = admin_client.get('/admin/revenue', query_string={'start': day(3), 'end': day(1)},
+                                base_url=BASE_URL).get_data(as_text=True)
+    assert 'Dh15.00' in filtered
+    assert 'Dh9.00' in filtered
+    assert 'Dh13.50' not in filtered
+
+
+def test_admin_revenue_rejects_bad_dates(admin_client, orders):
+    response = admin_client.get('/admin/revenue', query_string={'start': 'last week'},
+                                base_url=BASE_URL)
+    assert response.status_code == 302
+    assert response.headers['Location'].endswith('/admin/revenue')
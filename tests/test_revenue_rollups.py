@@ -0,0 +1,50 @@
+"""
+Test the revenue rollups and their backfill command.
+"""
+import db
+
+
+def place_order(supabase_stub, dish, quantity=2):
+    user = supabase_stub.table('users').insert(
+        {'username': 'buyer', 'email': 'buyer@example.com'}).execute().data[0]
+    db.add_to_cart(user['id'], dish['id'], quantity)
+    return db.checkout_cart(user['id'])
+
+
+def dish_rollup(supabase_stub):
+    return {(row['section'], row['quantity'], round(row['revenue'], 2))
+            for row in supabase_stub.tables['revenue_dish_rollup'].rows.values()}
+
+
+def test_cancelling_after_section_change_nets_to_zero(app, supabase_stub):
+    dish = db.create_dish('Pancakes', 6.0, section='Breakfast')
+    order = place_order(supabase_stub, dish)
+    item = db.get_order_items(order['id'])[0]
+    assert item['section'] == 'Breakfast'
+
+    assert db.update_order_status(order['id'], 'delivered')
+    assert dish_rollup(supabase_stub) == {('Breakfast', 2, 12.0)}
+
+    db.update_dish(dish['id'], {'section': 'Daily Specials'})
+    assert db.update_order_status(order['id'], 'pending')
+    assert dish_rollup(supabase_stub) == {('Breakfast', 0, 0.0)}
+    assert db.get_total_revenue() == 0
+
+
+def test_backfill_rejects_non_positive_batch_days(runner, supabase_stub):
+    result = runner.invoke(args=['backfill_revenue_rollups', '--batch-days', '0'])
+    assert result.exit_code == 2
+    assert 'Invalid value for \'--batch-days\'' in result.output
+
+
+def test_backfill_rebuilds_rollups(runner, app, supabase_stub):
+    dish = db.create_dish('Soup', 4.5, section='Lunch')
+    order = place_order(supabase_stub, dish, quantity=1)
+    db.update_order_status(order['id'], 'delivered')
+    supabase_stub.tables['revenue_daily_rollup'].rows.clear()
+    supabase_stub.tables['revenue_dish_rollup'].rows.clear()
+
+    result = runner.invoke(args=['backfill_revenue_rollups', '--batch-days', '1'])
+    assert result.exit_code == 0, result.output
+    assert 'Backfill complete: 1 delivered orders rolled up.' in result.output
+    assert dish_rollup(supabase_stub) == {('Lunch', 1, 4.5)}
@@ -0,0 +1,79 @@
+"""
+Test the Content-Security-Policy modes.
+"""
+import json
+import re
+
+import pytest
+from flask import Flask, render_template
+
+import security
+from scripts.build_csp_hashes import _source, collect_hashes
+
+PAGE = (
+    '<style>body { color: red; }</style>\n'
+    '<script>\n  console.log("inline");\n</script>\n'
+    '<script src="/static/csrf.js"></script>\n'
+    '<script>var user = "{{ name }}";</script>\n'
+)
+
+
+@pytest.fixture
+def templates(tmp_path):
+    folder = tmp_path / 'templates'
+    folder.mkdir()
+    (folder / 'page.html').write_text(PAGE)
+    return folder
+
+
+def make_app(templates, monkeypatch, mode, hashes_path):
+    monkeypatch.setattr(security, 'CSP_MODE', mode)
+    monkeypatch.setattr(security, 'CSP_HASHES_PATH', str(hashes_path))
+    app = Flask(__name__, template_folder=str(templates))
+    security.init_security(app)
+
+    @app.route('/')
+    def page():
+        return render_template('page.html', name='alice')
+    return app
+
+
+def test_hashes_cover_inline_blocks_as_rendered(templates, monkeypatch, tmp_path):
+    hashes, skipped = collect_hashes(str(templates))
+
+    assert len(hashes['script-src']) == 1
+    assert len(hashes['style-src']) == 1
+    assert len(skipped) == 1 and skipped[0].endswith('page.html:6 <script>')
+    # Browsers hash the block as Jinja renders it
+    app = make_app(templates, monkeypatch, 'nonce', tmp_path / 'unused.json')
+    html = app.test_client().get('/').get_data(as_text=True)
+    script = re.search(r'<script>(.*?)</script>', html, re.S).group(1)
+    assert hashes['script-src'] == [_source(script)]
+
+
+def test_hash_mode_serves_identical_pages_with_hash_policy(templates, tmp_path, monkeypatch):
+    hashes, _ = collect_hashes(str(templates))
+    hashes_path = tmp_path / 'csp_hashes.json'
+    hashes_path.write_text(json.dumps(hashes))
+    app = make_app(templates, monkeypatch, 'hash', hashes_path)
+    client = app.test_client()
+
+    first, second = client.get('/'), client.get('/')
+
+    assert app.config['CSP_MODE'] == 'hash'
+    assert first.data == second.data
+    policy = first.headers['Content-Security-Policy']
+    assert hashes['script-src'][0] in policy
+    assert hashes['style-src'][0] in policy
+    assert 'nonce-' not in policy and 'unsafe-inline' not in policy
+
+
+def test_hash_mode_falls_back_to_nonces_without_hashes(templates, tmp_path, monkeypatch):
+    app = make_app(templates, monkeypatch, 'hash', tmp_path / 'missing.json')
+    client = app.test_client()
+
+    first, second = (client.get('/').headers['Content-Security-Policy'] for _ in range(2))
+
+    assert app.config['CSP_MODE'] == 'nonce'
+    assert re.search(r"script-src 'self' 'nonce-[\w-]+'", first)
+    assert first != second
@@ -0,0 +1,75 @@
+"""
+Test fingerprinted, precompressed static assets.
+"""
+import gzip
+import json
+
+import pytest
+from flask import Flask, url_for
+
+from scripts.build_static import build
+from static_assets import IMMUTABLE, init_static_assets
+
+CSS = b'body { color: #333; }\n' * 40
+UPLOAD = 'a' * 64 + '.jpg'
+
+
+@pytest.fixture
+def static(tmp_path):
+    folder = tmp_path / 'static'
+    (folder / 'uploads').mkdir(parents=True)
+    (folder / 'theme.css').write_bytes(CSS)
+    (folder / 'logo.png').write_bytes(b'\x89PNG')
+    (folder / '.hidden').write_bytes(b'secret')
+    (folder / 'uploads' / UPLOAD).write_bytes(b'jpeg')
+    return folder
+
+
+def make_app(static):
+    app = Flask(__name__, static_folder=str(static))
+    init_static_assets(app)
+    return app
+
+
+def test_build_fingerprints_and_compresses(static):
+    manifest = build(str(static))
+
+    assert set(manifest) == {'theme.css', 'logo.png'}
+    hashed = manifest['theme.css']
+    assert hashed.startswith('dist/theme.') and hashed.endswith('.css')
+    assert (static / hashed).read_bytes() == CSS
+    assert gzip.decompress((static / (hashed + '.gz')).read_bytes()) == CSS
+    assert not (static / (manifest['logo.png'] + '.gz')).exists()  # too small
+    assert json.loads((static / 'dist' / 'manifest.json').read_text()) == manifest
+    # Same bytes, same names
+    assert build(str(static)) == manifest
+
+
+def test_hashed_assets_are_linked_and_served_immutable(static):
+    manifest = build(str(static))
+    app = make_app(static)
+    client = app.test_client()
+
+    with app.test_request_context():
+        url = url_for('static', filename='theme.css')
+        assert url == '/static/' + manifest['theme.css']
+        assert url_for('static', filename='csrf.js') == '/static/csrf.js'
+
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Cache-Control'] == IMMUTABLE
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.mimetype == 'text/css'
+    assert gzip.decompress(response.data) == CSS
+    assert 'Accept-Encoding' in response.vary
+
+    plain = client.get(url)
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.data == CSS
+
+
+def test_unhashed_files_are_not_immutable(static):
+    client = make_app(static).test_client()
+
+    assert client.get('/static/theme.css').headers['Cache-Control'] != IMMUTABLE
+    assert client.get(f'/static/uploads/{UPLOAD}').headers['Cache-Control'] == IMMUTABLE
+    assert client.get('/static/missing.css').status_code == 404
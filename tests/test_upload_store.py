@@ -0,0 +1,81 @@
+"""
+Test content-addressed uploads and their garbage collection.
+"""
+import hashlib
+import io
+import os
+import time
+
+from werkzeug.datastructures import FileStorage
+
+from upload_store import TEMP_PREFIX, collect_garbage, is_immutable, save_upload
+
+OLD = time.time() - 2 * 60 * 60
+
+
+def upload(data, filename='Dish Photo.JPG'):
+    return FileStorage(stream=io.BytesIO(data), filename=filename)
+
+
+def make_file(path, data=b'x', mtime=OLD):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_uploads_are_stored_once_under_their_hash(tmp_path):
+    first = save_upload(upload(b'image bytes'), str(tmp_path))
+    second = save_upload(upload(b'image bytes', 'copy.jpg'), str(tmp_path))
+
+    assert first == second == hashlib.sha256(b'image bytes').hexdigest() + '.jpg'
+    assert os.listdir(tmp_path) == [first]
+    assert is_immutable(f'uploads/{first}')
+    assert not is_immutable('uploads/logo.png')
+
+
+def test_saving_again_refreshes_the_age_of_an_existing_upload(tmp_path):
+    filename = save_upload(upload(b'image bytes'), str(tmp_path))
+    path = tmp_path / filename
+    os.utime(path, (OLD, OLD))
+
+    save_upload(upload(b'image bytes'), str(tmp_path))
+
+    assert path.stat().st_mtime > OLD
+    assert collect_garbage(str(tmp_path), {}, grace=60) == ([], 0)
+
+
+def test_collect_garbage_deletes_old_unreferenced_uploads_and_variants(tmp_path):
+    folder = str(tmp_path)
+    used, unused, recent = ('a' * 64 + '.jpg', 'b' * 64 + '.jpg', 'c' * 64 + '.png')
+    make_file(os.path.join(folder, used))
+    make_file(os.path.join(folder, unused), b'12345')
+    make_file(os.path.join(folder, recent), mtime=time.time())
+    make_file(os.path.join(folder, 'variants', 'a' * 64 + '-480q80.webp'))
+    make_file(os.path.join(folder, 'variants', 'b' * 64 + '-480q80.webp'), b'123')
+    make_file(os.path.join(folder, 'variants', 'd' * 64 + '-480q80.webp'))
+    make_file(os.path.join(folder, TEMP_PREFIX + 'interrupted'))
+    make_file(os.path.join(folder, TEMP_PREFIX + 'in-progress'), mtime=time.time())
+
+    deleted, freed = collect_garbage(folder, {used: 1, unused: 0}, grace=60)
+
+    assert sorted(os.path.relpath(path, folder) for path in deleted) == [
+        TEMP_PREFIX + 'interrupted',
+        unused,
+        os.path.join('variants', 'b' * 64 + '-480q80.webp'),
+        os.path.join('variants', 'd' * 64 + '-480q80.webp'),
+    ]
+    assert freed == 1 + 5 + 3 + 1
+    assert sorted(os.listdir(folder)) == sorted([TEMP_PREFIX + 'in-progress', used, recent, 'variants'])
+    assert os.listdir(os.path.join(folder, 'variants')) == ['a' * 64 + '-480q80.webp']
+
+
+def test_collect_garbage_dry_run_keeps_files(tmp_path):
+    path = make_file(os.path.join(str(tmp_path), 'b' * 64 + '.jpg'))
+
+    deleted, freed = collect_garbage(str(tmp_path), {}, grace=60, dry_run=True)
+
+    assert deleted == [path]
+    assert freed == 1
+    assert os.path.exists(path)
@@ -0,0 +1,108 @@
+"""
+Content-addressed storage for dish uploads.
+An upload is stored as static/uploads/<sha256 of its bytes><ext>, hashed
+while it streams to disk, so identical images are kept once and a name
+never refers to different bytes: uploads and their variants are served as
+immutable (static_assets.py). Files are referenced by Dish.image_filename;
+`flask gc_uploads` deletes the ones no dish references any more, with
+their variants, once they are older than UPLOAD_GC_GRACE seconds.
+"""
+import hashlib
+import os
+import re
+import time
+import uuid
+
+from werkzeug.utils import secure_filename
+
+UPLOAD_GC_GRACE = int(os.environ.get('UPLOAD_GC_GRACE', 60 * 60))
+
+CHUNK_SIZE = 64 * 1024
+TEMP_PREFIX = '.upload-'
+VARIANTS_DIR = 'variants'  # written by image_pipeline.py
+
+# Paths under static/ whose bytes can never change
+IMMUTABLE_PATH = re.compile(r'^uploads/(variants/)?[0-9a-f]{64}[-.][a-z0-9.-]+$')
+
+
+def is_immutable(static_path):
+    """Whether a path under static/ is a content-addressed upload or variant"""
+    return bool(IMMUTABLE_PATH.match(static_path))
+
+
+def save_upload(file_storage, upload_folder):
+    """Store an uploaded file under its content hash; returns the filename"""
+    extension = os.path.splitext(secure_filename(file_storage.filename or ''))[1].lower()
+    os.makedirs(upload_folder, exist_ok=True)
+    temp_path = os.path.join(upload_folder, f'{TEMP_PREFIX}{uuid.uuid4().hex}')
+    sha = hashlib.sha256()
+    try:
+        with open(temp_path, 'wb') as f:
+            while True:
+                chunk = file_storage.stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                sha.update(chunk)
+                f.write(chunk)
+        filename = sha.hexdigest() + extension
+        path = os.path.join(upload_folder, filename)
+        if os.path.exists(path):
+            # Already stored; refresh its age so a pending gc_uploads keeps it
+            os.utime(path)
+            os.remove(temp_path)
+        else:
+            os.replace(temp_path, path)
+        return filename
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _variant_stem(variant_name):
+    # image_pipeline names variants <upload stem>-<width>q<quality>.<format>
+    return variant_name.rsplit('-', 1)[0]
+
+
+def collect_garbage(upload_folder, references, grace=UPLOAD_GC_GRACE, dry_run=False):
+    """Delete uploads (and their variants) with no references that are older
+    than `grace` seconds; returns (deleted paths, bytes freed).
+
+    `references` maps image_filename to the number of dishes using it and
+    must cover every dish, archived ones included.
+    """
+    deleted, freed = [], 0
+    cutoff = time.time() - grace
+
+    def remove(path):
+        nonlocal freed
+        try:
+            size = os.path.getsize(path)
+            if not dry_run:
+                os.remove(path)
+        except FileNotFoundError:
+            return
+        deleted.append(path)
+        freed += size
+
+    kept_stems = set()
+    for entry in os.scandir(upload_folder):
+        if not entry.is_file():
+            continue
+        if entry.name.startswith(TEMP_PREFIX):
+            if entry.stat().st_mtime <= cutoff:
+                remove(entry.path)  # left behind by an interrupted upload
+        elif entry.name.startswith('.'):
+            continue
+        elif references.get(entry.name) or entry.stat().st_mtime > cutoff:
+            kept_stems.add(os.path.splitext(entry.name)[0])
+        else:
+            remove(entry.path)
+
+    # Variants of deleted uploads, and of uploads removed by other means
+    variants_folder = os.path.join(upload_folder, VARIANTS_DIR)
+    if os.path.isdir(variants_folder):
+        for entry in os.scandir(variants_folder):
+            if entry.is_file() and _variant_stem(entry.name) not in kept_stems:
+                remove(entry.path)
+    return deleted, freed
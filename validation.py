@@ -2,7 +2,9 @@
 Input validation utilities for the application.
 """
 from wtforms.validators import ValidationError
+from datetime import datetime
 import re
+import uuid
 
 
 def validate_password_strength(form, field):
@@ -64,6 +66,36 @@ def validate_price(form, field):
         raise ValidationError('Invalid price format')
 
 
+def is_valid_uuid(value):
+    """Whether value is a UUID string, such as a dish ID from a URL"""
+    try:
+        uuid.UUID(str(value))
+        return True
+    except ValueError:
+        return False
+
+
+def parse_timestamp(value):
+    """Parse an ISO 8601 timestamp as returned by the database; None if invalid.
+
+    Postgres trims trailing zeros from fractional seconds and may use 'Z',
+    which datetime.fromisoformat only accepts from Python 3.11.
+    """
+    match = re.fullmatch(
+        r'(\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2})(?:\.(\d{1,6}))?(Z|[+-]\d{2}:\d{2})?', str(value))
+    if not match:
+        return None
+    moment, fraction, offset = match.groups()
+    if fraction:
+        moment += '.' + fraction.ljust(6, '0')
+    if offset:
+        moment += '+00:00' if offset == 'Z' else offset
+    try:
+        return datetime.fromisoformat(moment)
+    except ValueError:
+        return None
+
+
 def sanitize_html(text):
     """Remove HTML tags from input"""
     return re.sub(r'<[^>]*?>', '', text)